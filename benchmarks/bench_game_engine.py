@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import game_engine
+from load_simulator import simulation_quiz
+
+# Thousands of concurrent games in one process, driven on a shared virtual clock
+def run(games=2000, players=8, num_questions=10, seed=0):
+    rng = random.Random(seed)
+    quiz = simulation_quiz(num_questions)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    engines = [game_engine.GameEngine(quiz, [(f"u{g}_{p}", f"Player {p}") for p in range(players)])
+               for g in range(games)]
+    for engine in engines:
+        engine.start(now=0.0)
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    submissions = 0
+    steps = 0
+    start = time.perf_counter()
+    now = 0.0
+    while any(engine.phase != game_engine.FINISHED for engine in engines):
+        for engine in engines:
+            if engine.phase == game_engine.QUESTION:
+                question = engine.current_question()
+                for player_id in engine.state.players:
+                    answer = question["correct_answer"] if rng.random() < 0.7 else "wrong"
+                    submissions += engine.submit(player_id, answer, now + rng.random())
+        now += 1.0
+        for engine in engines:
+            engine.step(now)
+            steps += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "games": games,
+        "players": players,
+        "questions": num_questions,
+        "wall_s": round(elapsed, 3),
+        "submissions_per_s": round(submissions / elapsed),
+        "steps_per_s": round(steps / elapsed),
+        "bytes_per_game": memory // games,
+        # Virtual seconds from start to finish; early reveals end most questions within a second
+        "game_seconds": round(sum(engine.state.phase_started for engine in engines) / games, 1),
+        "game_seconds_full_timers": sum(game_engine.question_time_limit(q) + engines[0].reveal_seconds
+                                        for q in quiz["questions"])
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GameEngine concurrency benchmark")
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--players", type=int, default=8)
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.games, args.players, args.questions), indent=4))
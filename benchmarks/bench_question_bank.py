@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import question_bank
+
+# Synthetic question bank query latency benchmark
+TOPICS = ["photosynthesis", "mitochondria", "algebra", "renaissance", "volcano", "democracy",
+          "electricity", "grammar", "ecosystem", "probability", "geometry", "revolution",
+          "chemistry", "astronomy", "economics", "literature", "genetics", "programming"]
+WORDS = ["process", "energy", "system", "theory", "cell", "force", "period", "structure",
+         "function", "value", "change", "model", "factor", "element", "result", "source"]
+
+def synthetic_question(i, rng):
+    topic = rng.choice(TOPICS)
+    words = " ".join(rng.choice(WORDS) for _ in range(6))
+    answer = f"{rng.choice(WORDS)} {i}"
+    options = [answer] + [f"{rng.choice(WORDS)} {i + k}" for k in range(1, 4)]
+    return topic, {
+        "question": f"Question {i}: which {words} relates to {topic}?",
+        "options": options,
+        "correct_answer": answer,
+        "question_type": "mcq"
+    }
+
+def populate(db_path, count, rng, batch=50000):
+    conn = question_bank.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.close()
+    start = time.perf_counter()
+    for offset in range(0, count, batch):
+        by_topic = {}
+        for i in range(offset, min(count, offset + batch)):
+            topic, question = synthetic_question(i, rng)
+            by_topic.setdefault(topic, []).append(question)
+        for topic, questions in by_topic.items():
+            question_bank.store_questions(questions, topic=topic,
+                                          source_text=f"Lecture notes about {topic}", db_path=db_path)
+    return time.perf_counter() - start
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run(count, queries, num_questions, seed=1234, db_path=None):
+    rng = random.Random(seed)
+    random.seed(seed)
+    cleanup = db_path is None
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        os.remove(db_path)
+    try:
+        insert_seconds = populate(db_path, count, rng)
+        latencies = []
+        for _ in range(queries):
+            keyword = rng.choice(TOPICS + WORDS)
+            start = time.perf_counter()
+            quiz = question_bank.assemble_quiz(keyword, num_questions, db_path=db_path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert quiz and len(quiz["questions"]) == num_questions
+        return {
+            "questions": question_bank.count_questions(db_path),
+            "insert_seconds": round(insert_seconds, 2),
+            "query_p50_ms": round(percentile(latencies, 50), 3),
+            "query_p99_ms": round(percentile(latencies, 99), 3),
+            "query_max_ms": round(max(latencies), 3),
+            "db_bytes": os.path.getsize(db_path)
+        }
+    finally:
+        if cleanup:
+            for suffix in ["", "-wal", "-shm"]:
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Question bank FTS5 query latency benchmark")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--num-questions", type=int, default=20)
+    parser.add_argument("--db", default=None, help="Keep the populated database at this path")
+    args = parser.parse_args()
+    print(json.dumps(run(args.count, args.queries, args.num_questions, db_path=args.db), indent=4))
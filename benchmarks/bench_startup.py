@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["groq", "PyPDF2", "docx", "pptx", "pandas", "numpy"]
+
+# Runs in a fresh interpreter: render the login page once and report how long it took
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.run()
+elapsed = time.perf_counter() - start
+if at.exception:
+    raise SystemExit(at.exception[0].message)
+print(json.dumps({"first_render_s": elapsed, "loaded": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+# Cold start = new process, nothing imported yet; this is what every replica spin-up pays
+def first_render(repo_dir, workdir):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD, os.path.join(repo_dir, "quiz.py")] + HEAVY_MODULES,
+                         cwd=workdir, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    return dict(json.loads(out.stdout.strip().splitlines()[-1]), process_s=wall)
+
+def run(repeat=5, repo_dir=REPO_DIR):
+    workdir = tempfile.mkdtemp(prefix="quizarena-startup-")
+    try:
+        first_render(repo_dir, workdir)  # warm the OS file cache and .pyc files
+        samples = [first_render(repo_dir, workdir) for _ in range(repeat)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "first_render_s": round(statistics.median(s["first_render_s"] for s in samples), 3),
+        "process_s": round(statistics.median(s["process_s"] for s in samples), 3),
+        "repeat": repeat,
+        "heavy_modules_loaded": samples[-1]["loaded"]
+    }
+
+# Same measurement against the tree at another git revision (e.g. the commit before lazy imports)
+def run_at(rev, repeat=5):
+    tree = tempfile.mkdtemp(prefix="quizarena-rev-")
+    try:
+        archive = subprocess.run(["git", "archive", rev], cwd=REPO_DIR, capture_output=True, check=True).stdout
+        subprocess.run(["tar", "-x", "-C", tree], input=archive, check=True)
+        return run(repeat, tree)
+    finally:
+        shutil.rmtree(tree, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login page time-to-first-render in a fresh process")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compare", metavar="REV", help="Also measure the tree at this git revision")
+    args = parser.parse_args()
+    report = {"current": run(args.repeat)}
+    if args.compare:
+        report[args.compare] = run_at(args.compare, args.repeat)
+    print(json.dumps(report, indent=4))
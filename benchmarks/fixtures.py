@@ -0,0 +1,186 @@
+import io
+import json
+import random
+
+# --- Synthetic datasets, documents and stubs for the benchmarks ---
+CATEGORIES = ["Geography", "Science", "Art", "History", "Literature", "Sports", "Music", "Technology"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+PARAGRAPH = ("Photosynthesis converts light energy into chemical energy inside the chloroplast of plant cells. "
+             "The mitochondria produces ATP through cellular respiration in eukaryotic organisms. "
+             "In 1789 the French Revolution began with the storming of the Bastille in Paris. "
+             "Isaac Newton formulated the laws of motion and universal gravitation in 1687. ")
+
+def trivia_dataframe(rows, seed=0):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    ids = np.arange(rows)
+    answers = pd.Series(ids).map("Answer {}".format)
+    options = answers + "|" + pd.Series(ids + 1).map("Answer {}".format) + "|" \
+        + pd.Series(ids + 2).map("Answer {}".format) + "|" + pd.Series(ids + 3).map("Answer {}".format)
+    return pd.DataFrame({
+        "question": pd.Series(ids).map("Synthetic trivia question number {}?".format),
+        "answer": answers,
+        "options": options,
+        "category": np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), rows)],
+        "difficulty": np.array(DIFFICULTIES)[rng.integers(0, len(DIFFICULTIES), rows)]
+    })
+
+def lobby_quiz(questions=10):
+    return {
+        "quiz_title": "Generated Quiz",
+        "questions": [{"question": f"Question {i}?", "options": ["A", "B", "C", "D"],
+                       "correct_answer": "A", "question_type": "mcq"} for i in range(questions)]
+    }
+
+# Lobbies reference a quiz stored once by id (see lobby_store.store_quiz)
+def lobbies_dict(count, players=10, quiz_id=None, seed=0):
+    rng = random.Random(seed)
+    lobbies = {}
+    for i in range(count):
+        lobby_id = f"L{i:05d}"
+        player_ids = [f"user_{rng.randint(10000, 99999)}" for _ in range(players)]
+        lobbies[lobby_id] = {
+            "id": lobby_id,
+            "name": f"Study Group {i}",
+            "type": "Public",
+            "max_players": players,
+            "players": player_ids,
+            "player_names": [f"Player {p}" for p in range(players)],
+            "host": player_ids[0],
+            "status": "waiting",
+            "quiz_id": quiz_id,
+            "quiz_title": "Generated Quiz" if quiz_id else None,
+            "scores": {p: 0 for p in player_ids},
+            "start_time": None,
+            "chat_messages": [{"username": "Player 0", "message": "hello", "timestamp": "2024-01-01T00:00:00"}],
+            "votes_to_start": {}
+        }
+    return lobbies
+
+# Answer log rows (score_store games/scores tables): games of 20 players x 10 questions in one lobby
+def fill_answer_log(db_path, rows, lobby_id="L00000", players=20, questions=10, seed=0):
+    import score_store
+    rng = random.Random(seed)
+    conn = score_store.connect(db_path)
+    per_game = players * questions
+    with conn:
+        for g in range(max(1, rows // per_game)):
+            game_id = f"g{g:08d}"
+            conn.execute("INSERT OR IGNORE INTO games (id, lobby_id, mode, started_at, finished_at, quiz_id, players) "
+                         "VALUES (?, ?, 'Public', ?, ?, 'Qfixture', ?)", (game_id, lobby_id, 1_700_000_000 + g, 1_700_000_100 + g, players))
+            conn.executemany(score_store.UPSERT_RESULT, [
+                (score_store.score_id(game_id, f"user_{p}", q), f"user_{p}", game_id, q, "A",
+                 int(rng.random() < 0.7), rng.randint(0, 100), rng.randint(500, 20000), 1_700_000_000.0 + g)
+                for p in range(players) for q in range(questions)])
+    conn.close()
+
+# Class roster CSV; every third student has no password so one gets generated
+def roster_csv(students):
+    lines = ["nickname,password,avatar"]
+    lines += [f"Student {i},{'' if i % 3 == 0 else f'pw{i:06d}'},🤓" for i in range(students)]
+    return "\n".join(lines).encode("utf-8")
+
+# Minimal multi-page PDF with one text object per line, readable by PyPDF2
+def pdf_bytes(pages=20, lines_per_page=30):
+    objects = []
+    page_ids = []
+    font_id = 3
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(None)
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    sentences = PARAGRAPH.split(". ")
+    for p in range(pages):
+        lines = [f"({sentences[(p + i) % len(sentences)].strip()[:90]}) Tj 0 -14 Td" for i in range(lines_per_page)]
+        stream = ("BT /F1 10 Tf 40 800 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (content_id, font_id))
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+def docx_bytes(paragraphs=500):
+    import docx
+    document = docx.Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(PARAGRAPH)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+def pptx_bytes(slides=50):
+    from pptx import Presentation
+    from pptx.util import Inches
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]
+    for i in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {i + 1}"
+        slide.placeholders[1].text = PARAGRAPH
+        slide.shapes.add_textbox(Inches(1), Inches(5), Inches(6), Inches(1)).text_frame.text = PARAGRAPH
+    out = io.BytesIO()
+    presentation.save(out)
+    return out.getvalue()
+
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "txt": "text/plain"
+}
+
+# Stand-in for Streamlit's UploadedFile: a fresh stream with a MIME type
+class FakeUpload(io.BytesIO):
+    def __init__(self, data, kind):
+        super().__init__(data)
+        self.type = MIME_TYPES[kind]
+        self.name = f"fixture.{kind}"
+
+# --- Groq stub ---
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+
+class _Completion:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+
+class _Completions:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, messages, model=None, temperature=None, max_tokens=None):
+        self.client.calls += 1
+        return _Completion(json.dumps(self.client.quiz))
+
+class _Chat:
+    def __init__(self, client):
+        self.completions = _Completions(client)
+
+class StubGroq:
+    def __init__(self, num_questions=10):
+        self.calls = 0
+        self.quiz = {
+            "quiz_title": "Stubbed Quiz",
+            "questions": [{"question": f"Stub question {i}?", "options": ["A", "B", "C", "D"],
+                           "correct_answer": "A", "question_type": "mcq"} for i in range(num_questions)]
+        }
+        self.chat = _Chat(self)
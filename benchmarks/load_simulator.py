@@ -0,0 +1,281 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lobby_store
+import game_engine
+import metrics
+import score_store
+
+# --- Multi-lobby load simulator over the real lobby_store and game engine functions ---
+# python benchmarks/load_simulator.py --lobbies 20 --players 8 [--mode process] [--backend sqlite|memory|redis]
+# Process mode stands in for several server replicas sharing one lobby backend.
+QUESTION_TYPES = ["mcq", "true_false", "identification", "enumeration"]
+SIZE_SAMPLE_INTERVAL_S = 0.02
+
+def simulation_quiz(num_questions):
+    questions = []
+    for i in range(num_questions):
+        qtype = QUESTION_TYPES[i % len(QUESTION_TYPES)]
+        question = {"question": f"Simulated question {i}?", "correct_answer": "A", "question_type": qtype}
+        if qtype == "mcq":
+            question["options"] = ["A", "B", "C", "D"]
+        elif qtype == "true_false":
+            question["correct_answer"] = "True"
+        elif qtype == "enumeration":
+            question["correct_answer"] = "A, B, C"
+        questions.append(question)
+    return {"quiz_title": "Load Test Quiz", "questions": questions}
+
+class OpRecorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    # Storage errors (e.g. exhausted conflict retries) are counted, not fatal
+    def timed(self, op, fn, *args):
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception:
+            with self.lock:
+                self.errors[op] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies[op].append(elapsed)
+        return result
+
+def answer_for(question, rng, accuracy):
+    if rng.random() < accuracy:
+        return question["correct_answer"].split(",")[0]
+    return "wrong"
+
+# One simulated lobby: a host plus players as threads on a virtual game clock.
+# Returns what the lobby should contain if no update was lost.
+def run_lobby(index, players, chat_messages, num_questions, accuracy, seed, recorder):
+    rng = random.Random(seed + index)
+    quiz = simulation_quiz(num_questions)
+    host_id = f"user_h{index}"
+    lobby_id = recorder.timed("create_lobby", lobby_store.create_lobby,
+                              f"Load Lobby {index}", "Public", players, host_id, f"Host {index}")
+    expected = {"lobby_id": lobby_id, "host": host_id, "players": 1, "chat_messages": 0, "answers": {host_id: 0}}
+    if lobby_id is None:
+        return expected
+    recorder.timed("set_quiz_data", lobby_store.set_quiz_data, lobby_id, quiz)
+    barrier = threading.Barrier(players)
+    lock = threading.Lock()
+    clock = {"open": 0.0, "deadline": 0.0}
+
+    def player(slot):
+        is_host = slot == 0
+        user_id = host_id if is_host else f"user_{index}_{slot}"
+        username = f"Host {index}" if is_host else f"Player {index}-{slot}"
+        player_rng = random.Random(rng.random())
+        if not is_host:
+            if recorder.timed("join_lobby", lobby_store.join_lobby, lobby_id, user_id, username):
+                with lock:
+                    expected["players"] += 1
+                    expected["answers"][user_id] = 0
+        barrier.wait()
+        for m in range(chat_messages):
+            if recorder.timed("chat", lobby_store.post_chat_message, lobby_id, username, f"message {m}"):
+                with lock:
+                    expected["chat_messages"] += 1
+        if is_host:
+            recorder.timed("start_game", lobby_store.start_game, lobby_id, 0.0)
+            engine = recorder.timed("load_game", lobby_store.load_game, lobby_id)
+            if engine:
+                clock["open"], clock["deadline"] = engine.state.phase_started, engine.state.deadline
+        barrier.wait()
+        accepted = 0
+        for question in quiz["questions"]:
+            answer = answer_for(question, player_rng, accuracy)
+            now = clock["open"] + player_rng.uniform(0, clock["deadline"] - clock["open"])
+            if recorder.timed("submit_answer", lobby_store.submit_answer, lobby_id, user_id, answer, now):
+                accepted += 1
+            barrier.wait()
+            if is_host:
+                # Jump past the deadline and the reveal so the next question opens
+                engine = recorder.timed("advance_game", lobby_store.advance_game, lobby_id,
+                                        clock["deadline"] + game_engine.REVEAL_SECONDS)
+                if engine and engine.state.deadline is not None:
+                    clock["open"], clock["deadline"] = engine.state.phase_started, engine.state.deadline
+            barrier.wait()
+        with lock:
+            if user_id in expected["answers"]:
+                expected["answers"][user_id] += accepted
+
+    threads = [threading.Thread(target=player, args=(slot,)) for slot in range(players)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return expected
+
+def backend_options(backend, workdir, redis_url=None):
+    if backend == "sqlite":
+        return {"path": os.path.join(workdir, "lobbies.db")}
+    if backend == "redis":
+        return {"url": redis_url or "redis://localhost:6379/0", "prefix": f"quizarena-load-{os.getpid()}"}
+    return {}
+
+def _lobby_process(args):
+    index, players, chat_messages, num_questions, accuracy, seed, backend, options, scores_db = args
+    lobby_store.configure_backend(backend, **options)
+    score_store.SCORES_DB = scores_db
+    recorder = OpRecorder()
+    conflicts = conflict_count()
+    expected = run_lobby(index, players, chat_messages, num_questions, accuracy, seed, recorder)
+    return expected, dict(recorder.latencies), dict(recorder.errors), conflict_count() - conflicts
+
+def percentile_ms(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000
+
+# Count what the final backend state lost compared to what every successful call reported
+def count_lost_updates(expected_lobbies, final):
+    lost = {"lobbies": 0, "players": 0, "chat_messages": 0, "answers": 0}
+    for expected in expected_lobbies:
+        lobby_id = expected["lobby_id"]
+        if lobby_id is None:
+            continue
+        lobby = final.get(lobby_id)
+        # A random lobby id collision overwrites another host's lobby
+        if lobby is None or lobby["host"] != expected["host"]:
+            lost["lobbies"] += 1
+            continue
+        lost["players"] += max(0, expected["players"] - len(lobby["players"]))
+        lost["chat_messages"] += max(0, expected["chat_messages"] - len(lobby["chat_messages"]))
+        engine = lobby_store.load_game(lobby_id)
+        players = engine.state.players if engine else {}
+        for user_id, accepted in expected["answers"].items():
+            results = players[user_id].results if user_id in players else []
+            recorded = sum(1 for result in results if result[0] != "Time's up!")
+            lost["answers"] += max(0, accepted - recorded)
+    return lost
+
+# Accepted answers missing from the persistent per-answer log (score_store)
+def count_lost_log_rows(expected_lobbies, scores_db):
+    score_store.flush(scores_db)
+    conn = score_store.connect(scores_db)
+    try:
+        logged = conn.execute("SELECT COUNT(*) FROM scores WHERE answer IS NOT NULL AND answer != ?",
+                              ("Time's up!",)).fetchone()[0]
+    finally:
+        conn.close()
+    accepted = sum(sum(e["answers"].values()) for e in expected_lobbies if e["lobby_id"] is not None)
+    return max(0, accepted - logged)
+
+# The sqlite backend's on-disk footprint: the database file plus its write-ahead log
+def db_size(path):
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+def sample_file_size(path, stop, samples):
+    while not stop.is_set():
+        samples.append(db_size(path))
+        time.sleep(SIZE_SAMPLE_INTERVAL_S)
+
+def conflict_count():
+    return sum(count for name, count in metrics.totals.items() if name.endswith("_conflict"))
+
+def simulate(lobbies=10, players=5, chat_messages=3, num_questions=5, accuracy=0.7,
+             mode="thread", seed=0, workdir=None, backend="sqlite", redis_url=None):
+    if mode == "process" and backend == "memory":
+        raise ValueError("The memory backend can't be shared between processes")
+    workdir = workdir or tempfile.mkdtemp(prefix="quizarena-load-")
+    options = backend_options(backend, workdir, redis_url)
+    lobby_store.configure_backend(backend, **options)
+    scores_db = os.path.join(workdir, "quiz_app.db")
+    original_scores_db = score_store.SCORES_DB
+    score_store.SCORES_DB = scores_db
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    conflicts = conflict_count()
+    lobbies_db = options.get("path")
+    size_before = db_size(lobbies_db) if lobbies_db else 0
+    size_samples = []
+    stop = threading.Event()
+    if lobbies_db:
+        sampler = threading.Thread(target=sample_file_size, args=(lobbies_db, stop, size_samples), daemon=True)
+        sampler.start()
+    start = time.perf_counter()
+    if mode == "process":
+        jobs = [(i, players, chat_messages, num_questions, accuracy, seed, backend, options, scores_db) for i in range(lobbies)]
+        with multiprocessing.Pool(min(lobbies, os.cpu_count() or 1)) as pool:
+            outputs = pool.map(_lobby_process, jobs)
+        expected_lobbies = []
+        conflict_retries = sum(output[3] for output in outputs)
+        for expected, op_latencies, op_errors, _ in outputs:
+            expected_lobbies.append(expected)
+            for op, samples in op_latencies.items():
+                latencies[op].extend(samples)
+            for op, count in op_errors.items():
+                errors[op] += count
+    else:
+        recorder = OpRecorder()
+        expected_lobbies = [None] * lobbies
+        def lobby_thread(i):
+            expected_lobbies[i] = run_lobby(i, players, chat_messages, num_questions, accuracy, seed, recorder)
+        threads = [threading.Thread(target=lobby_thread, args=(i,)) for i in range(lobbies)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        latencies, errors = recorder.latencies, recorder.errors
+        conflict_retries = conflict_count() - conflicts
+    wall = time.perf_counter() - start
+    score_store.SCORES_DB = original_scores_db
+    if lobbies_db:
+        stop.set()
+        sampler.join()
+
+    final = lobby_store.load_lobbies()
+    total_ops = sum(len(samples) for samples in latencies.values())
+    return {
+        "config": {"lobbies": lobbies, "players": players, "chat_messages": chat_messages,
+                   "num_questions": num_questions, "mode": mode, "backend": backend, "seed": seed},
+        "wall_s": round(wall, 3),
+        "throughput_ops_s": round(total_ops / wall, 1) if wall else None,
+        "ops": {op: {"count": len(samples), "errors": errors.get(op, 0),
+                     "p50_ms": round(percentile_ms(samples, 50), 3),
+                     "p99_ms": round(percentile_ms(samples, 99), 3)}
+                for op, samples in sorted(latencies.items()) if samples},
+        "errors": dict(errors),
+        "lost_updates": dict(count_lost_updates(expected_lobbies, final),
+                             answer_log=count_lost_log_rows(expected_lobbies, scores_db)),
+        "conflict_retries": conflict_retries,
+        "final_lobbies": len(final),
+        # lobbies.db + lobbies.db-wal; None for backends without a local file
+        "file_bytes": {
+            "before": size_before,
+            "final": db_size(lobbies_db),
+            "max": max(size_samples, default=0),
+            "growth": db_size(lobbies_db) - size_before
+        } if lobbies_db else None
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate N lobbies x M players against the lobby store")
+    parser.add_argument("--lobbies", type=int, default=10)
+    parser.add_argument("--players", type=int, default=5)
+    parser.add_argument("--chat-messages", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--accuracy", type=float, default=0.7)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--backend", choices=["sqlite", "memory", "redis"], default="sqlite")
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    report = simulate(args.lobbies, args.players, args.chat_messages, args.questions,
+                      args.accuracy, args.mode, args.seed, backend=args.backend, redis_url=args.redis_url)
+    print(json.dumps(report, indent=4))
@@ -0,0 +1,417 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+import fixtures
+
+# --- Headless benchmark suite for quiz.py hot paths ---
+# python benchmarks/run.py [--quick] [--only trivia storage ...] [--output results.json]
+# Compares against benchmarks/baseline.json and exits 1 on regressions that survive a re-run;
+# --update-baseline rewrites it from the best of two runs.
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+TRIVIA_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LOBBY_SIZES = [10, 100, 1_000, 10_000]
+QUICK_TRIVIA_SIZES = [1_000, 10_000]
+QUICK_LOBBY_SIZES = [10, 100, 1_000]
+MIN_SAMPLE_S = 1.0
+MAX_REPEAT = 200
+
+# Function to time fn() `number` times per repeat and report per-call seconds. Slow stretches of a
+# shared CPU last up to a second, so fast cases keep repeating until MIN_SAMPLE_S has passed and
+# min_s comes from outside them.
+def measure(fn, repeat=5, number=1, setup=None):
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeat or (time.perf_counter() - started < MIN_SAMPLE_S and len(samples) < MAX_REPEAT):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "repeat": len(samples),
+        "number": number
+    }
+
+def import_quiz():
+    import quiz
+    from fixtures import StubGroq
+    quiz.session.groq_client = StubGroq()
+    return quiz
+
+def trivia_cases(quiz, sizes, workdir):
+    import trivia_store
+    results = {}
+    for rows in sizes:
+        csv_path = os.path.join(workdir, f"trivia_{rows}.csv")
+        fixtures.trivia_dataframe(rows).to_csv(csv_path, index=False)
+        store_dir = os.path.join(workdir, f"trivia_{rows}.columns")
+        start = time.perf_counter()
+        trivia_store.ingest(csv_path, store_dir)
+        ingest_s = time.perf_counter() - start
+        results[f"trivia_open[{rows}]"] = measure(lambda: trivia_store.TriviaDataset.open(store_dir), repeat=5)
+        results[f"trivia_open[{rows}]"]["ingest_s"] = ingest_s
+        quiz.session.trivia_data = trivia_store.open_dataset(csv_path, store_dir)
+        results[f"generate_trivia_quiz[{rows}]"] = measure(
+            lambda: quiz.generate_trivia_quiz("Science", "Medium", 20), repeat=5)
+        results[f"generate_trivia_quiz_all[{rows}]"] = measure(
+            lambda: quiz.generate_trivia_quiz(None, None, 20), repeat=5)
+    quiz.session.trivia_data = None
+    return results
+
+def scoring_cases(quiz):
+    questions = [
+        ({"correct_answer": "Paris"}, "paris ", "mcq"),
+        ({"correct_answer": "True"}, "False", "true_false"),
+        ({"correct_answer": "Mitochondria"}, "mitochondria", "identification"),
+        ({"correct_answer": "red, blue, yellow"}, "blue", "enumeration")
+    ]
+    def check_all():
+        for question, answer, qtype in questions:
+            quiz.check_answer(question, answer, qtype)
+    def score_all():
+        for t in range(10):
+            quiz.calculate_score(t, True, "mcq")
+            quiz.calculate_score(t, True, "enumeration", 0.5)
+    check = measure(check_all, repeat=5, number=20_000)
+    score = measure(score_all, repeat=5, number=10_000)
+    check["ops_per_s"] = len(questions) / check["median_s"]
+    score["ops_per_s"] = 20 / score["median_s"]
+    return {"check_answer": check, "calculate_score": score}
+
+def extraction_cases(quiz):
+    documents = {
+        "pdf": fixtures.pdf_bytes(),
+        "docx": fixtures.docx_bytes(),
+        "pptx": fixtures.pptx_bytes(),
+        "txt": (fixtures.PARAGRAPH * 2000).encode()
+    }
+    results = {}
+    for kind, data in documents.items():
+        results[f"extract_text_from_file[{kind}]"] = measure(
+            lambda: quiz.extract_text_from_file(fixtures.FakeUpload(data, kind)), repeat=5)
+        results[f"extract_text_from_file[{kind}]"]["bytes"] = len(data)
+    return results
+
+def generation_cases(quiz, workdir):
+    text = quiz.extract_text_from_file(fixtures.FakeUpload((fixtures.PARAGRAPH * 2000).encode(), "txt"))
+    return {
+        "generate_quiz[stubbed_groq]": measure(lambda: quiz.generate_quiz(text, "Multiple Choice", 10, "remote"), repeat=5),
+        "generate_quiz[local]": measure(lambda: quiz.generate_quiz(text, "Mix Mode", 20, "local"), repeat=5)
+    }
+
+def storage_cases(quiz, sizes, workdir):
+    import lobby_store
+    import metrics
+    results = {}
+    for count in sizes:
+        path = os.path.join(workdir, f"lobbies_bench_{count}.db")
+        lobby_store.configure_backend("sqlite", path=path)
+        lobbies = fixtures.lobbies_dict(count, quiz_id=lobby_store.store_quiz(fixtures.lobby_quiz()))
+        repeat = 3 if count >= 10_000 else 5
+        results[f"save_lobbies[{count}]"] = measure(lambda: lobby_store.save_lobbies(lobbies), repeat=repeat)
+        results[f"load_lobbies[{count}]"] = measure(lobby_store.load_lobbies, repeat=repeat)
+        results[f"load_lobbies[{count}]"]["bytes"] = os.path.getsize(path)
+        some_id = next(iter(lobbies))
+        results[f"read_lobby[{count}]"] = measure(lambda: lobby_store.read_lobby(some_id), repeat=5, number=1000)
+        # One playing-page tick: read the small game record, step, write only on transitions
+        lobby_store.start_game(some_id, now=0.0)
+        bytes_before, calls_before = metrics.totals["bytes_read"], metrics.totals["load_game"]
+        results[f"game_tick[{count}]"] = measure(lambda: lobby_store.advance_game(some_id, now=1.0), repeat=5, number=1000)
+        results[f"game_tick[{count}]"]["bytes_per_tick"] = \
+            (metrics.totals["bytes_read"] - bytes_before) // max(1, metrics.totals["load_game"] - calls_before)
+    lobby_store.configure_backend("sqlite", path=os.path.join(workdir, lobby_store.LOBBY_DB))
+    return results
+
+def page_cases(workdir):
+    from streamlit.testing.v1 import AppTest
+    from fixtures import StubGroq
+    import session_record
+    users = {f"Player {i}": {"user_id": f"user_{10000 + i}", "password": "x", "avatar": "🧠",
+                             "score": i * 10, "quizzes_completed": i % 7} for i in range(1000)}
+    with open(os.path.join(workdir, "users.json"), "w") as f:
+        json.dump(users, f)
+    import lobby_store
+    # AppTest runs quiz.py in this process, which points the lobby store at workdir/lobbies.db
+    lobby_store.configure_backend("sqlite", path=os.path.join(workdir, lobby_store.LOBBY_DB))
+    lobbies = fixtures.lobbies_dict(100, quiz_id=lobby_store.store_quiz(fixtures.lobby_quiz()))
+    lobby_store.save_lobbies(lobbies)
+    logged_in = {"is_logged_in": True, "username": "Player 1", "user_id": "user_10001"}
+    pages = {
+        "login": {},
+        "home": dict(logged_in, current_page="home"),
+        "trivia": dict(logged_in, current_page="trivia"),
+        "leaderboards": dict(logged_in, current_page="leaderboards"),
+        "exam_prep": dict(logged_in, current_page="exam_prep"),
+        "lobby_page[host]": dict(logged_in, current_page="lobby_page", current_lobby="L00000",
+                                 user_id=lobbies["L00000"]["host"])
+    }
+    script = os.path.join(REPO_DIR, "quiz.py")
+    results = {}
+    for page, state in pages.items():
+        def render():
+            at = AppTest.from_file(script, default_timeout=60)
+            at.session_state["session"] = session_record.SessionRecord(groq_client=StubGroq(), **state)
+            at.run()
+            if at.exception:
+                raise RuntimeError(f"{page} raised: {at.exception[0].message}")
+        results[f"render[{page}]"] = measure(render, repeat=5)
+    return results
+
+# Instructor exports over a synthetic answer log; peak_mib shows the writer stays chunked
+def history_cases(count, workdir):
+    import tracemalloc
+    import score_store
+    db_path = os.path.join(workdir, f"history_{count}.db")
+    fixtures.fill_answer_log(db_path, count, lobby_id="L00000")
+    results = {}
+    for fmt in ["csv", "parquet"]:
+        out = os.path.join(workdir, f"history.{fmt}")
+        export = lambda: score_store.export_history(out, fmt, lobby_id="L00000", db_path=db_path)
+        case = results[f"export_history[{fmt},{count}]"] = measure(export, repeat=3)
+        tracemalloc.start()
+        export()
+        case["peak_mib"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        tracemalloc.stop()
+        case["bytes"] = os.path.getsize(out)
+    results[f"difficulty_stats[{count}]"] = measure(
+        lambda: score_store.difficulty_stats(lobby_id="L00000", db_path=db_path), repeat=3)
+    return results
+
+# Bulk account import into an existing users file, plus the class lobby
+def roster_cases(students, workdir):
+    import lobby_store
+    import roster
+    lobby_store.configure_backend("sqlite", path=os.path.join(workdir, lobby_store.LOBBY_DB))
+    data = fixtures.roster_csv(students)
+    existing = {f"Existing {i}": {"user_id": f"user_{i:05d}", "password": "", "avatar": "🧠", "score": 0,
+                                  "quizzes_completed": 0} for i in range(1000)}
+    reset = lambda: lobby_store.save_users(existing)
+    case = measure(lambda: roster.import_roster(roster.parse_roster(data), "Bench class", "user_00000", "Existing 0",
+                                                create_lobby=True), repeat=3, setup=reset)
+    case["users_bytes"] = os.path.getsize(lobby_store.USERS_DB)
+    return {f"import_roster[{students}]": case}
+
+# Cross-lobby standings for a 2,000-player round: score updates as reveals land, plus top-10/rank reads
+def tournament_cases(players=2000, questions=10):
+    import tournament
+    rng = random.Random(0)
+    standings = tournament.Standings(questions, {f"p{i}": 0 for i in range(players)})
+    updates = [(f"p{rng.randrange(players)}", rng.choice([0, 100, 150, 200])) for _ in range(10_000)]
+    return {
+        f"standings_update[{players}]": measure(lambda: [standings.add(p, d) for p, d in updates], repeat=3),
+        f"standings_top10[{players}]": measure(lambda: standings.top(10), repeat=5, number=1000),
+        f"standings_rank[{players}]": measure(lambda: standings.rank("p0"), repeat=5, number=10_000),
+        f"sorted_top10[{players}]": measure(lambda: sorted(standings.scores.items(), key=lambda item: -item[1])[:10],
+                                            repeat=5, number=100)
+    }
+
+def startup_cases():
+    import bench_startup
+    stats = bench_startup.run(repeat=5)
+    return {"startup[login_first_render]": {
+        "median_s": stats["first_render_s"],
+        "process_s": stats["process_s"],
+        "heavy_modules_loaded": len(stats["heavy_modules_loaded"])
+    }}
+
+def question_bank_cases(count):
+    import bench_question_bank
+    stats = bench_question_bank.run(count, queries=100, num_questions=20)
+    return {f"question_bank_query[{count}]": {
+        "median_s": stats["query_p50_ms"] / 1000,
+        "p99_s": stats["query_p99_ms"] / 1000,
+        "insert_s": stats["insert_seconds"]
+    }}
+
+def load_cases(lobbies, players):
+    import load_simulator
+    report = load_simulator.simulate(lobbies, players, chat_messages=3, num_questions=5, workdir=os.getcwd())
+    return {f"load_simulation[{lobbies}x{players}]": {
+        "median_s": report["wall_s"],
+        "throughput_ops_s": report["throughput_ops_s"],
+        "errors": sum(report["errors"].values()),
+        "lost_updates": report["lost_updates"],
+        "conflict_retries": report["conflict_retries"],
+        "file_bytes": report["file_bytes"]
+    }}
+
+def engine_cases(games):
+    import bench_game_engine
+    import game_engine
+    import ghost_replay
+    stats = bench_game_engine.run(games, players=8, num_questions=10)
+    # Host dashboard read for a 100-player lobby with everyone answered; counters, not a player scan
+    engine = game_engine.GameEngine(fixtures.lobby_quiz(), [(f"p{i}", f"Player {i}") for i in range(100)])
+    engine.start(now=0.0)
+    for i in range(100):
+        engine.submit(f"p{i}", "ABCD"[i % 4], now=1.0)
+    # Ghost race view over that lobby's recording: everything it reads was precomputed at load
+    revealed = game_engine.GameEngine.from_dict(fixtures.lobby_quiz(), engine.to_dict())
+    revealed.step(now=1.0)
+    ghost = ghost_replay.GhostReplay(ghost_replay.record(revealed, "Q"))
+    return {
+        f"game_engine[{games}x8]": {
+            "median_s": stats["wall_s"],
+            "submissions_per_s": stats["submissions_per_s"],
+            "bytes_per_game": stats["bytes_per_game"]
+        },
+        "answer_summary[100]": measure(engine.answer_summary, repeat=5, number=10_000),
+        "ghost_panel[100]": measure(lambda: (ghost.answered_by(0, 1500), ghost.scores_after(0)), repeat=5, number=10_000)
+    }
+
+def run_suite(quick=False, only=None):
+    workdir = tempfile.mkdtemp(prefix="quizarena-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        quiz = import_quiz()
+        groups = {
+            "trivia": lambda: trivia_cases(quiz, QUICK_TRIVIA_SIZES if quick else TRIVIA_SIZES, workdir),
+            "scoring": lambda: scoring_cases(quiz),
+            "extraction": lambda: extraction_cases(quiz),
+            "generation": lambda: generation_cases(quiz, workdir),
+            "storage": lambda: storage_cases(quiz, QUICK_LOBBY_SIZES if quick else LOBBY_SIZES, workdir),
+            "pages": lambda: page_cases(workdir),
+            "startup": startup_cases,
+            "roster": lambda: roster_cases(1000 if quick else 5000, workdir),
+            "tournament": tournament_cases,
+            "history": lambda: history_cases(100_000 if quick else 1_000_000, workdir),
+            "question_bank": lambda: question_bank_cases(10_000 if quick else 100_000),
+            "engine": lambda: engine_cases(500 if quick else 2000),
+            "load": lambda: load_cases(10 if quick else 50, 5 if quick else 10)
+        }
+        results = {}
+        for name, run_group in groups.items():
+            if only and name not in only:
+                continue
+            print(f"running {name}...", file=sys.stderr)
+            for case_name, case in run_group().items():
+                results[case_name] = dict(case, group=name)
+        return results
+    finally:
+        forget_databases()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+# The stores remember which (relative) db paths they already created tables in, so a second run_suite
+# in this process would skip creating them in its fresh workdir
+def forget_databases():
+    import question_bank
+    import score_store
+    import trivia_sampler
+    score_store.flush()
+    for module in (question_bank, score_store, trivia_sampler):
+        module._initialized_dbs.clear()
+
+# AppTest renders (GC, imports, Streamlit's script thread) and one-shot timings with no repeats to
+# take a min over swing by 50%+ between identical runs, so they get a wider tolerance
+NOISY_CASES = ("render[",)
+NOISY_TOLERANCE = 0.8
+
+# The fastest repeat is the least disturbed by the machine; one-shot cases only have a median
+def case_time(case):
+    return case.get("min_s", case["median_s"])
+
+def is_noisy(name, case):
+    return name.startswith(NOISY_CASES) or "min_s" not in case
+
+# Function to keep the faster measurement of each case from two runs
+def keep_faster(results, rerun):
+    merged = dict(results)
+    for name, case in rerun.items():
+        if name not in merged or case_time(case) < case_time(merged[name]):
+            merged[name] = case
+    return merged
+
+# Function to flag cases that got slower than the baseline by more than `tolerance`
+def compare(results, baseline, tolerance):
+    rows = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            rows.append((name, None, case_time(current), None, "new"))
+            continue
+        allowed = max(tolerance, NOISY_TOLERANCE) if is_noisy(name, current) else tolerance
+        ratio = case_time(current) / case_time(previous) if case_time(previous) else float("inf")
+        status = "REGRESSION" if ratio > 1 + allowed else ("improved" if ratio < 1 - allowed else "ok")
+        rows.append((name, case_time(previous), case_time(current), ratio, status))
+    return rows
+
+def print_comparison(rows):
+    print(f"{'case':48} {'baseline':>12} {'current':>12} {'ratio':>7}  status", file=sys.stderr)
+    for name, previous, current, ratio, status in rows:
+        prev = f"{previous * 1000:10.3f}ms" if previous is not None else f"{'-':>12}"
+        rat = f"{ratio:7.2f}" if ratio is not None else f"{'-':>7}"
+        print(f"{name:48} {prev} {current * 1000:10.3f}ms {rat}  {status}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="QuizArena benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Use smaller dataset sizes")
+    parser.add_argument("--only", nargs="*", help="Run only these groups")
+    parser.add_argument("--output", default=None, help="Write JSON results to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.4)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run_suite(args.quick, args.only)
+    baseline = None
+    if args.update_baseline:
+        # Best of two runs, so one slow stretch of a shared machine doesn't become the bar
+        results = keep_faster(results, run_suite(args.quick, args.only))
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # Re-run groups that look slower once; a real regression is slow both times
+        slower = {results[row[0]]["group"] for row in compare(results, baseline, args.tolerance)
+                  if row[4] == "REGRESSION"}
+        if slower:
+            print(f"re-running {', '.join(sorted(slower))} to confirm...", file=sys.stderr)
+            results = keep_faster(results, run_suite(args.quick, slower))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick
+        },
+        "results": results
+    }
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(output)
+        return 0
+    if baseline:
+        rows = compare(results, baseline, args.tolerance)
+        print_comparison(rows)
+        if any(row[4] == "REGRESSION" for row in rows):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import json
+import os
+import re
+import shutil
+import numpy as np
+
+from question_bank import normalize_text
+
+# --- Near-duplicate detection (MinHash + LSH) ---
+# Shingles are SHINGLE_SIZE-byte windows of the normalized UTF-8 text, hashed for a whole batch of
+# texts at once with numpy. Texts whose numbers differ never share an LSH bucket, so rows such as
+# "What is 7 x 8? 56" and "What is 7 x 9? 63" are never merged however similar the rest is.
+NUM_PERM = 128
+SHINGLE_SIZE = 4
+INDEX_VERSION = 3
+SHINGLE_BASE = np.uint64(257)
+MIX = np.uint64(0x9E3779B97F4A7C15)
+SHIFT = np.uint64(32)
+
+# Function to list the numbers in a text in order; they must match exactly for two texts to merge
+def number_key(text):
+    return " ".join(re.findall(r"\d+", normalize_text(text)))
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        # Multiply-shift hashing: (a * x + b) >> 32 with odd 64-bit a, for 32-bit shingle hashes x
+        self.a = rng.randint(0, 2**63 - 1, size=num_perm, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.randint(0, 2**63 - 1, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.powers = SHINGLE_BASE ** np.arange(shingle_size - 1, -1, -1, dtype=np.uint64)
+
+    # 32-bit hashes of every shingle of every text, plus the text each one belongs to
+    def shingle_hashes(self, texts):
+        k = self.shingle_size
+        encoded = [normalize_text(text).encode("utf-8") for text in texts]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        starts = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=starts[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        if len(data) >= k:
+            windows = np.lib.stride_tricks.sliding_window_view(data, k)
+            positions = np.arange(len(windows))
+            owner = np.searchsorted(starts, positions, side="right") - 1
+            valid = positions + k <= starts[owner + 1]
+            hashes = windows[valid].astype(np.uint64) @ self.powers
+            owner = owner[valid]
+        else:
+            hashes, owner = np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+        # Texts shorter than one shingle are a single shingle of the whole text
+        short = np.flatnonzero(lengths < k)
+        if len(short):
+            padded = [encoded[i].ljust(k, b"\0") for i in short]
+            short_hashes = np.frombuffer(b"".join(padded), dtype=np.uint8).reshape(-1, k).astype(np.uint64) @ self.powers
+            hashes = np.concatenate([hashes, short_hashes])
+            owner = np.concatenate([owner, short])
+            order = np.argsort(owner, kind="stable")
+            hashes, owner = hashes[order], owner[order]
+        return (hashes * MIX) >> SHIFT, owner
+
+    # Function to compute the (len(texts), num_perm) signature matrix, one in-place pass over all
+    # shingles per permutation
+    def signatures(self, texts):
+        hashes, owner = self.shingle_hashes(texts)
+        signatures = np.empty((self.num_perm, len(texts)), dtype=np.uint32)
+        if not len(texts):
+            return signatures.T
+        segments = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+        values = np.empty_like(hashes)
+        for perm in range(self.num_perm):
+            np.multiply(hashes, self.a[perm], out=values)
+            values += self.b[perm]
+            values >>= SHIFT
+            signatures[perm] = np.minimum.reduceat(values, segments)
+        return np.ascontiguousarray(signatures.T)
+
+    def signature(self, text):
+        return self.signatures([text])[0]
+
+def jaccard_estimate(sig_a, sig_b):
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+# Pick bands x rows so the LSH S-curve crosses 50% near the threshold
+def optimal_bands(threshold, num_perm):
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        crossing = (1.0 / bands) ** (1.0 / rows)
+        error = abs(crossing - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+class LSHIndex:
+    def __init__(self, threshold=0.8, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=1):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.signatures = {}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _band_keys(self, signature, numbers):
+        prefix = numbers.encode() + b"|"
+        for band in range(self.bands):
+            yield band, prefix + signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def insert(self, key, signature, numbers=""):
+        self.signatures[key] = signature
+        for band, band_key in self._band_keys(signature, numbers):
+            self.buckets[band].setdefault(band_key, []).append(key)
+
+    # Only keys sharing at least one band bucket (and so the same numbers) are compared
+    def query(self, signature, numbers=""):
+        candidates = set()
+        for band, band_key in self._band_keys(signature, numbers):
+            candidates.update(self.buckets[band].get(band_key, ()))
+        matches = []
+        for key in candidates:
+            similarity = jaccard_estimate(signature, self.signatures[key])
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda m: -m[1])
+
+    # Function to insert a signature unless a near-duplicate is already indexed
+    def add_signature_if_new(self, key, signature, numbers=""):
+        if self.query(signature, numbers):
+            return False
+        self.insert(key, signature, numbers)
+        return True
+
+    def add_if_new(self, key, text):
+        return self.add_signature_if_new(key, self.hasher.signature(text), number_key(text))
+
+# Function to drop paraphrased duplicates from a generated quiz
+def dedupe_questions(questions, threshold=0.8):
+    index = LSHIndex(threshold)
+    texts = [f"{question.get('question', '')} {question.get('correct_answer', '')}" for question in questions]
+    signatures = index.hasher.signatures(texts)
+    return [question for i, (question, text) in enumerate(zip(questions, texts))
+            if index.add_signature_if_new(i, signatures[i], number_key(text))]
+
+def file_fingerprint(path, threshold):
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns, threshold]
+
+# The saved index is a directory: meta.json, keep.npy (kept row positions), and for the kept rows
+# keys.npy (text hashes) and signatures.npy (MinHash rows), written to a temporary directory and
+# renamed into place. keep.npy answers an unchanged source; keys/signatures rebuild the LSH index when
+# it changes, so only rows whose text is new are hashed and checked.
+def save_index(index_path, fingerprint, keep, keys, signatures):
+    tmp_path = f"{index_path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "keep.npy"), keep)
+    np.save(os.path.join(tmp_path, "keys.npy"), keys)
+    np.save(os.path.join(tmp_path, "signatures.npy"), signatures)
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({"version": INDEX_VERSION, "fingerprint": fingerprint}, f)
+    if os.path.isdir(index_path):
+        shutil.rmtree(index_path, ignore_errors=True)
+    elif os.path.exists(index_path):
+        os.remove(index_path)  # pickled index from INDEX_VERSION 1
+    os.replace(tmp_path, index_path)
+
+# The saved meta and arrays (loaded lazily, memory-mapped), or None when there is no usable index
+def load_index(index_path):
+    try:
+        with open(os.path.join(index_path, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != INDEX_VERSION:
+        return None
+    meta["path"] = index_path
+    return meta
+
+def load_array(index, name):
+    path = os.path.join(index["path"], f"{name}.npy")
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:  # zero-length arrays can't be mapped
+        return np.load(path)
+
+def text_keys(texts):
+    import pandas as pd
+    return pd.util.hash_pandas_object(pd.Series(texts, dtype=object), index=False).to_numpy()
+
+# Function to drop near-identical dataset rows. An unchanged source reuses the saved kept rows as is;
+# a changed one seeds the LSH index with the saved signatures of rows whose text is still present,
+# and only the remaining rows are hashed and checked against it.
+def dedupe_dataframe(df, source_path, index_path, threshold=0.9, text_columns=("question", "answer")):
+    fingerprint = file_fingerprint(source_path, threshold)
+    saved = load_index(index_path)
+    try:
+        if saved and saved["fingerprint"] == fingerprint:
+            keep = np.asarray(load_array(saved, "keep"))
+            if len(keep) == 0 or keep[-1] < len(df):
+                return df.iloc[keep]
+        # Signatures only carry over between runs with the same threshold (the last fingerprint field)
+        reuse = saved is not None and saved["fingerprint"][-1] == threshold
+        saved_keys = load_array(saved, "keys") if reuse else None
+        saved_signatures = load_array(saved, "signatures") if reuse else None
+    except (OSError, ValueError):
+        saved_keys = saved_signatures = None
+    index = LSHIndex(threshold)
+    columns = [c for c in text_columns if c in df.columns]
+    texts = [" ".join(values) for values in zip(*(df[c].astype(str).tolist() for c in columns))]
+    keys = text_keys(texts)
+    signatures = np.empty((len(texts), index.hasher.num_perm), dtype=np.uint32)
+    new_rows = np.arange(len(texts))
+    if saved_keys is not None and len(saved_keys):
+        # First row with each saved text takes that text's signature and stays kept
+        order = np.argsort(saved_keys, kind="stable")
+        pos = np.minimum(np.searchsorted(saved_keys, keys, sorter=order), len(saved_keys) - 1)
+        found = saved_keys[order[pos]] == keys
+        _, first = np.unique(keys, return_index=True)
+        reused = np.zeros(len(texts), dtype=bool)
+        reused[first] = True
+        reused &= found
+        signatures[reused] = saved_signatures[order[pos[reused]]]
+        for i in np.flatnonzero(reused):
+            index.insert(int(i), signatures[i], number_key(texts[i]))
+        new_rows = np.flatnonzero(~reused)
+    signatures[new_rows] = index.hasher.signatures([texts[i] for i in new_rows])
+    for i in new_rows:
+        index.add_signature_if_new(int(i), signatures[i], number_key(texts[i]))
+    keep = np.array(sorted(index.signatures), dtype=np.int64)
+    save_index(index_path, fingerprint, keep, keys[keep], signatures[keep])
+    return df.iloc[keep]
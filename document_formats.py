@@ -0,0 +1,39 @@
+import io
+
+# --- Uploaded document formats ---
+# MIME type -> extractor(bytes) -> text. Each parser library is imported the first time its
+# format is uploaded, so starting the app doesn't pay for PyPDF2/python-docx/python-pptx.
+FORMATS = {}
+
+def register(mime_type):
+    def wrap(extractor):
+        FORMATS[mime_type] = extractor
+        return extractor
+    return wrap
+
+@register("text/plain")
+def extract_txt(data):
+    return str(data, "utf-8")
+
+@register("application/pdf")
+def extract_pdf(data):
+    import PyPDF2
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return "".join(page.extract_text() + "\n" for page in pdf_reader.pages)
+
+@register("application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+def extract_docx(data):
+    import docx
+    doc = docx.Document(io.BytesIO(data))
+    return "".join(para.text + "\n" for para in doc.paragraphs)
+
+@register("application/vnd.openxmlformats-officedocument.presentationml.presentation")
+def extract_pptx(data):
+    from pptx import Presentation
+    prs = Presentation(io.BytesIO(data))
+    return "".join(shape.text + "\n" for slide in prs.slides for shape in slide.shapes if hasattr(shape, "text"))
+
+# Unknown types give "" like the original if/elif chain did
+def extract_text(data, mime_type):
+    extractor = FORMATS.get(mime_type)
+    return extractor(data) if extractor else ""
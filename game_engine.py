@@ -0,0 +1,338 @@
+import time
+import uuid
+
+from scoring import check_answer, calculate_score
+
+# --- Headless game state machine ---
+# Timestamps are wall-clock seconds (time.time) so a game record shared through the lobby backend reads the same
+# on every replica; replicas are expected to keep their clocks in sync (NTP).
+# Submissions are stamped on receipt and timed in whole milliseconds from the question opening.
+WAITING = "waiting"
+QUESTION = "question"
+REVEAL = "reveal"
+FINISHED = "finished"
+REVEAL_SECONDS = 3
+# A player counts as connected while their page has checked in within PRESENCE_TIMEOUT_S;
+# check-ins are only persisted every PRESENCE_INTERVAL_S so ticks stay read-only.
+PRESENCE_INTERVAL_S = 4
+PRESENCE_TIMEOUT_S = 10
+# Free-text answers beyond this many distinct values are counted under "Other"
+TALLY_MAX_LABELS = 10
+OTHER_LABEL = "Other"
+# Answer recorded for players who didn't submit before the deadline
+TIMED_OUT = "Time's up!"
+
+# Set dynamic time limit based on question type
+def question_time_limit(question):
+    if question["question_type"] in ["identification", "enumeration"]:
+        answer_length = len(question.get("correct_answer", ""))
+        return min(15, max(10, 10 + answer_length // 5))  # 10-15 seconds
+    return 10
+
+class PlayerState:
+    __slots__ = ("player_id", "name", "score", "streak", "answer", "answered_at", "time_taken_ms", "last_seen", "results",
+                 "answer_correct")
+
+    def __init__(self, player_id, name, score=0, streak=0, answer=None, answered_at=None, time_taken_ms=None,
+                 last_seen=None, results=None, answer_correct=None):
+        self.player_id = player_id
+        self.name = name
+        self.score = score
+        self.streak = streak
+        self.answer = answer
+        self.answered_at = answered_at
+        self.time_taken_ms = time_taken_ms
+        self.last_seen = last_seen
+        self.answer_correct = answer_correct  # checked on submission, reused by the reveal
+        # One (answer, is_correct, points, time_taken_seconds) tuple per revealed question
+        self.results = results if results is not None else []
+
+    def to_dict(self):
+        return {"name": self.name, "score": self.score, "streak": self.streak, "answer": self.answer,
+                "answered_at": self.answered_at, "time_taken_ms": self.time_taken_ms, "last_seen": self.last_seen,
+                "answer_correct": self.answer_correct, "results": [list(r) for r in self.results]}
+
+    @classmethod
+    def from_dict(cls, player_id, data):
+        return cls(player_id, data["name"], data["score"], data["streak"], data["answer"],
+                   data["answered_at"], data.get("time_taken_ms"), data.get("last_seen"), [tuple(r) for r in data["results"]],
+                   data.get("answer_correct"))
+
+# The label an answer is counted under; submissions and the option list both go through it
+def tally_label(answer):
+    return str(answer).strip()
+
+# Running totals for the open question, updated on each accepted submission (never by rescanning players)
+class AnswerTally:
+    __slots__ = ("counts", "correct", "time_ms")
+
+    def __init__(self, counts=None, correct=0, time_ms=0):
+        self.counts = counts if counts is not None else {}
+        self.correct = correct
+        self.time_ms = time_ms
+
+    def add(self, label, is_correct, time_ms):
+        if label not in self.counts and len(self.counts) >= TALLY_MAX_LABELS:
+            label = OTHER_LABEL
+        self.counts[label] = self.counts.get(label, 0) + 1
+        self.correct += int(bool(is_correct))
+        self.time_ms += time_ms
+
+    def to_dict(self):
+        return {"counts": self.counts, "correct": self.correct, "time_ms": self.time_ms}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(dict(data["counts"]), data["correct"], data["time_ms"]) if data else cls()
+
+class GameState:
+    __slots__ = ("game_id", "phase", "question_index", "phase_started", "deadline", "version", "players", "answered",
+                 "tally")
+
+    def __init__(self, phase=WAITING, question_index=0, phase_started=None, deadline=None, version=0, players=None,
+                 game_id=None, answered=0, tally=None):
+        self.game_id = game_id or uuid.uuid4().hex[:12]
+        self.answered = answered
+        self.tally = tally or AnswerTally()
+        self.phase = phase
+        self.question_index = question_index
+        self.phase_started = phase_started
+        self.deadline = deadline
+        self.version = version
+        self.players = players if players is not None else {}
+
+class GameEngine:
+    __slots__ = ("questions", "state", "clock", "reveal_seconds")
+
+    def __init__(self, quiz_data, players=(), clock=time.time, reveal_seconds=REVEAL_SECONDS, state=None):
+        self.questions = quiz_data["questions"]
+        self.clock = clock
+        self.reveal_seconds = reveal_seconds
+        self.state = state or GameState()
+        for player_id, name in players:
+            self.add_player(player_id, name)
+
+    def _now(self, now):
+        return self.clock() if now is None else now
+
+    # --- Queries used by the views ---
+    @property
+    def phase(self):
+        return self.state.phase
+
+    @property
+    def game_id(self):
+        return self.state.game_id
+
+    @property
+    def version(self):
+        return self.state.version
+
+    def current_question(self):
+        if self.state.phase in [QUESTION, REVEAL]:
+            return self.questions[self.state.question_index]
+        return None
+
+    def time_remaining(self, now=None):
+        if self.state.deadline is None:
+            return 0
+        return max(0.0, self.state.deadline - self._now(now))
+
+    def player(self, player_id):
+        return self.state.players.get(player_id)
+
+    def standings(self):
+        return sorted(self.state.players.values(), key=lambda p: -p.score)
+
+    def is_connected(self, player, now=None):
+        return player.last_seen is not None and self._now(now) - player.last_seen <= PRESENCE_TIMEOUT_S
+
+    # The answered count is kept incrementally, so the common "everyone answered" case needs no scan
+    def all_answered(self, now=None):
+        state = self.state
+        if state.phase != QUESTION or state.answered == 0:
+            return False
+        if state.answered >= len(state.players):
+            return True
+        now = self._now(now)
+        return not any(p.answered_at is None and self.is_connected(p, now) for p in state.players.values())
+
+    # Live answer distribution for the open question, read straight from the counters.
+    # Choice questions list every option (zeros included) in display order.
+    def answer_summary(self):
+        state = self.state
+        question = self.current_question()
+        tally = state.tally
+        counts = dict(tally.counts)
+        if question is not None and question["question_type"] == "mcq":
+            labels = [tally_label(option) for option in question.get("options", [])]
+        elif question is not None and question["question_type"] == "true_false":
+            labels = ["True", "False"]
+        else:
+            labels = []
+        distribution = [(label, counts.pop(label, 0)) for label in labels]
+        distribution += sorted(counts.items(), key=lambda item: -item[1])
+        return {
+            "question_index": state.question_index,
+            "answered": state.answered,
+            "players": len(state.players),
+            "distribution": distribution,
+            "correct_pct": 100 * tally.correct / state.answered if state.answered else None,
+            "avg_time_ms": tally.time_ms / state.answered if state.answered else None
+        }
+
+    # --- Commands ---
+    def add_player(self, player_id, name):
+        if player_id not in self.state.players:
+            self.state.players[player_id] = PlayerState(player_id, name)
+            self.state.version += 1
+
+    def start(self, now=None):
+        if self.state.phase != WAITING:
+            return []
+        now = self._now(now)
+        for player in self.state.players.values():
+            player.last_seen = now
+        return self._open_question(0, now)
+
+    # Record that a player's page is still polling; only bumps the version (and so a write) every few seconds.
+    # Presence only decides early reveals, so check-ins outside an open question change nothing.
+    def touch(self, player_id, now=None):
+        if self.state.phase != QUESTION:
+            return False
+        now = self._now(now)
+        player = self.state.players.get(player_id)
+        if player is None or (player.last_seen is not None and now - player.last_seen < PRESENCE_INTERVAL_S):
+            return False
+        player.last_seen = now
+        self.state.version += 1
+        return True
+
+    # Answers are only accepted once per player and before the question deadline
+    def submit(self, player_id, answer, now=None):
+        now = self._now(now)
+        player = self.state.players.get(player_id)
+        if self.state.phase != QUESTION or player is None or player.answered_at is not None:
+            return False
+        if now > self.state.deadline:
+            return False
+        player.answer = answer
+        player.answered_at = now
+        player.time_taken_ms = round((now - self.state.phase_started) * 1000)
+        player.last_seen = now
+        question = self.questions[self.state.question_index]
+        player.answer_correct = check_answer(question, answer, question["question_type"])
+        self.state.tally.add(tally_label(answer), player.answer_correct, player.time_taken_ms)
+        self.state.answered += 1
+        self.state.version += 1
+        return True
+
+    # Advance through every transition that is due; late callers catch up on the shared timeline.
+    # A question is revealed early, at the last answer's time, once every connected player has answered.
+    def step(self, now=None):
+        now = self._now(now)
+        events = []
+        while self.state.deadline is not None:
+            if self.all_answered(now):
+                events += self._reveal(self._early_reveal_time())
+            elif now < self.state.deadline:
+                break
+            elif self.state.phase == QUESTION:
+                events += self._reveal(self.state.deadline)
+            elif self.state.phase == REVEAL:
+                events += self._open_question(self.state.question_index + 1, self.state.deadline)
+            else:
+                break
+        return events
+
+    def handle(self, event, now=None):
+        kind = event["type"]
+        if kind == "start":
+            return self.start(now)
+        if kind == "submit":
+            accepted = self.submit(event["player_id"], event["answer"], now)
+            return [("accepted" if accepted else "rejected", event["player_id"])] + self.step(now)
+        if kind == "tick":
+            if event.get("player_id"):
+                self.touch(event["player_id"], now)
+            return self.step(now)
+        raise ValueError(f"Unknown game event: {kind}")
+
+    # The last answer, or the moment the last silent player dropped out, whichever came later
+    def _early_reveal_time(self):
+        times = []
+        for player in self.state.players.values():
+            if player.answered_at is not None:
+                times.append(player.answered_at)
+            elif player.last_seen is not None:
+                times.append(player.last_seen + PRESENCE_TIMEOUT_S)
+        return min(max(times), self.state.deadline)
+
+    # --- Transitions ---
+    def _open_question(self, index, now):
+        state = self.state
+        state.version += 1
+        if index >= len(self.questions):
+            state.phase = FINISHED
+            state.phase_started = now
+            state.deadline = None
+            return [("finished", index)]
+        state.phase = QUESTION
+        state.question_index = index
+        state.phase_started = now
+        state.deadline = now + question_time_limit(self.questions[index])
+        state.answered = 0
+        state.tally = AnswerTally()
+        for player in state.players.values():
+            player.answer = None
+            player.answered_at = None
+            player.time_taken_ms = None
+            player.answer_correct = None
+        return [("question", index)]
+
+    def _reveal(self, now):
+        state = self.state
+        question = self.questions[state.question_index]
+        limit = question_time_limit(question)
+        for player in state.players.values():
+            if player.time_taken_ms is None:
+                answer, time_taken = TIMED_OUT, limit
+                is_correct = check_answer(question, answer, question["question_type"])
+            else:
+                answer, time_taken = player.answer, player.time_taken_ms / 1000
+                is_correct = player.answer_correct
+                if is_correct is None:  # submitted before correctness was stored
+                    is_correct = check_answer(question, answer, question["question_type"])
+            points = calculate_score(time_taken, is_correct, question["question_type"])
+            player.score += points
+            player.streak = player.streak + 1 if is_correct else 0
+            player.results.append((answer, is_correct, points, time_taken))
+        state.phase = REVEAL
+        state.phase_started = now
+        state.deadline = now + self.reveal_seconds
+        state.version += 1
+        return [("reveal", state.question_index)]
+
+    # --- Persistence ---
+    def to_dict(self):
+        state = self.state
+        return {
+            "game_id": state.game_id,
+            "phase": state.phase,
+            "question_index": state.question_index,
+            "phase_started": state.phase_started,
+            "deadline": state.deadline,
+            "version": state.version,
+            "answered": state.answered,
+            "tally": state.tally.to_dict(),
+            "reveal_seconds": self.reveal_seconds,
+            "players": {pid: p.to_dict() for pid, p in state.players.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, quiz_data, data, clock=time.time):
+        players = {pid: PlayerState.from_dict(pid, p) for pid, p in data["players"].items()}
+        state = GameState(data["phase"], data["question_index"], data["phase_started"],
+                          data["deadline"], data["version"], players, data.get("game_id"), data.get("answered", 0),
+                          AnswerTally.from_dict(data.get("tally")))
+        return cls(quiz_data, clock=clock, reveal_seconds=data.get("reveal_seconds", REVEAL_SECONDS), state=state)
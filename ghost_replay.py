@@ -0,0 +1,62 @@
+import bisect
+import itertools
+
+from game_engine import TIMED_OUT
+
+# --- Ghost games: replay a finished lobby game instead of playing it live ---
+# When a lobby game finishes, every player's answers, millisecond timings and points are kept as a
+# compact timeline (parallel per-question lists). Later players run an ordinary solo engine and
+# the recorded players are replayed beside them from that timeline, so a ghost game costs the
+# server one read at the start and one write at the end, with nothing to poll in between.
+
+# Function to build the timeline of a finished game; times_ms is None where the player ran out of time
+def record(engine, quiz_id, lobby_id=None):
+    players = {}
+    for player_id, player in engine.state.players.items():
+        answers = [str(answer) for answer, _, _, _ in player.results]
+        players[player_id] = {
+            "name": player.name,
+            "answers": answers,
+            "times_ms": [None if answer == TIMED_OUT else round(time_taken * 1000)
+                         for answer, (_, _, _, time_taken) in zip(answers, player.results)],
+            "points": [int(points) for _, _, points, _ in player.results]
+        }
+    return {"game_id": engine.game_id, "quiz_id": quiz_id, "lobby_id": lobby_id, "players": players, "runs": {}}
+
+# Read-only view over a timeline; built once per ghost game and kept in the session
+class GhostReplay:
+    __slots__ = ("game_id", "quiz_id", "lobby_id", "names", "totals", "answer_times")
+
+    def __init__(self, timeline):
+        self.game_id = timeline["game_id"]
+        self.quiz_id = timeline["quiz_id"]
+        self.lobby_id = timeline.get("lobby_id")
+        players = list(timeline["players"].values())
+        self.names = [p["name"] for p in players]
+        # totals[i][q] is player i's score after question q
+        self.totals = [list(itertools.accumulate(p["points"])) for p in players]
+        questions = max((len(p["times_ms"]) for p in players), default=0)
+        # Sorted answer times per question, so "answered by now" is a bisect
+        self.answer_times = [sorted(p["times_ms"][q] for p in players
+                                    if q < len(p["times_ms"]) and p["times_ms"][q] is not None)
+                             for q in range(questions)]
+
+    def __len__(self):
+        return len(self.names)
+
+    # How many recorded players had answered question_index elapsed_ms into it
+    def answered_by(self, question_index, elapsed_ms):
+        if question_index >= len(self.answer_times):
+            return 0
+        return bisect.bisect_right(self.answer_times[question_index], elapsed_ms)
+
+    # (name, score) for each recorded player once question_index has been revealed (-1 = before any)
+    def scores_after(self, question_index):
+        return [(name, totals[min(question_index, len(totals) - 1)] if totals and question_index >= 0 else 0)
+                for name, totals in zip(self.names, self.totals)]
+
+# Recorded players' final scores plus every ghost run, best first: (name, score, is_ghost_run)
+def ranking(timeline):
+    rows = [(p["name"], sum(p["points"]), False) for p in timeline["players"].values()]
+    rows += [(run["name"], run["score"], True) for run in timeline.get("runs", {}).values()]
+    return sorted(rows, key=lambda row: -row[1])
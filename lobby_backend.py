@@ -0,0 +1,259 @@
+import json
+import sqlite3
+import threading
+import time
+
+import metrics
+
+# --- Lobby state backends ---
+# Every record (lobby, game, quiz, replay, tournament) is stored as one JSON document with a version number. Writers pass
+# the version they read; a mismatch raises ConflictError and update() re-reads and retries.
+# Each namespace ("lobby", "game", "quiz", "replay", "tournament") is a separate table/keyspace so records stay independent.
+UPDATE_RETRIES = 50
+POLL_INTERVAL_S = 0.05
+
+class ConflictError(Exception):
+    pass
+
+# Returned from an update() callback to leave the stored lobby untouched
+ABORT = object()
+
+class LobbyBackend:
+    namespace = "lobby"
+
+    def _get_raw(self, lobby_id):
+        raise NotImplementedError
+
+    def _put_raw(self, lobby_id, raw, expected_version):
+        raise NotImplementedError
+
+    def _all_raw(self):
+        raise NotImplementedError
+
+    def delete(self, lobby_id):
+        raise NotImplementedError
+
+    # Block until the lobby's version differs from `version` or the timeout expires
+    def wait_for_change(self, lobby_id, version, timeout=1.0):
+        raise NotImplementedError
+
+    def get(self, lobby_id):
+        raw, version = self._get_raw(lobby_id)
+        metrics.record_storage(f"load_{self.namespace}", len(raw) if raw else 0)
+        if raw is None:
+            return None, 0
+        return json.loads(raw), version
+
+    # expected_version 0 means the lobby must not exist yet
+    def put(self, lobby_id, data, expected_version):
+        raw = json.dumps(data)
+        version = self._put_raw(lobby_id, raw, expected_version)
+        metrics.record_storage(f"save_{self.namespace}", len(raw), write=True)
+        return version
+
+    def get_all(self):
+        lobbies = {}
+        nbytes = 0
+        for lobby_id, raw in self._all_raw():
+            nbytes += len(raw)
+            lobbies[lobby_id] = json.loads(raw)
+        metrics.record_storage(f"scan_{self.namespace}", nbytes)
+        return lobbies
+
+    # Optimistic read-modify-write; fn mutates the lobby in place and returns a result
+    def update(self, lobby_id, fn, retries=UPDATE_RETRIES):
+        for _ in range(retries):
+            data, version = self.get(lobby_id)
+            if data is None:
+                return None
+            result = fn(data)
+            if result is ABORT:
+                return None
+            try:
+                self.put(lobby_id, data, version)
+                return result
+            except ConflictError:
+                metrics.record_storage(f"{self.namespace}_conflict")
+                continue
+        raise ConflictError(f"Too much contention updating lobby {lobby_id}")
+
+# --- In-process stand-in (tests, benchmarks, single replica) ---
+class MemoryLobbyBackend(LobbyBackend):
+    def __init__(self, namespace="lobby"):
+        self.namespace = namespace
+        self.records = {}
+        self.changed = threading.Condition()
+
+    def _get_raw(self, lobby_id):
+        with self.changed:
+            return self.records.get(lobby_id, (None, 0))
+
+    def _put_raw(self, lobby_id, raw, expected_version):
+        with self.changed:
+            current = self.records.get(lobby_id, (None, 0))[1]
+            if current != expected_version:
+                raise ConflictError(lobby_id)
+            self.records[lobby_id] = (raw, current + 1)
+            self.changed.notify_all()
+            return current + 1
+
+    def _all_raw(self):
+        with self.changed:
+            return [(lobby_id, raw) for lobby_id, (raw, _) in self.records.items()]
+
+    def delete(self, lobby_id):
+        with self.changed:
+            self.records.pop(lobby_id, None)
+            self.changed.notify_all()
+
+    def wait_for_change(self, lobby_id, version, timeout=1.0):
+        with self.changed:
+            self.changed.wait_for(lambda: self.records.get(lobby_id, (None, 0))[1] != version, timeout)
+            return self.records.get(lobby_id, (None, 0))[1]
+
+# --- Shared SQLite file in WAL mode (replicas on one host or a shared volume) ---
+class SQLiteLobbyBackend(LobbyBackend):
+    def __init__(self, path="lobbies.db", namespace="lobby", busy_timeout_ms=5000):
+        self.path = path
+        self.namespace = namespace
+        self.table = f"{namespace}_state"
+        self.busy_timeout_ms = busy_timeout_ms
+        self.local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"""CREATE TABLE IF NOT EXISTS {self.table} (
+                id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL
+            )""")
+        conn.commit()
+
+    # sqlite3 connections can't be shared across Streamlit's script threads
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def _get_raw(self, lobby_id):
+        row = self._conn().execute(f"SELECT data, version FROM {self.table} WHERE id = ?", (lobby_id,)).fetchone()
+        return row if row else (None, 0)
+
+    def _put_raw(self, lobby_id, raw, expected_version):
+        conn = self._conn()
+        if expected_version == 0:
+            try:
+                conn.execute(f"INSERT INTO {self.table} (id, version, data, updated_at) VALUES (?, 1, ?, ?)",
+                             (lobby_id, raw, time.time()))
+            except sqlite3.IntegrityError:
+                raise ConflictError(lobby_id)
+            return 1
+        cursor = conn.execute(f"UPDATE {self.table} SET data = ?, version = version + 1, updated_at = ? WHERE id = ? AND version = ?",
+                              (raw, time.time(), lobby_id, expected_version))
+        if cursor.rowcount == 0:
+            raise ConflictError(lobby_id)
+        return expected_version + 1
+
+    def _all_raw(self):
+        return self._conn().execute(f"SELECT id, data FROM {self.table}").fetchall()
+
+    def delete(self, lobby_id):
+        self._conn().execute(f"DELETE FROM {self.table} WHERE id = ?", (lobby_id,))
+
+    # PRAGMA data_version only changes when another connection commits, so idle polls stay cheap
+    def wait_for_change(self, lobby_id, version, timeout=1.0):
+        conn = self._conn()
+        deadline = time.monotonic() + timeout
+        seen = None
+        while True:
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != seen:
+                seen = data_version
+                row = conn.execute(f"SELECT version FROM {self.table} WHERE id = ?", (lobby_id,)).fetchone()
+                current = row[0] if row else 0
+                if current != version:
+                    return current
+            if time.monotonic() >= deadline:
+                return version
+            time.sleep(POLL_INTERVAL_S)
+
+# --- Networked key-value store (Redis), for replicas on different hosts ---
+class RedisLobbyBackend(LobbyBackend):
+    def __init__(self, url="redis://localhost:6379/0", prefix="quizarena", namespace="lobby"):
+        import redis
+        self.redis = redis
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self.prefix = f"{prefix}:{namespace}"
+
+    def _key(self, lobby_id):
+        return f"{self.prefix}:{lobby_id}"
+
+    def _channel(self, lobby_id):
+        return f"{self.prefix}-changed:{lobby_id}"
+
+    def _get_raw(self, lobby_id):
+        data, version = self.client.hmget(self._key(lobby_id), "data", "version")
+        if data is None:
+            return None, 0
+        return data.decode(), int(version)
+
+    # WATCH/MULTI makes the version check and the write one atomic step
+    def _put_raw(self, lobby_id, raw, expected_version):
+        key = self._key(lobby_id)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                current = pipe.hget(key, "version")
+                if int(current or 0) != expected_version:
+                    raise ConflictError(lobby_id)
+                pipe.multi()
+                pipe.hset(key, mapping={"data": raw, "version": expected_version + 1})
+                pipe.sadd(f"{self.prefix}-ids", lobby_id)
+                pipe.publish(self._channel(lobby_id), expected_version + 1)
+                pipe.execute()
+            except self.redis.WatchError:
+                raise ConflictError(lobby_id)
+        return expected_version + 1
+
+    def _all_raw(self):
+        ids = [i.decode() for i in self.client.smembers(f"{self.prefix}-ids")]
+        if not ids:
+            return []
+        with self.client.pipeline(transaction=False) as pipe:
+            for lobby_id in ids:
+                pipe.hget(self._key(lobby_id), "data")
+            values = pipe.execute()
+        return [(lobby_id, raw.decode()) for lobby_id, raw in zip(ids, values) if raw is not None]
+
+    def delete(self, lobby_id):
+        self.client.delete(self._key(lobby_id))
+        self.client.srem(f"{self.prefix}-ids", lobby_id)
+        self.client.publish(self._channel(lobby_id), 0)
+
+    def wait_for_change(self, lobby_id, version, timeout=1.0):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(self._channel(lobby_id))
+            # Re-check after subscribing so a change published in between isn't missed
+            current = self._get_raw(lobby_id)[1]
+            if current != version:
+                return current
+            message = pubsub.get_message(timeout=timeout)
+            return int(message["data"]) if message else version
+        finally:
+            pubsub.close()
+
+BACKENDS = {
+    "memory": MemoryLobbyBackend,
+    "sqlite": SQLiteLobbyBackend,
+    "redis": RedisLobbyBackend
+}
+
+def create_backend(kind="sqlite", **options):
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown lobby backend: {kind}")
+    return BACKENDS[kind](**options)
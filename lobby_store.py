@@ -0,0 +1,549 @@
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import metrics
+import ghost_replay
+import lobby_backend
+import quiz_objects
+import score_store
+import tournament
+from game_engine import GameEngine, REVEAL_SECONDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are still atomic, just not serialized across processes
+    fcntl = None
+
+# --- User accounts (JSON file) ---
+# Every writer goes through update_users, which holds a lock file for the whole load-modify-save and
+# swaps the file in with os.replace, so a batch lands all at once or not at all.
+USERS_DB = "users.json"
+
+def load_users():
+    if not os.path.exists(USERS_DB):
+        metrics.record_storage("load_users")
+        return {}
+    with open(USERS_DB, "rb") as f:
+        raw = f.read()
+    metrics.record_storage("load_users", len(raw))
+    return json.loads(raw)
+
+# Each save writes its own temporary file, so a writer that bypasses the lock can't clobber another's
+def save_users(users):
+    data = json.dumps(users, indent=4)
+    with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(os.path.abspath(USERS_DB)),
+                                     prefix=f"{os.path.basename(USERS_DB)}.", suffix=".tmp", delete=False) as f:
+        f.write(data)
+    os.replace(f.name, USERS_DB)
+    metrics.record_storage("save_users", len(data), write=True)
+
+@contextmanager
+def _users_lock():
+    with open(f"{USERS_DB}.lock", "w") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+# Function to change the accounts in one locked read-modify-write; fn edits users in place and
+# returns a result, or lobby_backend.ABORT to leave the file untouched
+def update_users(fn):
+    with _users_lock():
+        users = load_users()
+        result = fn(users)
+        if result is not lobby_backend.ABORT:
+            save_users(users)
+        return result
+
+# An id no account in `users` has; random rather than sequential so ids don't reveal sign-up order
+def new_user_id(users, taken=None):
+    taken = taken if taken is not None else {user["user_id"] for user in users.values()}
+    while True:
+        user_id = f"user_{uuid.uuid4().hex[:10]}"
+        if user_id not in taken:
+            taken.add(user_id)
+            return user_id
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# --- Lobby state (see lobby_backend.py) ---
+# Five record types share one backend kind: the lobby (players, chat, status), the small per-tick
+# game state keyed by lobby id, the immutable quiz payload keyed by its content hash, the
+# timeline of the lobby's last finished game for ghost play (see ghost_replay.py), and
+# tournaments that group many lobbies into rounds (see tournament.py).
+# Loaded quizzes are interned quiz_objects.Quiz instances shared by every session in the process.
+LOBBY_BACKEND = "sqlite"
+LOBBY_DB = "lobbies.db"
+NAMESPACES = ("lobby", "game", "quiz", "replay", "tournament")
+QUIZ_CACHE_SIZE = 256
+
+_backends = {}
+_backend_config = [None]
+_quiz_cache = {}
+_quiz_cache_lock = threading.Lock()
+
+# Streamlit re-runs quiz.py on every interaction, so an unchanged configuration keeps the open backends
+def configure_backend(kind=LOBBY_BACKEND, **options):
+    config = (kind, sorted(options.items()))
+    if _backends and _backend_config[0] == config:
+        return _backends["lobby"]
+    for namespace in NAMESPACES:
+        _backends[namespace] = lobby_backend.create_backend(kind, namespace=namespace, **options)
+    _backend_config[0] = config
+    with _quiz_cache_lock:
+        _quiz_cache.clear()
+    return _backends["lobby"]
+
+def get_backend(namespace="lobby"):
+    if not _backends:
+        configure_backend(LOBBY_BACKEND, path=LOBBY_DB)
+    return _backends[namespace]
+
+def load_lobbies():
+    return get_backend().get_all()
+
+# Bulk overwrite for imports and benchmarks; everything else goes through update()
+def save_lobbies(lobbies):
+    backend = get_backend()
+    for lobby_id, lobby in lobbies.items():
+        _, version = backend.get(lobby_id)
+        backend.put(lobby_id, lobby, version)
+
+def read_lobby(lobby_id):
+    return get_backend().get(lobby_id)
+
+def get_lobby(lobby_id):
+    return get_backend().get(lobby_id)[0]
+
+def wait_for_lobby_change(lobby_id, version, timeout=1.0):
+    return get_backend().wait_for_change(lobby_id, version, timeout)
+
+# --- Quizzes (immutable, stored once, cached per process) ---
+def quiz_id(quiz_data):
+    return quiz_objects.quiz_id(quiz_data)
+
+# The id is a content hash, so storing the same quiz twice is a no-op
+def store_quiz(quiz_data):
+    qid = quiz_id(quiz_data)
+    backend = get_backend("quiz")
+    if backend.get(qid)[0] is None:
+        try:
+            backend.put(qid, quiz_objects.to_dict(quiz_data), 0)
+        except lobby_backend.ConflictError:
+            pass
+    _cache_quiz(qid, quiz_data)
+    return qid
+
+def _cache_quiz(qid, quiz_data):
+    quiz = quiz_objects.intern_quiz(quiz_data, qid)
+    with _quiz_cache_lock:
+        if qid not in _quiz_cache and len(_quiz_cache) >= QUIZ_CACHE_SIZE:
+            _quiz_cache.pop(next(iter(_quiz_cache)))
+        _quiz_cache[qid] = quiz
+    return quiz
+
+def load_quiz(qid):
+    with _quiz_cache_lock:
+        quiz = _quiz_cache.get(qid)
+    if quiz is None:
+        quiz_data = get_backend("quiz").get(qid)[0]
+        if quiz_data is not None:
+            quiz = _cache_quiz(qid, quiz_data)
+    return quiz
+
+# --- Lobby operations (no Streamlit state, so they can run headless) ---
+# `players` ([(id, name)]) seats a lobby whose host doesn't play, as tournament lobbies do
+def create_lobby(lobby_name, lobby_type, max_players, user_id, username, class_id=None, players=None,
+                 tournament_seat=None):
+    backend = get_backend()
+    players = players if players is not None else [(user_id, username)]
+    while True:
+        lobby_id = f"L{random.randint(10000, 99999)}"
+        lobby = {
+            "id": lobby_id,
+            "name": lobby_name,
+            "type": lobby_type,
+            "max_players": max_players,
+            "players": [player_id for player_id, _ in players],
+            "player_names": [name for _, name in players],
+            "host": user_id,
+            "status": "waiting",
+            "quiz_id": None,
+            "quiz_title": None,
+            "scores": {player_id: 0 for player_id, _ in players},
+            "start_time": None,
+            "chat_messages": [],
+            "votes_to_start": {},
+            "class_id": class_id,
+            "tournament": tournament_seat  # [tournament id, round index]
+        }
+        try:
+            backend.put(lobby_id, lobby, 0)
+            return lobby_id
+        except lobby_backend.ConflictError:
+            continue
+
+def join_lobby(lobby_id, user_id, username):
+    def join(lobby):
+        if len(lobby["players"]) < lobby["max_players"] and user_id not in lobby["players"]:
+            lobby["players"].append(user_id)
+            lobby["player_names"].append(username)
+            lobby["scores"][user_id] = 0
+            return True
+        return lobby_backend.ABORT
+    return bool(get_backend().update(lobby_id, join))
+
+def post_chat_message(lobby_id, username, message):
+    def post(lobby):
+        lobby["chat_messages"].append({
+            "username": username,
+            "message": message,
+            "timestamp": datetime.now().isoformat()
+        })
+        return True
+    return bool(get_backend().update(lobby_id, post))
+
+def set_quiz_data(lobby_id, quiz_data):
+    qid = store_quiz(quiz_data)
+    def assign(lobby):
+        lobby["quiz_id"] = qid
+        lobby["quiz_title"] = quiz_data.get("quiz_title")
+        return True
+    return bool(get_backend().update(lobby_id, assign))
+
+def start_game(lobby_id, now=None, reveal_seconds=REVEAL_SECONDS):
+    lobby = get_lobby(lobby_id)
+    if not lobby or not lobby.get("quiz_id"):
+        return False
+    quiz_data = load_quiz(lobby["quiz_id"])
+    if quiz_data is None:
+        return False
+    engine = GameEngine(quiz_data, zip(lobby["players"], lobby["player_names"]), reveal_seconds=reveal_seconds)
+    engine.start(now)
+    record = dict(engine.to_dict(), quiz_id=lobby["quiz_id"], tournament=lobby.get("tournament"))
+    games = get_backend("game")
+    previous, version = games.get(lobby_id)
+    previous_id = previous and previous.get("game_id")
+    for _ in range(lobby_backend.UPDATE_RETRIES):
+        try:
+            games.put(lobby_id, record, version)
+            break
+        except lobby_backend.ConflictError:
+            metrics.record_storage("game_conflict")
+            current, version = games.get(lobby_id)
+            # Another click or replica started a new game first; it owns the record and the answer log
+            if current and current.get("game_id") != previous_id:
+                return False
+    else:
+        return False
+    score_store.record_game(engine, lobby_id=lobby_id, mode=lobby.get("type"), quiz_id=lobby["quiz_id"],
+                            host_id=lobby["host"], class_id=lobby.get("class_id"))
+
+    def mark_playing(lobby):
+        lobby["status"] = "playing"
+        lobby["scores"] = {player_id: 0 for player_id in lobby["players"]}
+        return True
+    return bool(get_backend().update(lobby_id, mark_playing))
+
+def _engine_from_record(game):
+    quiz_data = load_quiz(game["quiz_id"])
+    if quiz_data is None:
+        return None
+    return GameEngine.from_dict(quiz_data, game)
+
+def load_game(lobby_id):
+    game = get_backend("game").get(lobby_id)[0]
+    return _engine_from_record(game) if game else None
+
+# Apply one engine action to the game record and save only if the game changed.
+# Ticks touch only the game record; the lobby is written once, when the game finishes.
+def update_game(lobby_id, action):
+    outcome = [None, None, False, None]
+    def apply(game):
+        engine = _engine_from_record(game)
+        if engine is None:
+            return lobby_backend.ABORT
+        version = engine.version
+        outcome[:] = [engine, action(engine), engine.version != version, game]
+        if not outcome[2]:
+            return lobby_backend.ABORT
+        game.update(engine.to_dict())
+        return True
+    get_backend("game").update(lobby_id, apply)
+    engine, result, changed, game = outcome
+    seat = game.get("tournament") if changed else None
+    kinds = {kind for kind, _ in result or []} if changed else set()
+    if seat and "reveal" in kinds:
+        _update_standings(seat, engine)
+    # Only the write that finished the game sees the "finished" event, so this runs once per game
+    if "finished" in kinds:
+        _finish_lobby(lobby_id, engine, game["quiz_id"])
+        if seat:
+            finish_round(*seat)
+    return engine, result
+
+def _finish_lobby(lobby_id, engine, qid):
+    score_store.finish_game(engine)
+    save_replay(lobby_id, engine, qid)
+    def finish(lobby):
+        if lobby["status"] == "finished":
+            return lobby_backend.ABORT
+        lobby["status"] = "finished"
+        lobby["scores"] = {player_id: player.score for player_id, player in engine.state.players.items()}
+        return True
+    get_backend().update(lobby_id, finish)
+
+# Only the replica whose write won sees the reveal events, so each result is recorded once.
+# Passing player_id also records that player's page as connected (see GameEngine.touch).
+def advance_game(lobby_id, now=None, player_id=None):
+    engine, events = update_game(lobby_id, lambda engine: engine.handle({"type": "tick", "player_id": player_id}, now))
+    if engine is not None:
+        score_store.record_reveals(engine, events or [])
+    return engine
+
+def _progress(game):
+    return game["phase"], game["question_index"], game.get("answered", 0)
+
+# Block until an answer lands or the game moves on (or the timeout expires). Presence check-ins also
+# rewrite the game record, so wake-ups that leave the answer counters untouched keep waiting.
+def wait_for_game_progress(lobby_id, engine, timeout=1.0):
+    games = get_backend("game")
+    deadline = time.monotonic() + timeout
+    seen = (engine.phase, engine.state.question_index, engine.state.answered)
+    game, version = games.get(lobby_id)
+    while game is not None and _progress(game) == seen:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        games.wait_for_change(lobby_id, version, remaining)
+        game, version = games.get(lobby_id)
+    return True
+
+# The last connected player's answer reveals the question in the same write
+def submit_answer(lobby_id, player_id, answer, now=None):
+    event = {"type": "submit", "player_id": player_id, "answer": answer}
+    engine, events = update_game(lobby_id, lambda engine: engine.handle(event, now))
+    accepted = bool(events) and events[0][0] == "accepted"
+    if accepted:
+        score_store.record_answer(engine, player_id)
+    if engine is not None:
+        score_store.record_reveals(engine, events)
+    return accepted
+
+# --- Ghost games (replays of the lobby's last finished game) ---
+# Only the replica that finished the game gets here, and a newer game replaces the older recording
+def save_replay(lobby_id, engine, qid):
+    replays = get_backend("replay")
+    current, version = replays.get(lobby_id)
+    if current and current["game_id"] == engine.game_id:
+        return False
+    try:
+        replays.put(lobby_id, ghost_replay.record(engine, qid, lobby_id), version)
+        return True
+    except lobby_backend.ConflictError:
+        return False
+
+def load_replay(lobby_id):
+    return get_backend("replay").get(lobby_id)[0]
+
+# A ghost run counts only against the recording it was played against; a player's best run is kept
+def record_ghost_run(lobby_id, game_id, user_id, username, score):
+    def add(timeline):
+        if timeline["game_id"] != game_id:
+            return lobby_backend.ABORT
+        best = timeline["runs"].get(user_id)
+        if best and best["score"] >= score:
+            return lobby_backend.ABORT
+        timeline["runs"][user_id] = {"name": username, "score": int(score)}
+        return True
+    return bool(get_backend("replay").update(lobby_id, add))
+
+def ghost_ranking(lobby_id):
+    timeline = load_replay(lobby_id)
+    return ghost_replay.ranking(timeline) if timeline else []
+
+# --- Tournaments (see tournament.py) ---
+# The tournament record is written only when players join and when rounds start or end. Live scores
+# stay in each lobby's game record; this process keeps a Standings per round that reveals update
+# in place, rebuilt from the round's game records at most every STANDINGS_REFRESH_S so points
+# revealed on other replicas show up too.
+STANDINGS_REFRESH_S = 5.0
+
+_standings = {}  # (tournament id, round index) -> [Standings, built_at]
+_standings_lock = threading.Lock()
+
+def create_tournament(name, quiz_data, host_id, lobby_size=10, advance=3):
+    qid = store_quiz(quiz_data)
+    backend = get_backend("tournament")
+    lobby_size = max(2, lobby_size)
+    while True:
+        tournament_id = f"T{random.randint(10000, 99999)}"
+        record = {
+            "id": tournament_id,
+            "name": name,
+            "host": host_id,
+            "quiz_id": qid,
+            "lobby_size": lobby_size,
+            "advance": max(1, min(advance, lobby_size - 1)),  # someone must drop out of every full lobby
+            "status": "waiting",
+            "players": {},
+            "rounds": [],
+            "winner": None
+        }
+        try:
+            backend.put(tournament_id, record, 0)
+            return tournament_id
+        except lobby_backend.ConflictError:
+            continue
+
+def read_tournament(tournament_id):
+    return get_backend("tournament").get(tournament_id)
+
+def get_tournament(tournament_id):
+    return get_backend("tournament").get(tournament_id)[0]
+
+def wait_for_tournament_change(tournament_id, version, timeout=1.0):
+    return get_backend("tournament").wait_for_change(tournament_id, version, timeout)
+
+# Players can sign up until the first round starts
+def join_tournament(tournament_id, user_id, username):
+    def join(record):
+        if record["rounds"] or record["status"] != "waiting":
+            return lobby_backend.ABORT
+        record["players"][user_id] = username
+        return True
+    return bool(get_backend("tournament").update(tournament_id, join))
+
+# Function to start the next round: seat its players across lobbies and start every game on one clock
+def start_round(tournament_id, now=None, reveal_seconds=REVEAL_SECONDS):
+    backend = get_backend("tournament")
+    record = backend.get(tournament_id)[0]
+    if not record or record["status"] != "waiting":
+        return False
+    round_index = len(record["rounds"])
+    entrants = record["rounds"][-1]["qualified"] if record["rounds"] else list(record["players"])
+    if len(entrants) < 2:
+        return False
+    # Claim the round first so a second click (or replica) can't seat the same players twice
+    def claim(record):
+        if record["status"] != "waiting" or len(record["rounds"]) != round_index:
+            return lobby_backend.ABORT
+        record["status"] = "starting"
+        return True
+    if not backend.update(tournament_id, claim):
+        return False
+
+    quiz = load_quiz(record["quiz_id"])
+    names = record["players"]
+    seats = {}
+    started = False
+    try:
+        if quiz is not None:
+            groups = tournament.seed_lobbies(entrants, record["lobby_size"])
+            for i, group in enumerate(groups):
+                lobby_id = create_lobby(f"{record['name']} · Round {round_index + 1} · Lobby {i + 1}", "Tournament",
+                                        len(group), record["host"], names.get(record["host"], ""),
+                                        players=[(player_id, names[player_id]) for player_id in group],
+                                        tournament_seat=[tournament_id, round_index])
+                seats.update((player_id, lobby_id) for player_id in group)
+                set_quiz_data(lobby_id, quiz)
+            now = time.time() if now is None else now
+            started = all(start_game(lobby_id, now=now, reveal_seconds=reveal_seconds)
+                          for lobby_id in dict.fromkeys(seats.values()))
+    finally:
+        if not started:
+            _abandon_round(tournament_id, round_index, dict.fromkeys(seats.values()))
+    if not started:
+        return False
+    with _standings_lock:
+        _standings[(tournament_id, round_index)] = [tournament.Standings(len(quiz.questions), dict.fromkeys(entrants, 0)),
+                                                    time.monotonic()]
+
+    def open_round(record):
+        record["rounds"].append({"lobbies": list(dict.fromkeys(seats.values())), "seats": seats,
+                                 "started_at": time.time(), "qualified": []})
+        record["status"] = "playing"
+        return True
+    return bool(backend.update(tournament_id, open_round))
+
+# Undo a round that failed to start: back to "waiting" so the host can retry, and drop its lobbies
+def _abandon_round(tournament_id, round_index, lobby_ids):
+    def reset(record):
+        if record["status"] != "starting" or len(record["rounds"]) != round_index:
+            return lobby_backend.ABORT
+        record["status"] = "waiting"
+        return True
+    get_backend("tournament").update(tournament_id, reset)
+    for lobby_id in lobby_ids:
+        get_backend("game").delete(lobby_id)
+        get_backend().delete(lobby_id)
+
+# A player's round score is their score in their lobby, so applying it is idempotent
+def _update_standings(seat, engine):
+    with _standings_lock:
+        entry = _standings.get(tuple(seat))
+        if entry:
+            for player_id, player in engine.state.players.items():
+                entry[0].set(player_id, player.score)
+
+def _build_standings(record, round_index):
+    quiz = load_quiz(record["quiz_id"])
+    standings = tournament.Standings(len(quiz.questions) if quiz else 0)
+    games = get_backend("game")
+    for lobby_id in record["rounds"][round_index]["lobbies"]:
+        game = games.get(lobby_id)[0]
+        for player_id, player in (game or {}).get("players", {}).items():
+            standings.set(player_id, player["score"])
+    return standings
+
+# Function to get a round's cross-lobby standings (the current round by default)
+def tournament_standings(tournament_id, round_index=None, record=None):
+    record = record or get_tournament(tournament_id)
+    if not record or not record["rounds"]:
+        return None
+    round_index = len(record["rounds"]) - 1 if round_index is None else round_index
+    key = (tournament_id, round_index)
+    now = time.monotonic()
+    with _standings_lock:
+        entry = _standings.get(key)
+        if entry and now - entry[1] < STANDINGS_REFRESH_S:
+            return entry[0]
+    standings = _build_standings(record, round_index)
+    with _standings_lock:
+        _standings[key] = [standings, now]
+    return standings
+
+# Once every lobby of the round has finished, pick who goes through; a one-lobby round is the final.
+# Called when a tournament lobby finishes, and from the host's page in case two lobbies finished
+# on different replicas at the same moment and each saw the other still playing.
+def finish_round(tournament_id, round_index):
+    record = get_tournament(tournament_id)
+    if not record or len(record["rounds"]) != round_index + 1:
+        return False
+    lobbies = [get_lobby(lobby_id) for lobby_id in record["rounds"][round_index]["lobbies"]]
+    if any(lobby is None or lobby["status"] != "finished" for lobby in lobbies):
+        return False
+    qualified = tournament.qualifiers([lobby["scores"] for lobby in lobbies], record["advance"])
+    # A round that eliminated nobody would repeat forever, so it is the final too
+    entrants = len(record["rounds"][round_index]["seats"])
+    final = len(lobbies) == 1 or len(qualified) < 2 or len(qualified) >= entrants
+
+    def close_round(record):
+        if record["status"] != "playing" or len(record["rounds"]) != round_index + 1:
+            return lobby_backend.ABORT
+        record["rounds"][round_index]["qualified"] = qualified
+        if final:
+            record["status"] = "finished"
+            record["winner"] = qualified[0] if qualified else None
+        else:
+            record["status"] = "waiting"
+        return True
+    return bool(get_backend("tournament").update(tournament_id, close_round))
@@ -0,0 +1,182 @@
+import math
+import random
+import re
+from collections import Counter
+
+# --- Offline quiz generator (TF-IDF sentence scoring + cloze items) ---
+STOPWORDS = set("""a about above after again against all also am an and any are as at be because been before
+being below between both but by can could did do does doing down during each few for from further had has
+have having he her here hers herself him himself his how however i if in into is it its itself just let me
+more most must my myself no nor not now of off on once only or other our ours ourselves out over own same
+she should so some such than that the their theirs them themselves then there these they this those
+through to too under until up upon us used using very was we were what when where which while who whom
+why will with within would you your yours yourself yourselves one two many much may might called known""".split())
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n{2,}|\n(?=[A-Z0-9•\-*])")
+TOKEN_PATTERN = re.compile(r"[A-Za-z][A-Za-z\-']*[A-Za-z]|\d+(?:\.\d+)?")
+LIST_PATTERN = re.compile(r"((?:[\w\-]+, ){2,}(?:and |or )[\w\-]+)")
+MIN_SENTENCE_WORDS = 6
+MAX_SENTENCE_WORDS = 40
+BLANK = "_____"
+
+def split_sentences(text):
+    sentences = []
+    for raw in SENTENCE_SPLIT.split(text):
+        sentence = " ".join(raw.split()).strip(" •-*")
+        words = len(sentence.split())
+        if MIN_SENTENCE_WORDS <= words <= MAX_SENTENCE_WORDS:
+            sentences.append(sentence)
+    return sentences
+
+def is_keyword(token):
+    return token.lower() not in STOPWORDS and (len(token) >= 4 or token.isdigit())
+
+# Coarse "shape" of a term so distractors look like the answer (year vs name vs word)
+def term_kind(term):
+    if term.replace(".", "").isdigit():
+        return "number"
+    if term[0].isupper():
+        return "proper"
+    return "word"
+
+class DocumentIndex:
+    def __init__(self, text):
+        self.sentences = split_sentences(text)
+        self.sentence_terms = []
+        document_freq = Counter()
+        term_freq = Counter()
+        self.surface = {}
+        for sentence in self.sentences:
+            terms = []
+            for token in TOKEN_PATTERN.findall(sentence):
+                if is_keyword(token):
+                    key = token.lower()
+                    terms.append(key)
+                    # Remember the most common original casing for display
+                    self.surface.setdefault(key, Counter())[token] += 1
+            self.sentence_terms.append(terms)
+            term_freq.update(terms)
+            document_freq.update(set(terms))
+        total = max(1, len(self.sentences))
+        self.weights = {
+            term: (1 + math.log(count)) * math.log((1 + total) / (1 + document_freq[term]))
+            for term, count in term_freq.items()
+        }
+        self.terms_by_kind = {}
+        for term in sorted(self.weights, key=self.weights.get, reverse=True):
+            self.terms_by_kind.setdefault(term_kind(self.display(term)), []).append(term)
+
+    def display(self, term):
+        return self.surface[term].most_common(1)[0][0]
+
+    def sentence_score(self, i):
+        terms = set(self.sentence_terms[i])
+        if not terms:
+            return 0.0
+        return sum(self.weights[t] for t in terms) / math.sqrt(len(self.sentence_terms[i]) + 1)
+
+    # Best-weighted terms in the sentence that are not too common in the whole document
+    def key_term(self, i):
+        candidates = [t for t in set(self.sentence_terms[i]) if self.weights[t] > 0]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda t: (self.weights[t], len(t)))
+
+    # Distractors share the answer's kind and, where possible, its suffix and length
+    def similar_terms(self, term, exclude, count=3):
+        kind = term_kind(self.display(term))
+        pool = [t for t in self.terms_by_kind.get(kind, [])[:200] if t != term and t not in exclude]
+        pool.sort(key=lambda t: (t[-3:] != term[-3:], abs(len(t) - len(term))))
+        return [self.display(t) for t in pool[:count]]
+
+def replace_term(sentence, surface, replacement):
+    return re.sub(rf"\b{re.escape(surface)}\b", replacement, sentence, count=1, flags=re.IGNORECASE)
+
+def make_identification(index, i, term):
+    return {
+        "question": replace_term(index.sentences[i], index.display(term), BLANK),
+        "correct_answer": index.display(term),
+        "question_type": "identification"
+    }
+
+def make_mcq(index, i, term, rng):
+    distractors = index.similar_terms(term, set(index.sentence_terms[i]))
+    if len(distractors) < 3:
+        return None
+    options = distractors + [index.display(term)]
+    rng.shuffle(options)
+    return {
+        "question": replace_term(index.sentences[i], index.display(term), BLANK),
+        "options": options,
+        "correct_answer": index.display(term),
+        "question_type": "mcq"
+    }
+
+def make_true_false(index, i, term, rng):
+    sentence = index.sentences[i]
+    if rng.random() < 0.5:
+        swaps = index.similar_terms(term, set(index.sentence_terms[i]), count=1)
+        if swaps:
+            return {
+                "question": replace_term(sentence, index.display(term), swaps[0]),
+                "correct_answer": "False",
+                "question_type": "true_false"
+            }
+    return {"question": sentence, "correct_answer": "True", "question_type": "true_false"}
+
+def make_enumeration(index, i):
+    match = LIST_PATTERN.search(index.sentences[i])
+    if not match:
+        return None
+    items = [item.strip() for item in re.split(r",\s*(?:and |or )?|\s+(?:and|or)\s+", match.group(1)) if item.strip()]
+    if len(items) < 3:
+        return None
+    question = index.sentences[i].replace(match.group(1), BLANK)
+    return {
+        "question": f"Name the items that complete the statement: {question}",
+        "correct_answer": ", ".join(items),
+        "question_type": "enumeration"
+    }
+
+MODE_TYPES = {
+    "Multiple Choice": ["mcq"],
+    "True or False": ["true_false"],
+    "Identification": ["identification"],
+    "Enumeration": ["enumeration"],
+    "Mix Mode": ["mcq", "true_false", "identification", "enumeration"]
+}
+
+# Function to generate a quiz locally from extracted document text
+def generate_quiz(text, game_mode, num_questions=5, seed=None):
+    rng = random.Random(seed)
+    index = DocumentIndex(text)
+    types = MODE_TYPES.get(game_mode, MODE_TYPES["Mix Mode"])
+    if types == ["enumeration"]:
+        score = lambda i: (LIST_PATTERN.search(index.sentences[i]) is not None, index.sentence_score(i))
+    else:
+        score = index.sentence_score
+    ranked = sorted(range(len(index.sentences)), key=score, reverse=True)
+    questions = []
+    used_terms = set()
+    for i in ranked:
+        if len(questions) >= num_questions:
+            break
+        term = index.key_term(i)
+        if term is None or term in used_terms:
+            continue
+        qtype = types[len(questions) % len(types)]
+        question = None
+        if qtype == "enumeration":
+            question = make_enumeration(index, i)
+        elif qtype == "mcq":
+            question = make_mcq(index, i, term, rng)
+        elif qtype == "true_false":
+            question = make_true_false(index, i, term, rng)
+        # Identification is the fallback whenever a richer item can't be built
+        if question is None:
+            question = make_identification(index, i, term)
+        used_terms.add(term)
+        questions.append(question)
+    if not questions:
+        return None
+    return {"quiz_title": "Generated Quiz", "questions": questions}
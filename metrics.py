@@ -0,0 +1,230 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# --- Per-rerun instrumentation ---
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+SUMMARY_EVERY_S = 10
+MAX_METRICS_BYTES = 50 * 1024 * 1024  # metrics_file is rotated to metrics_file.1 past this size
+SAMPLE_INTERVAL_S = 0.005
+
+_local = threading.local()
+_lock = threading.Lock()
+
+class MetricsConfig:
+    def __init__(self):
+        self.metrics_file = None
+        self.summary_file = None
+        self.profile_dir = "profiles"
+        self.slow_rerun_ms = None
+        self.max_bytes = MAX_METRICS_BYTES
+
+config = MetricsConfig()
+histograms = {}
+totals = Counter()
+gauges = {}
+_last_summary = [0.0]
+
+# Recording is off unless a file is given; each process writes its own summary, named with its PID
+def configure(metrics_file=None, summary_file=None, profile_dir="profiles", slow_rerun_ms=None, max_bytes=MAX_METRICS_BYTES):
+    config.metrics_file = metrics_file or None
+    config.summary_file = process_path(summary_file) if summary_file else None
+    config.profile_dir = profile_dir
+    config.slow_rerun_ms = float(slow_rerun_ms) if slow_rerun_ms else None
+    config.max_bytes = int(max_bytes) if max_bytes else None
+
+# metrics_summary.json -> metrics_summary.<pid>.json, so replicas sharing a directory don't overwrite each other
+def process_path(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid()}{ext}"
+
+def bucket_index(latency_ms):
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if latency_ms <= bound:
+            return i
+    return len(LATENCY_BUCKETS_MS)
+
+class RerunStats:
+    __slots__ = ("page", "started", "calls", "bytes_read", "bytes_written", "llm_calls", "llm_seconds", "gauges")
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.calls = Counter()
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.gauges = {}
+
+def current():
+    return getattr(_local, "stats", None)
+
+# Storage functions call this with the size of what they read or wrote
+def record_storage(operation, nbytes=0, write=False):
+    with _lock:
+        totals[operation] += 1
+        totals["bytes_written" if write else "bytes_read"] += nbytes
+    stats = current()
+    if stats is None:
+        return
+    stats.calls[operation] += 1
+    if write:
+        stats.bytes_written += nbytes
+    else:
+        stats.bytes_read += nbytes
+
+# Point-in-time values (e.g. session_bytes); the summary keeps the last and largest seen
+def record_gauge(name, value):
+    with _lock:
+        gauge = gauges.setdefault(name, {"last": value, "max": value})
+        gauge["last"] = value
+        gauge["max"] = max(gauge["max"], value)
+    stats = current()
+    if stats is not None:
+        stats.gauges[name] = value
+
+@contextmanager
+def llm_call(name="groq"):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        with _lock:
+            totals[f"{name}_calls"] += 1
+        stats = current()
+        if stats is not None:
+            stats.llm_calls += 1
+            stats.llm_seconds += duration
+
+# --- Sampling profiler (opt-in) ---
+class SamplingProfiler:
+    def __init__(self, interval=SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.targets = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self, thread_id):
+        with self.lock:
+            self.targets[thread_id] = Counter()
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="rerun-profiler", daemon=True)
+                self.thread.start()
+
+    def stop(self, thread_id):
+        with self.lock:
+            return self.targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.targets:
+                    self.thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, stacks in self.targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse_stack(frame)] += 1
+
+def collapse_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+profiler = SamplingProfiler()
+
+# Folded stacks ("a;b;c count") feed straight into flamegraph.pl or speedscope
+def dump_profile(page, latency_ms, stacks):
+    os.makedirs(config.profile_dir, exist_ok=True)
+    path = os.path.join(config.profile_dir, f"{page}-{int(time.time() * 1000)}-{int(latency_ms)}ms.folded")
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+def _write_line(path, record):
+    line = json.dumps(record) + "\n"
+    with _lock:
+        if config.max_bytes and os.path.exists(path) and os.path.getsize(path) + len(line) > config.max_bytes:
+            os.replace(path, f"{path}.1")
+        with open(path, "a") as f:
+            f.write(line)
+
+def write_summary(path=None):
+    path = path or config.summary_file
+    if not path:
+        return
+    with _lock:
+        summary = {
+            "timestamp": time.time(),
+            "buckets_ms": LATENCY_BUCKETS_MS + ["inf"],
+            "pages": {page: {"count": h["count"], "total_ms": round(h["total_ms"], 3), "buckets": h["buckets"]}
+                      for page, h in histograms.items()},
+            "totals": dict(totals),
+            "gauges": {name: dict(gauge) for name, gauge in gauges.items()}
+        }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f, indent=4)
+    os.replace(tmp_path, path)
+
+def _finish(stats, outcome, stacks):
+    latency_ms = (time.perf_counter() - stats.started) * 1000
+    with _lock:
+        histogram = histograms.setdefault(stats.page, {"count": 0, "total_ms": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1)})
+        histogram["count"] += 1
+        histogram["total_ms"] += latency_ms
+        histogram["buckets"][bucket_index(latency_ms)] += 1
+    record = {
+        "ts": time.time(),
+        "page": stats.page,
+        "outcome": outcome,
+        "latency_ms": round(latency_ms, 3),
+        "storage_calls": dict(stats.calls),
+        "bytes_read": stats.bytes_read,
+        "bytes_written": stats.bytes_written,
+        "llm_calls": stats.llm_calls,
+        "llm_ms": round(stats.llm_seconds * 1000, 3)
+    }
+    if stats.gauges:
+        record["gauges"] = stats.gauges
+    if stacks and config.slow_rerun_ms is not None and latency_ms >= config.slow_rerun_ms:
+        record["profile"] = dump_profile(stats.page, latency_ms, stacks)
+    if config.metrics_file:
+        _write_line(config.metrics_file, record)
+    now = time.time()
+    if config.summary_file and now - _last_summary[0] >= SUMMARY_EVERY_S:
+        _last_summary[0] = now
+        write_summary()
+    return record
+
+# Wrap one script run; st.rerun()/st.stop() surface as exceptions, so outcome records how it ended
+@contextmanager
+def rerun(page):
+    stats = RerunStats(page)
+    _local.stats = stats
+    thread_id = threading.get_ident()
+    profiling = config.slow_rerun_ms is not None
+    if profiling:
+        profiler.start(thread_id)
+    outcome = "ok"
+    try:
+        yield stats
+    except BaseException as e:
+        outcome = type(e).__name__
+        raise
+    finally:
+        stacks = profiler.stop(thread_id) if profiling else None
+        _local.stats = None
+        _finish(stats, outcome, stacks)
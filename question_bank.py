@@ -0,0 +1,198 @@
+import sqlite3
+import json
+import hashlib
+import os
+import random
+import re
+import time
+import unicodedata
+from collections import Counter
+
+# --- Question Bank (SQLite + FTS5) ---
+QUIZ_DB = "quiz_app.db"
+QUESTION_TYPES = ["mcq", "true_false", "identification", "enumeration"]
+SOURCE_EXCERPT_CHARS = 600
+TOPIC_KEYWORDS = 5
+SAMPLE_WINDOW = 8  # matches scanned per requested question, see search_questions
+# Generators title every quiz alike, so these titles say nothing about the topic
+GENERIC_TITLES = {"", "generated quiz", "quiz"}
+STOPWORDS = set("""a an and are as at be been but by can do does for from has have he her his how i if in into is it
+its itself may more most not of on or other our she so some such than that the their them then there these they
+this those to too was we were what when where which while who whom why will with would you your also each only
+very just about after before between during over under again further once here both same own because until""".split())
+
+_initialized_dbs = set()
+
+def connect(db_path=QUIZ_DB):
+    conn = sqlite3.connect(db_path)
+    if db_path not in _initialized_dbs:
+        init_question_bank(conn)
+        _initialized_dbs.add(db_path)
+    return conn
+
+# The questions table predates the bank, so missing columns are added in place
+def init_question_bank(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS questions (
+            id TEXT PRIMARY KEY,
+            lobby_id TEXT,
+            payload TEXT
+        )""")
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(questions)")]
+    if "topic" not in columns:
+        conn.execute("ALTER TABLE questions ADD COLUMN topic TEXT")
+    if "question_type" not in columns:
+        conn.execute("ALTER TABLE questions ADD COLUMN question_type TEXT")
+    if "created_at" not in columns:
+        conn.execute("ALTER TABLE questions ADD COLUMN created_at INTEGER")
+    # Contentless index: the source excerpt is searchable but never stored twice
+    conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+            question, answer, topic, source,
+            content='', tokenize='porter unicode61'
+        )""")
+    conn.commit()
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+def question_hash(question):
+    return hashlib.sha256(normalize_text(question["question"]).encode()).hexdigest()
+
+# Function to check that a generated question is complete enough to reuse
+def validate_question(question):
+    if not isinstance(question, dict):
+        return False
+    text = str(question.get("question", "")).strip()
+    answer = str(question.get("correct_answer", "")).strip()
+    qtype = question.get("question_type")
+    if not text or not answer or qtype not in QUESTION_TYPES:
+        return False
+    if qtype == "mcq":
+        options = question.get("options") or []
+        if len(options) != 4 or answer.lower() not in [str(o).strip().lower() for o in options]:
+            return False
+    if qtype == "true_false" and answer.lower() not in ["true", "false"]:
+        return False
+    return True
+
+def content_words(text):
+    return [word for word in normalize_text(text).split()
+            if len(word) > 2 and word not in STOPWORDS and not word.isdigit()]
+
+# Function to name what a quiz is about: its title when the generator gave a real one, otherwise the
+# uploaded file's name plus the source document's most frequent content words
+def derive_topic(source_text="", title="", source_name=""):
+    parts = []
+    if normalize_text(title) not in GENERIC_TITLES:
+        parts.append(str(title).strip())
+    if source_name:
+        parts.append(os.path.splitext(os.path.basename(source_name))[0].replace("_", " ").replace("-", " "))
+    parts += [word for word, _ in Counter(content_words(source_text)).most_common(TOPIC_KEYWORDS)]
+    return " ".join(parts)
+
+# Sentences/paragraphs of the source with their content words, split once per stored quiz
+def source_chunks(source_text):
+    chunks = [chunk.strip() for chunk in re.split(r"\n\s*\n|(?<=[.!?])\s+", source_text or "") if chunk.strip()]
+    return [(chunk, set(content_words(chunk))) for chunk in chunks]
+
+# Function to cut the part of the source a question was drawn from: the run of chunks starting at
+# the one that shares the most words with the question and its answer
+def source_excerpt(chunks, question, max_chars=SOURCE_EXCERPT_CHARS):
+    if not chunks:
+        return ""
+    words = set(content_words(f"{question.get('question', '')} {question.get('correct_answer', '')}"))
+    best = max(range(len(chunks)), key=lambda i: len(words & chunks[i][1]))
+    excerpt = chunks[best][0]
+    for chunk, _ in chunks[best + 1:]:
+        if len(excerpt) + len(chunk) + 1 > max_chars:
+            break
+        excerpt = f"{excerpt} {chunk}"
+    return excerpt[:max_chars]
+
+# Function to persist validated questions, skipping ones already in the bank. Without a topic, one is
+# derived from the source text; each question is indexed with its own excerpt of the source.
+def store_questions(questions, lobby_id=None, topic="", source_text="", db_path=QUIZ_DB):
+    conn = connect(db_path)
+    topic = topic or derive_topic(source_text)
+    chunks = source_chunks(source_text)
+    now = int(time.time())
+    stored = 0
+    try:
+        with conn:
+            for question in questions:
+                if not validate_question(question):
+                    continue
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO questions (id, lobby_id, payload, topic, question_type, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (question_hash(question), lobby_id, json.dumps(question), topic, question["question_type"], now)
+                )
+                if cursor.rowcount:
+                    answer = question["correct_answer"]
+                    if question.get("options"):
+                        answer = " ".join(str(o) for o in question["options"])
+                    conn.execute(
+                        "INSERT INTO questions_fts (rowid, question, answer, topic, source) VALUES (?, ?, ?, ?, ?)",
+                        (cursor.lastrowid, question["question"], str(answer), topic, source_excerpt(chunks, question))
+                    )
+                    stored += 1
+    finally:
+        conn.close()
+    return stored
+
+# Each keyword becomes a quoted prefix term so user input can't break FTS syntax
+def build_match_query(keyword):
+    terms = re.findall(r"\w+", str(keyword).lower())
+    return " ".join(f'"{term}"*' for term in terms)
+
+# Function to fetch random matching questions from the bank without reading the whole match set: one
+# bounded scan of up to limit * SAMPLE_WINDOW matches starting at a random rowid (wrapping around to the
+# start), sampled down to limit. Match sets smaller than the window are read whole and sampled exactly.
+# Each statement costs one FTS prefix-term merge, so the window is read in one scan rather than by
+# per-question probes.
+def search_questions(keyword, limit=10, question_type=None, db_path=QUIZ_DB):
+    match = build_match_query(keyword)
+    if not match or limit <= 0:
+        return []
+    if question_type:
+        query = ("SELECT questions_fts.rowid FROM questions_fts JOIN questions q ON q.rowid = questions_fts.rowid "
+                 "WHERE questions_fts MATCH ? AND q.question_type = ? AND questions_fts.rowid >= ? "
+                 "ORDER BY questions_fts.rowid LIMIT ?")
+        params = (match, question_type)
+    else:
+        query = "SELECT rowid FROM questions_fts WHERE questions_fts MATCH ? AND rowid >= ? ORDER BY rowid LIMIT ?"
+        params = (match,)
+    window = limit * SAMPLE_WINDOW
+    conn = connect(db_path)
+    try:
+        # Separate subqueries: SQLite only answers a lone MIN or MAX from the index without a scan
+        low, high = conn.execute("SELECT (SELECT MIN(rowid) FROM questions), "
+                                 "(SELECT MAX(rowid) FROM questions)").fetchone()
+        if low is None:
+            return []
+        rows = dict.fromkeys(row[0] for row in conn.execute(query, params + (random.randint(low, high), window)))
+        if len(rows) < window:
+            rows.update(dict.fromkeys(row[0] for row in conn.execute(query, params + (low, window - len(rows)))))
+        rowids = random.sample(list(rows), min(limit, len(rows)))
+        placeholders = ",".join("?" * len(rowids))
+        payloads = dict(conn.execute(f"SELECT rowid, payload FROM questions WHERE rowid IN ({placeholders})", rowids))
+    finally:
+        conn.close()
+    return [json.loads(payloads[rowid]) for rowid in rowids if rowid in payloads]
+
+# Function to build lobby quiz data from the bank without calling the LLM
+def assemble_quiz(keyword, num_questions=10, question_type=None, db_path=QUIZ_DB):
+    questions = search_questions(keyword, num_questions, question_type, db_path)
+    if not questions:
+        return None
+    return {
+        "quiz_title": f"Question Bank - {keyword}",
+        "questions": questions
+    }
+
+def count_questions(db_path=QUIZ_DB):
+    conn = connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+    finally:
+        conn.close()
@@ -3,16 +3,22 @@ import base64
 import json
 import time
 import random
-from datetime import datetime
-import groq
-import PyPDF2
-import docx
-from pptx import Presentation
-import io
-import pandas as pd
 import os
-import hashlib
 import threading
+import math
+import question_bank
+import local_generator
+import metrics
+import lobby_store
+import lobby_backend
+import game_engine
+import ghost_replay
+import score_store
+import document_formats
+import session_record
+import quiz_objects
+from lobby_store import load_users, hash_password
+from scoring import check_answer, calculate_score
 
 # Set up the page
 st.set_page_config(
@@ -22,165 +28,168 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize Groq client
-if "groq_client" not in st.session_state:
-    if "GROQ_API_KEY" in st.secrets and st.secrets["GROQ_API_KEY"]:
-        try:
-            st.session_state.groq_client = groq.Client(api_key=st.secrets["GROQ_API_KEY"])
-        except Exception as e:
-            st.error(f"Error initializing Groq client: {e}")
-            st.session_state.groq_client = None
-    else:
-        st.session_state.groq_client = None
-
-# Initialize session state variables
-if "is_logged_in" not in st.session_state:
-    st.session_state.is_logged_in = False
-if "user_id" not in st.session_state:
-    st.session_state.user_id = None
-if "username" not in st.session_state:
-    st.session_state.username = ""
-if "avatar" not in st.session_state:
-    st.session_state.avatar = "🧠"
-if "current_page" not in st.session_state:
-    st.session_state.current_page = "login"
-if "lobbies" not in st.session_state:
-    st.session_state.lobbies = {}
-if "current_lobby" not in st.session_state:
-    st.session_state.current_lobby = None
-if "quiz_data" not in st.session_state:
-    st.session_state.quiz_data = None
-if "game_started" not in st.session_state:
-    st.session_state.game_started = False
-if "user_answers" not in st.session_state:
-    st.session_state.user_answers = {}
-if "leaderboard" not in st.session_state:
-    st.session_state.leaderboard = {}
-if "user_score" not in st.session_state:
-    st.session_state.user_score = 0
-if "streak" not in st.session_state:
-    st.session_state.streak = 0
-if "trivia_data" not in st.session_state:
-    st.session_state.trivia_data = None
-if "trivia_categories" not in st.session_state:
-    st.session_state.trivia_categories = []
-if "question_start_time" not in st.session_state:
-    st.session_state.question_start_time = None
-if "timer_active" not in st.session_state:
-    st.session_state.timer_active = False
-if "selected_answer" not in st.session_state:
-    st.session_state.selected_answer = None
-if "answer_submitted" not in st.session_state:
-    st.session_state.answer_submitted = False
-if "prev_page" not in st.session_state:
-    st.session_state.prev_page = "home"
-if "chat_messages" not in st.session_state:
-    st.session_state.chat_messages = {}
-if "current_question" not in st.session_state:
-    st.session_state.current_question = 0
-if "start_time" not in st.session_state:
-    st.session_state.start_time = time.time()
+# Settings can come from secrets.toml or the environment
+def get_setting(name, default=None):
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except Exception:
+        pass
+    return os.environ.get(name, default)
+
+# All per-session values live in one record (see session_record.py); the Groq client is created on first use
+session = session_record.get(st.session_state)
+
+QUIZ_DEDUP_THRESHOLD = float(get_setting("QUIZ_DEDUP_THRESHOLD", 0.8))
+DATASET_DEDUP_THRESHOLD = float(get_setting("DATASET_DEDUP_THRESHOLD", 0.9))
+DATASET_INDEX_PATH = get_setting("DATASET_INDEX_PATH", "data/general_knowledge_qa.minhash")
+TRIVIA_CSV = "data/general_knowledge_qa.csv"
+TRIVIA_STORE_DIR = get_setting("TRIVIA_STORE_DIR", "data/general_knowledge_qa.columns")
+# Per-rerun metrics are opt-in: set METRICS_FILE (rotated past METRICS_MAX_BYTES) and/or METRICS_SUMMARY_FILE
+# (one file per process); set PROFILE_SLOW_RERUN_MS to dump stacks for slow reruns
+metrics.configure(
+    metrics_file=get_setting("METRICS_FILE"),
+    summary_file=get_setting("METRICS_SUMMARY_FILE"),
+    profile_dir=get_setting("PROFILE_DIR", "profiles"),
+    slow_rerun_ms=get_setting("PROFILE_SLOW_RERUN_MS"),
+    max_bytes=get_setting("METRICS_MAX_BYTES", metrics.MAX_METRICS_BYTES)
+)
+
+# Lobby state backend: "sqlite" (shared WAL file), "redis" (LOBBY_REDIS_URL) or "memory" (single process)
+LOBBY_BACKEND = get_setting("LOBBY_BACKEND", lobby_store.LOBBY_BACKEND)
+if LOBBY_BACKEND == "redis":
+    lobby_store.configure_backend("redis", url=get_setting("LOBBY_REDIS_URL", "redis://localhost:6379/0"))
+elif LOBBY_BACKEND == "sqlite":
+    lobby_store.configure_backend("sqlite", path=get_setting("LOBBY_DB", lobby_store.LOBBY_DB))
+else:
+    lobby_store.configure_backend(LOBBY_BACKEND)
+
+# "remote" uses Groq only, "local" never leaves the process, "hybrid" falls back to local
+QUIZ_GENERATORS = ["hybrid", "remote", "local"]
+QUIZ_GENERATOR = get_setting("QUIZ_GENERATOR", "hybrid")
+
+# Seconds the correct answer stays on screen; questions reveal early once everyone connected has answered
+REVEAL_SECONDS = float(get_setting("REVEAL_SECONDS", game_engine.REVEAL_SECONDS))
 
 # Kahoot-like colors for options
 OPTION_COLORS = ["#FF2B2B", "#1E88E5", "#FFC107", "#4CAF50"]
 OPTION_LABELS = ["🟥", "🟦", "🟨", "🟩"]
 EMOJI_AVATARS = ["🧠", "🚀", "💡", "📚", "🎓", "🌟", "🤓", "😎", "🧐", "🤔"]
 
-# --- Database Functions (JSON file) ---
-USERS_DB = "users.json"
-LOBBIES_DB = "lobbies.json"
-
-def load_users():
-    if not os.path.exists(USERS_DB):
-        return {}
-    with open(USERS_DB, "r") as f:
-        return json.load(f)
-
-def save_users(users):
-    with open(USERS_DB, "w") as f:
-        json.dump(users, f, indent=4)
-
-def load_lobbies():
-    if not os.path.exists(LOBBIES_DB):
-        return {}
-    with open(LOBBIES_DB, "r") as f:
-        return json.load(f)
-
-def save_lobbies(lobbies):
-    with open(LOBBIES_DB, "w") as f:
-        json.dump(lobbies, f, indent=4)
-
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+# --- Database Functions (JSON file, see lobby_store.py) ---
+QUIZ_DB = question_bank.QUIZ_DB
 
 # --- Utility Functions ---
 def set_page(page, prev_page=None):
     if prev_page:
-        st.session_state.prev_page = prev_page
-    st.session_state.current_page = page
+        session.prev_page = prev_page
+    session.current_page = page
     st.rerun()
 
-# Function to load general knowledge data
+# Function to load general knowledge data (the columnar copy is shared by every session in the process)
 def load_trivia_data():
+    import dedup
+    import trivia_store
     try:
-        data_path = "data/general_knowledge_qa.csv"
-        if os.path.exists(data_path):
-            df = pd.read_csv(data_path)
-            st.session_state.trivia_data = df
-            if 'category' in df.columns:
-                st.session_state.trivia_categories = df['category'].unique().tolist()
-            return True
+        if os.path.exists(TRIVIA_CSV):
+            dataset = trivia_store.open_dataset(TRIVIA_CSV, TRIVIA_STORE_DIR, prepare=lambda df: dedup.dedupe_dataframe(
+                df, TRIVIA_CSV, DATASET_INDEX_PATH, DATASET_DEDUP_THRESHOLD))
+        elif session.trivia_data is not None and session.trivia_data.path is None:
+            dataset = session.trivia_data
         else:
-            st.session_state.trivia_data = pd.DataFrame({
+            import pandas as pd
+            dataset = trivia_store.TriviaDataset.from_frame(pd.DataFrame({
                 'question': ['What is the capital of France?','Which planet is known as the Red Planet?','Who painted the Mona Lisa?','What is the largest mammal in the world?','In which year did World War II end?','What is the chemical symbol for gold?','Who wrote "Romeo and Juliet"?','What is the largest ocean on Earth?','How many elements are in the periodic table?','What is the tallest mountain in the world?'],
                 'answer': ['Paris','Mars','Leonardo da Vinci','Blue Whale','1945','Au','William Shakespeare','Pacific Ocean','118','Mount Everest'],
                 'options': ['Paris|London|Berlin|Madrid','Mars|Venus|Jupiter|Saturn','Leonardo da Vinci|Pablo Picasso|Vincent van Gogh|Michelangelo','Blue Whale|Elephant|Giraffe|Hippopotamus','1945|1918|1939|1941','Au|Ag|Fe|Cu','William Shakespeare|Charles Dickens|Jane Austen|Mark Twain','Pacific Ocean|Atlantic Ocean|Indian Ocean|Arctic Ocean','118|92|108|132','Mount Everest|K2|Kilimanjaro|Matterhorn'],
                 'category': ['Geography','Science','Art','Science','History','Science','Literature','Geography','Science','Geography'],
                 'difficulty': ['Easy','Easy','Medium','Medium','Hard','Medium','Easy','Easy','Hard','Medium']
-            })
-            st.session_state.trivia_categories = ['Geography', 'Science', 'Art', 'History', 'Literature']
-            return True
+            }))
+        session.trivia_data = dataset
+        return True
     except Exception as e:
         st.error(f"Error loading trivia data: {str(e)}")
         return False
 
+# Function to get this player's weighted sampler for a category/difficulty filter.
+# Samplers are cached per session and re-weighed in place after each answer.
+def get_trivia_sampler(dataset, category, difficulty):
+    import trivia_sampler
+    index = dataset.index
+    if session.trivia_index is not index:
+        session.trivia_index = index
+        session.trivia_samplers = {}
+    history = session.trivia_history
+    if history is None or history.user_id != session.user_id:
+        history = trivia_sampler.TriviaHistory(session.user_id, QUIZ_DB)
+        session.trivia_history = history
+        session.trivia_samplers = {}
+    key = (category or "All", difficulty or "All")
+    if key not in session.trivia_samplers:
+        rows = dataset.rows_matching(*key)
+        session.trivia_samplers[key] = trivia_sampler.AdaptiveSampler(index, rows, history)
+    return session.trivia_samplers[key]
+
+# Function to record revealed trivia answers in the player's history and re-weigh the samplers
+def record_trivia_results(engine, events):
+    history = session.trivia_history
+    index = session.trivia_index
+    player = engine.player(session.user_id)
+    if history is None or index is None or player is None:
+        return
+    for kind, question_index in events:
+        if kind != "reveal":
+            continue
+        key = engine.questions[question_index].get("trivia_key")
+        if key is None:
+            continue
+        history.record(key, player.results[question_index][1])
+        row = int(index.rows_for_keys([key])[0])
+        if row >= 0:
+            for sampler in session.trivia_samplers.values():
+                sampler.refresh(row)
+
 # Function to generate trivia quiz from the dataset
 def generate_trivia_quiz(category=None, difficulty=None, num_questions=5):
-    if st.session_state.trivia_data is None:
+    import trivia_store
+    # Picks up a re-ingested dataset when the CSV has changed since this session loaded it
+    if session.trivia_data is None or trivia_store.is_stale(session.trivia_data):
         if not load_trivia_data():
             return None
     
-    df = st.session_state.trivia_data
-    if category and category != "All" and 'category' in df.columns:
-        df = df[df['category'] == category]
-    if difficulty and difficulty != "All" and 'difficulty' in df.columns:
-        df = df[df['difficulty'] == difficulty]
-    
-    if len(df) > num_questions:
-        df = df.sample(n=num_questions)
+    dataset = session.trivia_data
+    sampler = get_trivia_sampler(dataset, category, difficulty)
+    rows = sampler.sample(num_questions, random)
     
     quiz_data = {
         "quiz_title": f"General Knowledge Trivia - {category if category else 'All Categories'}",
         "questions": []
     }
     
-    for _, row in df.iterrows():
+    for row in rows:
+        correct_answer = dataset.answer(row)
         question = {
-            "question": row['question'],
-            "correct_answer": row['answer'],
-            "question_type": "mcq"
+            "question": dataset.question(row),
+            "correct_answer": correct_answer,
+            "question_type": "mcq",
+            "trivia_key": int(dataset.keys[row])
         }
-        if 'options' in row and pd.notna(row['options']) and len(row['options'].split('|')) == 4:
-            options = row['options'].split('|')
+        options = dataset.options(row)
+        if len(options) == 4:
             random.shuffle(options)
             question["options"] = options
         else:
-            all_answers = st.session_state.trivia_data['answer'].tolist()
-            correct_answer = row['answer']
-            incorrect_answers = [ans for ans in all_answers if ans != correct_answer]
+            # Borrow distractors from random rows instead of scanning every answer
+            incorrect_answers = set()
+            for _ in range(20):
+                answer = dataset.answer(random.randrange(len(dataset)))
+                if answer != correct_answer:
+                    incorrect_answers.add(answer)
+                if len(incorrect_answers) == 3:
+                    break
             
             if len(incorrect_answers) >= 3:
-                options = random.sample(incorrect_answers, 3)
+                options = list(incorrect_answers)
                 options.append(correct_answer)
                 random.shuffle(options)
             else:
@@ -190,35 +199,43 @@ def generate_trivia_quiz(category=None, difficulty=None, num_questions=5):
         quiz_data["questions"].append(question)
     return quiz_data
 
-# Function to extract text from different file types
+# Function to extract text from different file types (parsers are registered in document_formats.py)
 def extract_text_from_file(file):
-    file_type = file.type
-    text = ""
+    if file.type not in document_formats.FORMATS:
+        return ""
     try:
-        if file_type == "text/plain":
-            text = str(file.read(), "utf-8")
-        elif file_type == "application/pdf":
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            doc = docx.Document(io.BytesIO(file.read()))
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        elif file_type == "application/vnd.openxmlformats-officedocument.presentationml.presentation":
-            prs = Presentation(io.BytesIO(file.read()))
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + "\n"
-        return text
+        return document_formats.extract_text(file.read(), file.type)
     except Exception as e:
         st.error(f"Error extracting text: {e}")
         return ""
 
-# Function to generate quiz using Groq API
-def generate_quiz(text, game_mode, num_questions=5):
-    if not st.session_state.groq_client:
+# Function to create the Groq client the first time a quiz is generated with it
+def get_groq_client():
+    if session.groq_client is None and get_setting("GROQ_API_KEY"):
+        try:
+            import groq
+            session.groq_client = groq.Client(api_key=get_setting("GROQ_API_KEY"))
+        except Exception as e:
+            st.error(f"Error initializing Groq client: {e}")
+    return session.groq_client
+
+# Function to generate quiz locally from the document text
+def generate_local_quiz(text, game_mode, num_questions=5):
+    import dedup
+    quiz_data = local_generator.generate_quiz(text, game_mode, num_questions)
+    if quiz_data:
+        quiz_data["questions"] = dedup.dedupe_questions(quiz_data["questions"], QUIZ_DEDUP_THRESHOLD)
+    return quiz_data
+
+# Function to generate quiz using Groq API (or the local generator)
+def generate_quiz(text, game_mode, num_questions=5, generator=None):
+    generator = generator or QUIZ_GENERATOR
+    if generator == "local":
+        return generate_local_quiz(text, game_mode, num_questions)
+    client = get_groq_client()
+    if not client:
+        if generator == "hybrid":
+            return generate_local_quiz(text, game_mode, num_questions)
         st.error("Groq API key not configured or is invalid. Please check your secrets.toml file.")
         st.info("You can get a Groq API key from https://console.groq.com/keys")
         return None
@@ -255,97 +272,65 @@ def generate_quiz(text, game_mode, num_questions=5):
         """
     
     try:
-        chat_completion = st.session_state.groq_client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.1-8b-instant",
-            temperature=0.7,
-            max_tokens=4000
-        )
+        import dedup
+        with metrics.llm_call("groq"):
+            chat_completion = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model="llama-3.1-8b-instant",
+                temperature=0.7,
+                max_tokens=4000
+            )
         response = chat_completion.choices[0].message.content
         json_start = response.find('{')
         json_end = response.rfind('}') + 1
         json_str = response[json_start:json_end]
         quiz_data = json.loads(json_str)
+        quiz_data["questions"] = dedup.dedupe_questions(quiz_data.get("questions", []), QUIZ_DEDUP_THRESHOLD)
         return quiz_data
     except Exception as e:
+        if generator == "hybrid":
+            st.warning(f"Groq generation failed ({e}), using the offline generator instead.")
+            return generate_local_quiz(text, game_mode, num_questions)
         st.error(f"Error generating quiz: {str(e)}")
         return None
 
 # Function to create a new lobby
 def create_lobby(lobby_name, lobby_type, max_players=10):
-    lobbies = load_lobbies()
-    lobby_id = f"L{random.randint(10000, 99999)}"
-    lobbies[lobby_id] = {
-        "id": lobby_id,
-        "name": lobby_name,
-        "type": lobby_type,
-        "max_players": max_players,
-        "players": [st.session_state.user_id],
-        "player_names": [st.session_state.username],
-        "host": st.session_state.user_id,
-        "status": "waiting",
-        "quiz_data": None,
-        "scores": {st.session_state.user_id: 0},
-        "start_time": None,
-        "chat_messages": [],
-        "votes_to_start": {}
-    }
-    save_lobbies(lobbies)
-    return lobby_id
+    return lobby_store.create_lobby(lobby_name, lobby_type, max_players,
+                                    session.user_id, session.username)
 
 # Function to join a lobby
 def join_lobby(lobby_id):
-    lobbies = load_lobbies()
-    if lobby_id in lobbies:
-        lobby = lobbies[lobby_id]
-        if len(lobby["players"]) < lobby["max_players"] and st.session_state.user_id not in lobby["players"]:
-            lobby["players"].append(st.session_state.user_id)
-            lobby["player_names"].append(st.session_state.username)
-            lobby["scores"][st.session_state.user_id] = 0
-            save_lobbies(lobbies)
-            return True
-    return False
+    return lobby_store.join_lobby(lobby_id, session.user_id, session.username)
 
 # Function to start the game in a lobby
 def start_game(lobby_id):
-    lobbies = load_lobbies()
-    if lobby_id in lobbies:
-        lobbies[lobby_id]["status"] = "playing"
-        lobbies[lobby_id]["current_question"] = 0
-        lobbies[lobby_id]["question_start_time"] = time.time()
-        lobbies[lobby_id]["user_answers"] = {}
-        lobbies[lobby_id]["user_scores"] = {player_id: 0 for player_id in lobbies[lobby_id]["players"]}
-        save_lobbies(lobbies)
-        st.session_state.current_page = "playing"
+    if lobby_store.start_game(lobby_id, reveal_seconds=REVEAL_SECONDS):
+        reset_game_state()
+        session.hosting = True
+        session.prev_page = "lobby_page"
+        session.current_page = "playing"
         st.rerun()
         return True
     return False
 
-# Function to check answer
-def check_answer(question, user_answer, qtype):
-    if not user_answer:
+# Function to play a lobby's last finished game against its recording; runs locally like a trivia game
+def start_ghost_game(lobby_id):
+    timeline = lobby_store.load_replay(lobby_id)
+    quiz = lobby_store.load_quiz(timeline["quiz_id"]) if timeline else None
+    if quiz is None:
         return False
-    correct_answer = question.get("correct_answer")
-    if not correct_answer:
-        return False
-    if qtype in ["mcq", "true_false", "identification"]:
-        return str(user_answer).strip().lower() == str(correct_answer).strip().lower()
-    elif qtype == "enumeration":
-        correct_answers = [a.strip().lower() for a in str(correct_answer).split(",")]
-        return str(user_answer).strip().lower() in correct_answers
-    elif qtype == "essay":
-        return str(user_answer).strip() != ""
-    return False
-
-# Function to calculate score based on time and accuracy
-def calculate_score(time_taken, is_correct, question_type, accuracy=1.0):
-    base_score = 100
-    time_bonus = max(0, 5 - time_taken) * 20
-    if is_correct:
-        if question_type == "enumeration":
-            return int(base_score * accuracy + time_bonus)
-        return int(base_score + time_bonus)
-    return 0
+    lobby = lobby_store.get_lobby(lobby_id) or {}
+    reset_game_state()
+    engine = game_engine.GameEngine(quiz, [(session.user_id, session.username)], reveal_seconds=REVEAL_SECONDS)
+    engine.start()
+    score_store.record_game(engine, lobby_id=lobby_id, mode="ghost", quiz_id=timeline["quiz_id"],
+                            host_id=session.user_id, class_id=lobby.get("class_id"), db_path=QUIZ_DB)
+    session.current_lobby = None
+    session.game_engine = engine
+    session.ghost = ghost_replay.GhostReplay(timeline)
+    set_page("playing", "exam_prep")
+    return True
 
 # --- Page Functions ---
 
@@ -379,10 +364,10 @@ def login_page():
         if st.button("Login", use_container_width=True):
             users = load_users()
             if login_username in users and users[login_username]["password"] == hash_password(login_password):
-                st.session_state.is_logged_in = True
-                st.session_state.username = login_username
-                st.session_state.user_id = users[login_username]["user_id"]
-                st.session_state.avatar = users[login_username].get("avatar", "🧠")
+                session.is_logged_in = True
+                session.username = login_username
+                session.user_id = users[login_username]["user_id"]
+                session.avatar = users[login_username].get("avatar", "🧠")
                 st.success(f"Welcome back, {login_username}!")
                 set_page("home")
             else:
@@ -394,53 +379,56 @@ def login_page():
         reg_password = st.text_input("Create a Password", type="password", key="reg_password")
         reg_avatar = st.selectbox("Choose your Avatar", EMOJI_AVATARS)
         if st.button("Register", use_container_width=True):
-            users = load_users()
-            if reg_username in users:
-                st.error("This nickname is already taken.")
-            elif len(reg_password) < 4:
-                st.error("Password must be at least 4 characters long.")
-            else:
-                new_user_id = f"user_{random.randint(10000, 99999)}"
+            def register(users):
+                if reg_username in users:
+                    return "This nickname is already taken."
                 users[reg_username] = {
-                    "user_id": new_user_id,
+                    "user_id": lobby_store.new_user_id(users),
                     "password": hash_password(reg_password),
                     "avatar": reg_avatar,
                     "score": 0,
                     "quizzes_completed": 0
                 }
-                save_users(users)
-                st.success("Registration successful! Please log in.")
+                return None
+            if len(reg_password) < 4:
+                st.error("Password must be at least 4 characters long.")
+            else:
+                error = lobby_store.update_users(register)
+                if error:
+                    st.error(error)
+                else:
+                    st.success("Registration successful! Please log in.")
                 
 # Edit Profile Page
 def edit_profile_page():
     st.title("👤 Edit Profile")
     st.write("Update your nickname or avatar.")
 
-    new_username = st.text_input("New Nickname", value=st.session_state.username)
-    new_avatar = st.selectbox("Choose a new Avatar", EMOJI_AVATARS, index=EMOJI_AVATARS.index(st.session_state.avatar))
+    new_username = st.text_input("New Nickname", value=session.username)
+    new_avatar = st.selectbox("Choose a new Avatar", EMOJI_AVATARS, index=EMOJI_AVATARS.index(session.avatar))
 
     if st.button("Save Changes", type="primary"):
-        users = load_users()
-        # Handle nickname change
-        if new_username != st.session_state.username:
-            if new_username in users:
-                st.error("This nickname is already in use.")
-            else:
-                # Update users database with new nickname
-                user_data = users.pop(st.session_state.username)
+        renamed = new_username != session.username
+        def edit(users):
+            if session.username not in users:
+                return "Your account no longer exists."
+            # Handle nickname change
+            if renamed:
+                if new_username in users:
+                    return "This nickname is already in use."
+                user_data = users.pop(session.username)
                 user_data["username"] = new_username
-                user_data["avatar"] = new_avatar
                 users[new_username] = user_data
-                st.session_state.username = new_username
-                st.session_state.avatar = new_avatar
-                save_users(users)
-                st.success("Profile updated successfully!")
+            # Update avatar
+            users[new_username]["avatar"] = new_avatar
+            return None
+        error = lobby_store.update_users(edit)
+        if error:
+            st.error(error)
         else:
-            # Only update avatar
-            users[st.session_state.username]["avatar"] = new_avatar
-            st.session_state.avatar = new_avatar
-            save_users(users)
-            st.success("Avatar updated successfully!")
+            session.username = new_username
+            session.avatar = new_avatar
+            st.success("Profile updated successfully!" if renamed else "Avatar updated successfully!")
     
     if st.button("← Go Back"):
         set_page("home")
@@ -462,7 +450,7 @@ def home_page():
     
     st.markdown('<div class="main-header"><h1>🎓 QuizArena - Gamified Learning</h1></div>', unsafe_allow_html=True)
     
-    st.write(f"Welcome, **{st.session_state.username}**! 👋")
+    st.write(f"Welcome, **{session.username}**! 👋")
     
     col1, col2, col3, col4, col5 = st.columns(5)
     
@@ -513,20 +501,17 @@ def exam_prep_page():
     </style>
     """, unsafe_allow_html=True)
     
-    # Load lobbies at the start of the page function
-    st.session_state.lobbies = load_lobbies()
-
-    tab1, tab2 = st.tabs(["🎪 Create Lobby", "🚪 Join Lobby"])
+    tab1, tab2, tab3, tab4 = st.tabs(["🎪 Create Lobby", "🚪 Join Lobby", "🏫 Import Class", "🏟️ Tournament"])
     
     with tab1:
         st.subheader("Create a New Study Lobby")
-        lobby_name = st.text_input("Lobby Name", value=f"{st.session_state.username}'s Study Group")
+        lobby_name = st.text_input("Lobby Name", value=f"{session.username}'s Study Group")
         lobby_type = st.selectbox("Lobby Type", ["Private", "Public"])
         max_players = st.slider("Maximum Players", 2, 20, 10)
         
         if st.button("🎉 Create Lobby", type="primary"):
             lobby_id = create_lobby(lobby_name, lobby_type, max_players)
-            st.session_state.current_lobby = lobby_id
+            session.current_lobby = lobby_id
             st.success(f"Lobby created! Your lobby code is: **{lobby_id}**")
             set_page("lobby_page", "exam_prep") # Correctly set prev_page
             st.rerun()
@@ -537,13 +522,88 @@ def exam_prep_page():
         
         if st.button("🎯 Join Lobby", type="primary"):
             if join_lobby(lobby_id):
-                st.session_state.current_lobby = lobby_id
+                session.current_lobby = lobby_id
                 st.success("Joined lobby successfully! 🎉")
                 set_page("lobby_page", "exam_prep") # Correctly set prev_page
                 st.rerun()
             else:
                 st.error("Could not join lobby. It may be full or doesn't exist.")
 
+        st.caption("Missed the game? Play the lobby's last game against a recording of its players.")
+        if st.button("👻 Play Ghost Game"):
+            if not start_ghost_game(lobby_id):
+                st.error("This lobby has no finished game to replay yet.")
+
+    with tab3:
+        import_class_section()
+
+    with tab4:
+        tournament_section()
+
+# Function to create or join a tournament (one quiz played across many lobbies in rounds)
+def tournament_section():
+    st.subheader("Create a Tournament")
+    name = st.text_input("Tournament Name", value=f"{session.username}'s Tournament", key="tournament_name")
+    keyword = st.text_input("Question bank topic", key="tournament_topic")
+    num_questions = st.slider("Number of Questions", 5, 20, 10, key="tournament_questions")
+    lobby_size = st.slider("Players per Lobby", 2, 20, 10)
+    advance = st.slider("Players advancing from each Lobby", 1, lobby_size - 1, min(3, lobby_size - 1))
+    if keyword and st.button("🏟️ Create Tournament", type="primary"):
+        quiz_data = question_bank.assemble_quiz(keyword, num_questions, db_path=QUIZ_DB)
+        if quiz_data:
+            session.current_tournament = lobby_store.create_tournament(name, quiz_data, session.user_id, lobby_size, advance)
+            set_page("tournament", "exam_prep")
+        else:
+            st.error("No saved questions match that topic.")
+
+    st.subheader("Join a Tournament")
+    tournament_id = st.text_input("Enter Tournament Code")
+    if st.button("🎟️ Join Tournament"):
+        if lobby_store.join_tournament(tournament_id, session.user_id, session.username):
+            session.current_tournament = tournament_id
+            set_page("tournament", "exam_prep")
+        else:
+            st.error("Could not join. The tournament may have started already or doesn't exist.")
+
+# Function to show the n best players of a tournament round across all of its lobbies, plus this player's rank
+def tournament_standings_section(tournament_id, record=None, n=10):
+    record = record or lobby_store.get_tournament(tournament_id)
+    standings = lobby_store.tournament_standings(tournament_id, record=record) if record else None
+    if not standings:
+        return
+    import pandas as pd
+    st.subheader(f"🏟️ Tournament Standings · Round {len(record['rounds'])}")
+    rows = [{"Rank": standings.rank(player_id), "Username": record["players"].get(player_id, player_id), "Score": score}
+            for player_id, score in standings.top(n)]
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    rank = standings.rank(session.user_id)
+    if rank:
+        st.write(f"Your rank: **#{rank}** of {len(standings)}")
+
+# Function to create accounts for a whole class from a CSV roster, optionally with a lobby for it
+def import_class_section():
+    import roster
+    st.subheader("Import a Class Roster")
+    st.caption("CSV with a `nickname` column and optional `password` and `avatar` columns. "
+               "Students without a password get a generated one.")
+    roster_file = st.file_uploader("Roster CSV", type=["csv"], key="roster_file")
+    class_name = st.text_input("Class Name", key="class_name")
+    with_lobby = st.checkbox("Create a lobby for this class", value=True)
+    if roster_file and st.button("📋 Import Students", type="primary"):
+        with st.spinner("Creating accounts..."):
+            report = roster.import_roster(roster.parse_roster(roster_file.getvalue()), class_name,
+                                          session.user_id, session.username, create_lobby=with_lobby)
+        st.success(f"Created {len(report['created'])} accounts (class {report['class_id']}).")
+        if report["lobby_id"]:
+            st.info(f"Class lobby code: **{report['lobby_id']}**")
+        if report["skipped"]:
+            with st.expander(f"Skipped {len(report['skipped'])} rows"):
+                for username, reason in report["skipped"]:
+                    st.write(f"**{username or '(blank)'}**: {reason}")
+        if report["created"]:
+            st.download_button("⬇️ Credentials (CSV)", data=roster.credentials_csv(report),
+                               file_name=f"{report['class_id']}-credentials.csv", mime="text/csv", on_click="ignore")
+
 # New Lobby Page with Continuous Rerun for players, not host
 def lobby_page():
     st.title("🎪 Lobby")
@@ -551,33 +611,29 @@ def lobby_page():
     # Use a placeholder to hold all lobby content
     lobby_placeholder = st.empty()
 
-    st.session_state.lobbies = load_lobbies()
-    lobby = st.session_state.lobbies.get(st.session_state.current_lobby)
+    lobby, lobby_version = lobby_store.read_lobby(session.current_lobby)
 
     if not lobby:
         st.error("Lobby not found.")
-        st.session_state.current_lobby = None
+        session.current_lobby = None
         set_page("exam_prep")
         st.rerun()
 
-    is_host = lobby["host"] == st.session_state.user_id
+    is_host = lobby["host"] == session.user_id
 
     # Non-host players will continuously check the status
     if not is_host:
         while True:
-            st.session_state.lobbies = load_lobbies()
-            lobby = st.session_state.lobbies.get(st.session_state.current_lobby)
-            
             if lobby and lobby["status"] == "playing":
                 st.info("The host has started the game!")
-                st.session_state.game_started = True
+                reset_game_state()
                 set_page("playing", "lobby_page")
                 st.rerun()
 
             # Clear and rebuild the content inside the placeholder
             with lobby_placeholder.container():
                 if st.button("← Leave Lobby"):
-                    st.session_state.current_lobby = None
+                    session.current_lobby = None
                     set_page("exam_prep")
                     st.rerun()
 
@@ -597,22 +653,16 @@ def lobby_page():
                     
                     chat_input = st.text_input("Type your message here...", key="chat_input")
                     if st.button("Send", use_container_width=True) and chat_input:
-                        new_message = {
-                            "username": st.session_state.username,
-                            "message": chat_input,
-                            "timestamp": datetime.now().isoformat()
-                        }
-                        lobby["chat_messages"].append(new_message)
-                        save_lobbies(st.session_state.lobbies)
+                        lobby_store.post_chat_message(lobby["id"], session.username, chat_input)
                         st.rerun()
             
-            # Rerun automatically every second to check for updates
-            time.sleep(1)
+            # Rerun as soon as the lobby changes (or after a second) to show updates
+            lobby_store.wait_for_lobby_change(lobby["id"], lobby_version, timeout=1.0)
             st.rerun()
     else:
         # Host's static view
         if st.button("← Leave Lobby"):
-            st.session_state.current_lobby = None
+            session.current_lobby = None
             set_page("exam_prep")
             st.rerun()
 
@@ -629,26 +679,44 @@ def lobby_page():
             game_mode = st.selectbox("Select Game Mode", 
                                     ["Multiple Choice", "True or False", "Identification", "Enumeration", "Mix Mode"])
             num_questions = st.slider("Number of Questions", 5, 20, 10)
+            generator = st.selectbox("Quiz Generator", QUIZ_GENERATORS,
+                                     index=QUIZ_GENERATORS.index(QUIZ_GENERATOR) if QUIZ_GENERATOR in QUIZ_GENERATORS else 0,
+                                     format_func=lambda g: {"hybrid": "Hybrid (AI, offline fallback)", "remote": "AI (Groq)", "local": "Offline (instant)"}[g])
             
             if uploaded_file and st.button("⚡ Generate Quiz", type="primary"):
                 with st.spinner("Extracting text and generating quiz..."):
                     text = extract_text_from_file(uploaded_file)
                     if text:
-                        quiz_data = generate_quiz(text, game_mode, num_questions)
+                        quiz_data = generate_quiz(text, game_mode, num_questions, generator)
                         if quiz_data:
-                            lobby["quiz_data"] = quiz_data
-                            save_lobbies(st.session_state.lobbies)
+                            lobby_store.set_quiz_data(lobby["id"], quiz_data)
+                            topic = question_bank.derive_topic(text, quiz_data.get("quiz_title", ""), uploaded_file.name)
+                            question_bank.store_questions(quiz_data.get("questions", []), lobby_id=lobby["id"],
+                                                          topic=topic, source_text=text, db_path=QUIZ_DB)
                             st.success("Quiz generated successfully! 🎯")
                             st.rerun()
                         else:
                             st.error("Failed to generate quiz.")
                     else:
                         st.error("Could not extract text from the file.")
+
+            st.subheader("🗃️ Build from Question Bank")
+            bank_keyword = st.text_input("Topic keyword", key="bank_keyword")
+            if bank_keyword and st.button("📥 Use Saved Questions"):
+                quiz_data = question_bank.assemble_quiz(bank_keyword, num_questions, db_path=QUIZ_DB)
+                if quiz_data:
+                    lobby_store.set_quiz_data(lobby["id"], quiz_data)
+                    st.success(f"Loaded {len(quiz_data['questions'])} questions from the bank! 🎯")
+                    st.rerun()
+                else:
+                    st.error("No saved questions match that topic.")
             
-            if lobby["quiz_data"] and lobby["status"] == "waiting":
+            if lobby.get("quiz_id") and lobby["status"] in ["waiting", "finished"]:
                 if st.button("🚀 Start Game", type="primary"):
                     st.success("Starting the game...")
-                    start_game(st.session_state.current_lobby)
+                    start_game(session.current_lobby)
+
+            game_history_section(lobby)
 
         with col2:
             st.subheader("💬 Lobby Chat")
@@ -662,16 +730,38 @@ def lobby_page():
             # Input for new message
             chat_input = st.text_input("Type your message here...", key="chat_input")
             if st.button("Send", use_container_width=True) and chat_input:
-                new_message = {
-                    "username": st.session_state.username,
-                    "message": chat_input,
-                    "timestamp": datetime.now().isoformat()
-                }
-                lobby["chat_messages"].append(new_message)
-                save_lobbies(st.session_state.lobbies)
+                lobby_store.post_chat_message(lobby["id"], session.username, chat_input)
                 st.rerun()
 
 
+# Function to show the host a lobby's answer log: hardest questions first, plus streaming exports
+def game_history_section(lobby):
+    st.subheader("📊 Game History")
+    with st.expander("Question difficulty and exports"):
+        stats = score_store.difficulty_stats(lobby_id=lobby["id"], db_path=QUIZ_DB)
+        if stats.empty:
+            st.info("No answers recorded for this lobby yet.")
+            return
+        quizzes = {qid: lobby_store.load_quiz(qid) for qid in stats["quiz_id"].unique() if qid}
+        stats.insert(2, "question", [quizzes[qid].questions[i]["question"] if quizzes.get(qid) else ""
+                                     for qid, i in zip(stats["quiz_id"], stats["question_index"])])
+        stats["accuracy"] = (stats["accuracy"] * 100).round(1)
+        stats = stats.round({"avg_time_ms": 0, "avg_points": 1})
+        st.dataframe(stats.drop(columns=["quiz_id"]), hide_index=True, use_container_width=True)
+
+        scopes = [("Lobby", {"lobby_id": lobby["id"]})]
+        if lobby.get("class_id"):
+            scopes.append(("Class", {"class_id": lobby["class_id"]}))
+        for label, scope in scopes:
+            cols = st.columns(2)
+            for col, (fmt, mime) in zip(cols, [("csv", "text/csv"), ("parquet", "application/vnd.apache.parquet")]):
+                with col:
+                    # The export only runs when the button is clicked
+                    st.download_button(f"⬇️ {label} history ({fmt.upper()})",
+                                       data=lambda fmt=fmt, scope=scope: score_store.export_file(fmt, db_path=QUIZ_DB, **scope),
+                                       file_name=f"{label.lower()}-{next(iter(scope.values()))}-history.{fmt}",
+                                       mime=mime, key=f"export_{label}_{fmt}", use_container_width=True)
+
 # Functions for color logic
 def get_random_color():
     return f"#{random.randint(0, 0xFFFFFF):06x}"
@@ -682,8 +772,96 @@ def get_text_color(hex_color):
     luminance = (0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2]) / 255
     return "white" if luminance < 0.5 else "black"
 
-# Function to play the game
-def play_game(quiz_data, current_idx, question_start_time):
+# Function to reset per-game session values
+def reset_game_state():
+    session.reset_game()
+
+# Mirror the engine's view of this player into the sidebar values
+def sync_player_state(player):
+    session.user_score = player.score
+    session.streak = player.streak
+
+# Tournament page: sign-ups, rounds and cross-lobby standings. Players are sent to their lobby's game
+# as soon as a round that seats them starts; the host starts each round.
+def tournament_page():
+    st.title("🏟️ Tournament")
+    tournament_id = session.current_tournament
+    record, version = lobby_store.read_tournament(tournament_id) if tournament_id else (None, 0)
+    if st.button("← Go Back"):
+        session.current_tournament = None
+        set_page("exam_prep")
+    if not record:
+        st.error("Tournament not found.")
+        return
+
+    is_host = record["host"] == session.user_id
+    rounds = record["rounds"]
+    seat = rounds[-1]["seats"].get(session.user_id) if rounds else None
+    if record["status"] == "playing" and seat and (lobby_store.get_lobby(seat) or {}).get("status") == "playing":
+        reset_game_state()
+        session.current_lobby = seat
+        set_page("playing", "tournament")
+
+    st.markdown(f'### {record["name"]} ({record["id"]})')
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Players", len(record["players"]))
+    col2.metric("Round", len(rounds))
+    col3.metric("Lobbies", len(rounds[-1]["lobbies"]) if rounds else 0)
+
+    if record["status"] == "finished":
+        winner = record["winner"]
+        st.success(f"🏆 Winner: **{record['players'].get(winner, winner)}**")
+    elif record["status"] == "waiting":
+        entrants = rounds[-1]["qualified"] if rounds else list(record["players"])
+        if rounds:
+            st.info(f"Round {len(rounds)} is over. {len(entrants)} players go through to the next round.")
+            if session.user_id not in entrants and session.user_id in record["players"]:
+                st.warning("You were knocked out this round. Thanks for playing!")
+        else:
+            st.info(f"Waiting for players. Share the code **{record['id']}** to let them join.")
+            st.write(", ".join(record["players"].values()))
+        if is_host and len(entrants) >= 2 and st.button(f"🚀 Start Round {len(rounds) + 1}", type="primary"):
+            lobby_store.start_round(tournament_id, reveal_seconds=REVEAL_SECONDS)
+            st.rerun()
+    elif record["status"] == "playing" and is_host:
+        lobby_store.finish_round(tournament_id, len(rounds) - 1)
+
+    tournament_standings_section(tournament_id, record)
+
+    if record["status"] != "finished":
+        lobby_store.wait_for_tournament_change(tournament_id, version, timeout=1.0)
+        st.rerun()
+
+# Function to show the host the live answer distribution, read from the engine's running counters
+def host_dashboard(engine):
+    summary = engine.answer_summary()
+    answered = summary["answered"]
+    st.markdown("---")
+    st.subheader("📡 Live Answers")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Answered", f"{answered}/{summary['players']}")
+    col2.metric("Correct", f"{summary['correct_pct']:.0f}%" if answered else "–")
+    col3.metric("Avg. time", f"{summary['avg_time_ms'] / 1000:.1f}s" if answered else "–")
+    for label, count in summary["distribution"]:
+        st.progress(count / answered if answered else 0.0, text=f"{label}: {count}")
+
+# Function to show how the recorded players did on the current question, replayed from their timings
+def ghost_panel(engine, ghost, player):
+    index = engine.state.question_index
+    st.markdown("---")
+    st.subheader("👻 Ghost Race")
+    if engine.phase == game_engine.QUESTION:
+        elapsed_ms = (engine.clock() - engine.state.phase_started) * 1000
+        st.write(f"{ghost.answered_by(index, elapsed_ms)}/{len(ghost)} recorded players have answered")
+    else:
+        rows = [(name, score, "👻") for name, score in ghost.scores_after(index)]
+        rows.append((player.name, player.score, "🧑"))
+        for rank, (name, score, icon) in enumerate(sorted(rows, key=lambda row: -row[1]), start=1):
+            st.write(f"{rank}. {icon} **{name}** – {int(score)}")
+
+# Function to play the game (a view over game_engine.GameEngine).
+# `wait(timeout)` paces the reruns; the host passes one that returns as soon as an answer lands.
+def play_game(engine, player_id, submit_answer, wait=time.sleep, dashboard=False, ghost=None, tournament_id=None):
     st.markdown("""
     <style>
     .question-container {
@@ -731,189 +909,141 @@ def play_game(quiz_data, current_idx, question_start_time):
     </style>
     """, unsafe_allow_html=True)
     
-    questions = quiz_data["questions"]
+    questions = engine.questions
+    player = engine.player(player_id)
+    if player is None:
+        st.error("You are not part of this game.")
+        return
+    sync_player_state(player)
     
-    if current_idx < len(questions):
-        question = questions[current_idx]
-        
-        # Set dynamic time limit based on question type
-        if question["question_type"] in ["identification", "enumeration"]:
-            answer_length = len(question.get("correct_answer", ""))
-            time_limit = min(15, max(10, 10 + answer_length // 5)) # 10-15 seconds
-        else:
-            time_limit = 10
+    if engine.phase in [game_engine.QUESTION, game_engine.REVEAL]:
+        current_idx = engine.state.question_index
+        question = engine.current_question()
         
         # Display the question and timer
         st.markdown(f'<div class="question-container"><h2>Question {current_idx + 1} of {len(questions)}</h2><h3>{question["question"]}</h3></div>', unsafe_allow_html=True)
         timer_placeholder = st.empty()
-
-        elapsed_time = time.time() - question_start_time
-        time_remaining = int(max(0, time_limit - elapsed_time))
+        time_remaining = engine.time_remaining()
         
-        with timer_placeholder.container():
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                st.markdown(f'<div class="timer-container">{time_remaining}s</div>', unsafe_allow_html=True)
-
-        # Check if timer has run out
-        if time_remaining <= 0:
-            if not st.session_state.answer_submitted:
-                st.session_state.selected_answer = "Time's up!"
-            
-            time_taken = int(time.time() - question_start_time)
-            is_correct = check_answer(question, st.session_state.selected_answer, question["question_type"])
-            accuracy = 1.0
-            score = calculate_score(time_taken, is_correct, question["question_type"], accuracy)
-            
-            st.session_state.user_score += score
-            if st.session_state.current_lobby:
-                lobbies = load_lobbies()
-                lobbies[st.session_state.current_lobby]["scores"][st.session_state.user_id] += score
-                save_lobbies(lobbies)
-            if is_correct:
-                st.session_state.streak += 1
-            else:
-                st.session_state.streak = 0
-            
-            st.session_state.user_answers[current_idx] = {
-                "user_answer": st.session_state.selected_answer,
-                "correct_answer": question["correct_answer"],
-                "is_correct": is_correct,
-                "score": score,
-                "time_taken": time_taken
-            }
-            
-            st.markdown("---")
-            if is_correct:
-                st.success("✅ Correct!")
-            else:
-                st.error("❌ Incorrect!")
-            
-            st.info(f"The correct answer was: **{question['correct_answer']}**")
-            st.info(f"You earned: **{int(score)}** points!")
-            
-            time.sleep(3)
+        if engine.phase == game_engine.QUESTION:
+            with timer_placeholder.container():
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col2:
+                    st.markdown(f'<div class="timer-container">{math.ceil(time_remaining)}s</div>', unsafe_allow_html=True)
             
-            if st.session_state.current_lobby:
-                lobbies = load_lobbies()
-                lobbies[st.session_state.current_lobby]["current_question"] += 1
-                lobbies[st.session_state.current_lobby]["question_start_time"] = time.time()
-                save_lobbies(lobbies)
-            else:
-                st.session_state.current_question += 1
-                st.session_state.question_start_time = time.time()
-
-            st.session_state.selected_answer = None
-            st.session_state.answer_submitted = False
-            st.rerun()
-
-        # Display options based on question type
-        if not st.session_state.answer_submitted:
-            if question["question_type"] == "mcq":
+            # Display options based on question type
+            if player.answered_at is not None:
+                st.info("✅ Answer submitted! Waiting for the timer...")
+            elif question["question_type"] == "mcq":
                 options = question.get("options", [])
                 cols = st.columns(2)
                 for i, option in enumerate(options):
                     with cols[i % 2]:
-                        random_color = OPTION_COLORS[i % 4]
-                        text_color = get_text_color(random_color)
-                        button_style = f"background-color: {random_color}; color: {text_color};"
-                        
                         if st.button(option, key=f"q{current_idx}_{i}", use_container_width=True):
-                            st.session_state.selected_answer = option
-                            st.session_state.answer_submitted = True
+                            submit_answer(option)
                             st.rerun()
-
             elif question["question_type"] == "true_false":
-                options = ["True", "False"]
-                col1, col2 = st.columns(2)
-                for i, option in enumerate(options):
-                    with locals()[f"col{i+1}"]:
-                        random_color = OPTION_COLORS[i % 2]
-                        text_color = get_text_color(random_color)
-                        button_style = f"background-color: {random_color}; color: {text_color};"
-                        
+                cols = st.columns(2)
+                for i, option in enumerate(["True", "False"]):
+                    with cols[i]:
                         if st.button(option, key=f"q{current_idx}_{i}", use_container_width=True):
-                            st.session_state.selected_answer = option
-                            st.session_state.answer_submitted = True
+                            submit_answer(option)
                             st.rerun()
             else:
                 user_answer = st.text_input("Your answer:", key=f"q{current_idx}")
                 if st.button("Submit Answer", key=f"submit_{current_idx}"):
-                    st.session_state.selected_answer = user_answer
-                    st.session_state.answer_submitted = True
+                    submit_answer(user_answer)
                     st.rerun()
+        else:
+            answer, is_correct, score, time_taken = player.results[-1]
+            st.markdown("---")
+            if is_correct:
+                st.success("✅ Correct!")
+            else:
+                st.error("❌ Incorrect!")
+            st.info(f"The correct answer was: **{question['correct_answer']}**")
+            st.info(f"You earned: **{int(score)}** points!")
+            if player.time_taken_ms is not None:
+                st.caption(f"⏱️ Answered in {player.time_taken_ms / 1000:.2f}s")
+
+        if dashboard:
+            host_dashboard(engine)
+        if ghost:
+            ghost_panel(engine, ghost, player)
         
-        # Rerun to update timer if time is still left
-        if time_remaining > 0:
-            time.sleep(1)
-            st.rerun()
+        # Rerun to update the timer or move on once the reveal is over
+        wait(min(1, max(0.1, time_remaining)))
+        st.rerun()
             
-    else:
+    elif engine.phase == game_engine.FINISHED:
         # Quiz completed
         st.balloons()
         st.markdown('<div class="question-container"><h2>🎉 Quiz Completed!</h2></div>', unsafe_allow_html=True)
         
-        # Update user's global score
-        users = load_users()
-        if st.session_state.username in users:
-            users[st.session_state.username]["score"] += st.session_state.user_score
-            users[st.session_state.username]["quizzes_completed"] += 1
-            save_users(users)
+        # Update user's global score once per game
+        if not session.game_recorded:
+            def add_score(users):
+                if session.username not in users:
+                    return lobby_backend.ABORT
+                users[session.username]["score"] += player.score
+                users[session.username]["quizzes_completed"] += 1
+                return True
+            lobby_store.update_users(add_score)
+            if not session.current_lobby:
+                score_store.finish_game(engine, db_path=QUIZ_DB)
+            if ghost:
+                lobby_store.record_ghost_run(ghost.lobby_id, ghost.game_id, session.user_id, session.username, player.score)
+            session.game_recorded = True
 
         # Display Match Leaderboard
         st.subheader("🏆 Match Leaderboard")
-        match_scores = []
-        if st.session_state.current_lobby:
-            lobbies = load_lobbies()
-            lobby = lobbies[st.session_state.current_lobby]
-            for user_id, score in lobby["scores"].items():
-                username = next((name for p_id, name in zip(lobby["players"], lobby["player_names"]) if p_id == user_id), "Unknown")
-                match_scores.append({"Username": username, "Score": int(score)})
-        else:
-            match_scores.append({"Username": st.session_state.username, "Score": int(st.session_state.user_score)})
-
+        match_scores = [{"Username": p.name, "Score": int(p.score)} for p in engine.standings()]
+        if ghost:
+            match_scores += [{"Username": f"👻 {name}", "Score": int(score)}
+                             for name, score in ghost.scores_after(len(questions) - 1)]
+        import pandas as pd
         match_df = pd.DataFrame(match_scores)
         match_df = match_df.sort_values(by="Score", ascending=False).reset_index(drop=True)
         match_df.index = match_df.index + 1
         match_df.insert(0, 'Rank', match_df.index)
         st.dataframe(match_df, use_container_width=True, hide_index=True)
+
+        if ghost:
+            st.subheader("👻 Lobby Ranking")
+            ranking = [{"Rank": rank, "Username": name, "Score": int(score), "Played": "👻 ghost" if run else "live"}
+                       for rank, (name, score, run) in enumerate(lobby_store.ghost_ranking(ghost.lobby_id), start=1)]
+            st.dataframe(pd.DataFrame(ranking), use_container_width=True, hide_index=True)
+
+        if tournament_id:
+            tournament_standings_section(tournament_id)
         
         # Action buttons
         if st.button("🔄 Play Again", type="primary"):
-            st.session_state.current_question = 0
-            st.session_state.user_answers = {}
-            st.session_state.user_score = 0
-            st.session_state.game_started = False
-            st.session_state.selected_answer = None
-            st.session_state.answer_submitted = False
-            st.session_state.streak = 0
-            st.session_state.question_start_time = time.time()  # Reset timer for next game
-            st.session_state.current_page = st.session_state.prev_page
+            reset_game_state()
+            session.current_page = session.prev_page
             st.rerun()
             
-        if st.session_state.prev_page == "lobby_page":
+        if session.prev_page == "tournament":
+            if st.button("← Go Back to Tournament"):
+                reset_game_state()
+                session.current_lobby = None
+                set_page("tournament")
+        elif session.prev_page == "lobby_page":
             if st.button("← Go Back to Quiz Lobby"):
-                # Reset all game-related state variables for a clean return
-                st.session_state.current_question = 0
-                st.session_state.user_answers = {}
-                st.session_state.user_score = 0
-                st.session_state.game_started = False
-                st.session_state.selected_answer = None
-                st.session_state.answer_submitted = False
-                st.session_state.streak = 0
-                st.session_state.question_start_time = time.time()
+                reset_game_state()
                 set_page("lobby_page")
+        elif ghost:
+            if st.button("← Go Back to Quiz Lobby"):
+                reset_game_state()
+                set_page("exam_prep")
         else:
             if st.button("← Go Back to Trivia Page"):
-                st.session_state.current_question = 0
-                st.session_state.user_answers = {}
-                st.session_state.user_score = 0
-                st.session_state.game_started = False
-                st.session_state.selected_answer = None
-                st.session_state.answer_submitted = False
-                st.session_state.streak = 0
-                st.session_state.question_start_time = time.time()  # Reset timer for next game
+                reset_game_state()
                 set_page("trivia")
+    else:
+        st.info("Waiting for the game to start...")
+        time.sleep(1)
+        st.rerun()
 
 # Trivia page
 def trivia_page():
@@ -934,7 +1064,7 @@ def trivia_page():
     if st.button("← Go Back"):
         set_page("home")
     
-    if st.session_state.trivia_data is None:
+    if session.trivia_data is None:
         load_trivia_data()
     
     st.subheader("Test your general knowledge! 🧠")
@@ -942,8 +1072,8 @@ def trivia_page():
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.session_state.trivia_categories:
-            category = st.selectbox("Select Category", ["All"] + st.session_state.trivia_categories)
+        if session.trivia_data is not None and session.trivia_data.categories:
+            category = st.selectbox("Select Category", ["All"] + session.trivia_data.categories)
         else:
             category = "All"
         
@@ -955,37 +1085,54 @@ def trivia_page():
         if st.button("🚀 Start Trivia Quiz", type="primary"):
             quiz_data = generate_trivia_quiz(category, difficulty, num_questions)
             if quiz_data:
-                st.session_state.quiz_data = quiz_data
-                st.session_state.current_question = 0
-                st.session_state.user_answers = {}
-                st.session_state.user_score = 0
-                st.session_state.game_started = True
-                st.session_state.current_lobby = None # Ensure no lobby is tied to this game
-                st.session_state.question_start_time = time.time()  # Reset timer for new game
+                reset_game_state()
+                session.current_lobby = None # Ensure no lobby is tied to this game
+                engine = game_engine.GameEngine(quiz_objects.Quiz(quiz_data), [(session.user_id, session.username)],
+                                                reveal_seconds=REVEAL_SECONDS)
+                engine.start()
+                score_store.record_game(engine, mode="trivia", quiz_id=quiz_objects.quiz_id(quiz_data),
+                                        host_id=session.user_id, db_path=QUIZ_DB)
+                session.game_engine = engine
                 set_page("playing", "trivia")
             else:
                 st.error("Could not generate trivia quiz. Please try again.")
 
+# Function to submit a solo answer, store its timing and reveal right away
+def submit_solo_answer(engine, answer):
+    events = engine.handle({"type": "submit", "player_id": session.user_id, "answer": answer})
+    accepted = events[0][0] == "accepted"
+    if accepted:
+        score_store.record_answer(engine, session.user_id, db_path=QUIZ_DB)
+    score_store.record_reveals(engine, events, db_path=QUIZ_DB)
+    record_trivia_results(engine, events)
+    return accepted
+
 # Playing page (for both exam prep and trivia)
 def playing_page():
-    if st.session_state.current_lobby:
-        lobbies = load_lobbies()
-        lobby = lobbies[st.session_state.current_lobby]
-        quiz_data = lobby["quiz_data"]
-        current_idx = lobby["current_question"]
-        question_start_time = lobby["question_start_time"]
+    lobby_id = session.current_lobby
+    if lobby_id:
+        engine = lobby_store.advance_game(lobby_id, player_id=session.user_id)
+        submit = lambda answer: lobby_store.submit_answer(lobby_id, session.user_id, answer)
     else:
-        quiz_data = st.session_state.quiz_data
-        current_idx = st.session_state.current_question
-        question_start_time = st.session_state.question_start_time
-
-    if quiz_data:
-        play_game(quiz_data, current_idx, question_start_time)
+        engine = session.game_engine
+        if engine:
+            events = engine.step()
+            score_store.record_reveals(engine, events, db_path=QUIZ_DB)
+            record_trivia_results(engine, events)
+            submit = lambda answer: submit_solo_answer(engine, answer)
+
+    if engine and lobby_id and session.hosting:
+        play_game(engine, session.user_id, submit, dashboard=True,
+                  wait=lambda timeout: lobby_store.wait_for_game_progress(lobby_id, engine, timeout))
+    elif engine and lobby_id:
+        play_game(engine, session.user_id, submit,
+                  tournament_id=session.current_tournament if session.prev_page == "tournament" else None)
+    elif engine:
+        play_game(engine, session.user_id, submit, ghost=session.ghost)
     else:
         st.error("No quiz data found. Please go back and generate a quiz first.")
         if st.button("← Go Back"):
-            st.session_state.game_started = False
-            set_page(st.session_state.prev_page)
+            set_page(session.prev_page)
 
 # Leaderboards page
 def leaderboards_page():
@@ -1019,6 +1166,7 @@ def leaderboards_page():
                 "Quizzes Completed": data["quizzes_completed"]
             })
         
+        import pandas as pd
         df = pd.DataFrame(leaderboard_data)
         df = df.sort_values(by="Total Score", ascending=False).reset_index(drop=True)
         df.index = df.index + 1
@@ -1105,10 +1253,10 @@ def main():
         
         st.markdown('<div class="sidebar-header"><h2>🎓 QuizArena</h2></div>', unsafe_allow_html=True)
         
-        if st.session_state.is_logged_in:
-            st.write(f"{st.session_state.avatar} User: **{st.session_state.username}**")
-            st.write(f"⭐ Score: **{int(st.session_state.user_score)}**")
-            st.write(f"🔥 Streak: **{st.session_state.streak}**")
+        if session.is_logged_in:
+            st.write(f"{session.avatar} User: **{session.username}**")
+            st.write(f"⭐ Score: **{int(session.user_score)}**")
+            st.write(f"🔥 Streak: **{session.streak}**")
             
             st.markdown("---")
             if st.button("🏠 Home", use_container_width=True):
@@ -1121,26 +1269,31 @@ def main():
         st.write("ℹ️ About QuizArena")
         st.caption("A gamified learning platform that makes studying fun and collaborative! 🎯")
     
-    # Page routing
-    if st.session_state.is_logged_in:
-        if st.session_state.current_page == "home":
-            home_page()
-        elif st.session_state.current_page == "exam_prep":
-            exam_prep_page()
-        elif st.session_state.current_page == "trivia":
-            trivia_page()
-        elif st.session_state.current_page == "playing":
-            playing_page()
-        elif st.session_state.current_page == "leaderboards":
-            leaderboards_page()
-        elif st.session_state.current_page == "mindfulness":
-            mindfulness_page()
-        elif st.session_state.current_page == "edit_profile":
-            edit_profile_page()
-        elif st.session_state.current_page == "lobby_page":
-            lobby_page()
-    else:
-        login_page()
+    # Page routing (timed per page, see metrics.py)
+    page = session.current_page if session.is_logged_in else "login"
+    with metrics.rerun(page):
+        metrics.record_gauge("session_bytes", session_record.measure(session))
+        if session.is_logged_in:
+            if session.current_page == "home":
+                home_page()
+            elif session.current_page == "exam_prep":
+                exam_prep_page()
+            elif session.current_page == "trivia":
+                trivia_page()
+            elif session.current_page == "playing":
+                playing_page()
+            elif session.current_page == "tournament":
+                tournament_page()
+            elif session.current_page == "leaderboards":
+                leaderboards_page()
+            elif session.current_page == "mindfulness":
+                mindfulness_page()
+            elif session.current_page == "edit_profile":
+                edit_profile_page()
+            elif session.current_page == "lobby_page":
+                lobby_page()
+        else:
+            login_page()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import threading
+import weakref
+
+# --- Immutable quiz objects shared by every session in the process ---
+# A quiz is loaded once per process and the same Quiz instance is handed to every game and session
+# that plays it, so nothing may mutate it. Both classes still answer q["question"] / q.get("options")
+# so code written against the JSON dicts keeps working.
+QUESTION_FIELDS = ("question", "options", "correct_answer", "question_type", "trivia_key")
+
+_interned = weakref.WeakValueDictionary()
+_intern_lock = threading.Lock()
+
+def quiz_id(quiz_data):
+    raw = json.dumps(to_dict(quiz_data), sort_keys=True)
+    return "Q" + hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+def to_dict(quiz_data):
+    return quiz_data.to_dict() if isinstance(quiz_data, Quiz) else quiz_data
+
+class _Frozen:
+    __slots__ = ()
+    # Instances are shared across sessions; memory gauges don't charge them to any one session
+    process_shared = True
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+class Question(_Frozen):
+    # Fields the app reads get a slot; anything else a generator sent along is kept in `extra`
+    __slots__ = QUESTION_FIELDS + ("extra",)
+
+    def __init__(self, data):
+        for name in QUESTION_FIELDS:
+            value = data.get(name)
+            if name == "options" and value is not None:
+                value = tuple(value)
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "extra", tuple((k, v) for k, v in data.items() if k not in QUESTION_FIELDS))
+
+    def get(self, key, default=None):
+        if key in QUESTION_FIELDS:
+            value = getattr(self, key)
+        else:
+            value = dict(self.extra).get(key)
+        return default if value is None else value
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in QUESTION_FIELDS if getattr(self, name) is not None}
+        if self.options is not None:
+            data["options"] = list(self.options)
+        data.update(self.extra)
+        return data
+
+class Quiz(_Frozen):
+    __slots__ = ("quiz_id", "quiz_title", "questions", "__weakref__")
+
+    def __init__(self, data, qid=None):
+        object.__setattr__(self, "quiz_id", qid)
+        object.__setattr__(self, "quiz_title", data.get("quiz_title"))
+        object.__setattr__(self, "questions", tuple(q if isinstance(q, Question) else Question(q)
+                                                    for q in data.get("questions", [])))
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in Quiz.__slots__ else None
+        return default if value is None else value
+
+    def to_dict(self):
+        data = {"questions": [q.to_dict() for q in self.questions]}
+        if self.quiz_title is not None:
+            data["quiz_title"] = self.quiz_title
+        return data
+
+# Function to get the one shared Quiz for this content (built on first request, dropped when unused)
+def intern_quiz(quiz_data, qid=None):
+    qid = qid or quiz_id(quiz_data)
+    with _intern_lock:
+        quiz = _interned.get(qid)
+        if quiz is None:
+            quiz = quiz_data if isinstance(quiz_data, Quiz) and quiz_data.quiz_id == qid else Quiz(to_dict(quiz_data), qid)
+            _interned[qid] = quiz
+        return quiz
+
+def interned_count():
+    return len(_interned)
@@ -0,0 +1,81 @@
+import csv
+import io
+import secrets
+import uuid
+
+import lobby_backend
+import lobby_store
+
+# --- Classroom rosters ---
+# A CSV with one student per row (nickname, optional password and avatar) becomes accounts in one
+# locked write of users.json. Students without a password get a generated one, returned once so the
+# instructor can hand it out. Optionally a lobby tagged with the class id is created for them.
+NAME_COLUMNS = ("nickname", "username", "name")
+MIN_PASSWORD_LENGTH = 4
+DEFAULT_AVATAR = "🧠"
+
+# Function to read roster rows from CSV bytes; headers are matched case-insensitively
+def parse_roster(data):
+    text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+    rows = []
+    for raw in csv.DictReader(io.StringIO(text)):
+        row = {(key or "").strip().lower(): (value or "").strip() for key, value in raw.items()}
+        name = next((row[column] for column in NAME_COLUMNS if row.get(column)), "")
+        rows.append({"username": name, "password": row.get("password", ""), "avatar": row.get("avatar", "")})
+    return rows
+
+# Function to create accounts for every valid row. Rows are checked against each other before the
+# users file is locked, and against existing accounts inside the lock. SHA-256 of a short password
+# takes about a microsecond, so hashing inline beats handing it to a worker pool.
+def import_roster(rows, class_name=None, host_id=None, host_name=None, create_lobby=False):
+    class_id = f"C{uuid.uuid4().hex[:8]}"
+    skipped = []
+    candidates = {}
+    for row in rows:
+        username, password = row["username"], row["password"]
+        if not username:
+            skipped.append((username, "missing nickname"))
+        elif username in candidates:
+            skipped.append((username, "listed twice"))
+        elif password and len(password) < MIN_PASSWORD_LENGTH:
+            skipped.append((username, f"password shorter than {MIN_PASSWORD_LENGTH} characters"))
+        else:
+            generated = not password
+            password = password or secrets.token_urlsafe(6)
+            candidates[username] = (lobby_store.hash_password(password), row["avatar"] or DEFAULT_AVATAR,
+                                    password if generated else None)
+
+    created = []
+    def add(users):
+        taken = {user["user_id"] for user in users.values()}
+        for username, (password_hash, avatar, generated) in candidates.items():
+            if username in users:
+                skipped.append((username, "nickname already taken"))
+                continue
+            user_id = lobby_store.new_user_id(users, taken)
+            users[username] = {
+                "user_id": user_id,
+                "password": password_hash,
+                "avatar": avatar,
+                "score": 0,
+                "quizzes_completed": 0,
+                "class_id": class_id
+            }
+            created.append((username, user_id, generated))
+        return True if created else lobby_backend.ABORT
+    lobby_store.update_users(add)
+
+    lobby_id = None
+    if create_lobby and created and host_id:
+        lobby_id = lobby_store.create_lobby(class_name or f"Class {class_id}", "Private", len(created) + 1,
+                                            host_id, host_name, class_id=class_id)
+    return {"class_id": class_id, "lobby_id": lobby_id, "created": created, "skipped": skipped}
+
+# Function to build the instructor's credentials sheet; passwords appear only where they were generated
+def credentials_csv(report):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["nickname", "user_id", "password", "class_id", "lobby_id"])
+    for username, user_id, generated in report["created"]:
+        writer.writerow([username, user_id, generated or "", report["class_id"], report["lobby_id"] or ""])
+    return out.getvalue().encode("utf-8")
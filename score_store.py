@@ -0,0 +1,290 @@
+import atexit
+import csv
+import io
+import sqlite3
+import tempfile
+import threading
+import time
+
+from game_engine import TIMED_OUT
+from question_bank import QUIZ_DB
+
+# --- Per-answer game log (quiz_app.db "games" and "scores" tables) ---
+# One games row per played game and one scores row per (game, player, question). Submissions are
+# buffered per process and written in batches; points and correctness are filled in when the
+# question is revealed, in the same transaction as any buffered submissions.
+SCORES_DB = QUIZ_DB
+BUSY_TIMEOUT_S = 10
+BATCH_SIZE = 200
+FLUSH_INTERVAL_S = 1.0
+EXPORT_CHUNK_ROWS = 5000
+
+_initialized_dbs = set()
+_init_lock = threading.Lock()
+_pending = {}  # db path -> [first_buffered_at, timing rows]
+_pending_lock = threading.Lock()
+
+def connect(db_path=None):
+    db_path = db_path or SCORES_DB
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_S)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _init_lock:
+        if db_path not in _initialized_dbs:
+            init_scores(conn)
+            init_games(conn)
+            _initialized_dbs.add(db_path)
+    return conn
+
+# The scores table predates per-question timing, so missing columns are added in place.
+# WAL lets answers from many sessions commit without blocking readers.
+def init_scores(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""CREATE TABLE IF NOT EXISTS scores (
+            id TEXT PRIMARY KEY,
+            player_id TEXT,
+            game_id TEXT,
+            points INTEGER,
+            round_info TEXT
+        )""")
+    add_columns(conn, "scores", [("question_index", "INTEGER"), ("answer", "TEXT"), ("is_correct", "INTEGER"),
+                                 ("time_taken_ms", "INTEGER"), ("recorded_at", "REAL")])
+    conn.execute("CREATE INDEX IF NOT EXISTS scores_game ON scores (game_id, question_index)")
+    conn.commit()
+
+def add_columns(conn, table, columns):
+    existing = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    for name, kind in columns:
+        if name not in existing:
+            try:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+            except sqlite3.OperationalError:
+                pass  # another process added it first
+
+# The games table also predates the log; lobby games carry their host and (for class lobbies) class id
+def init_games(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS games (
+            id TEXT PRIMARY KEY,
+            lobby_id TEXT,
+            mode TEXT,
+            started_at INTEGER,
+            finished_at INTEGER
+        )""")
+    add_columns(conn, "games", [("quiz_id", "TEXT"), ("host_id", "TEXT"), ("class_id", "TEXT"), ("players", "INTEGER")])
+    conn.execute("CREATE INDEX IF NOT EXISTS games_lobby ON games (lobby_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS games_class ON games (class_id)")
+    conn.commit()
+
+def score_id(game_id, player_id, question_index):
+    return f"{game_id}:{player_id}:{question_index}"
+
+UPSERT_TIMING = """INSERT INTO scores (id, player_id, game_id, question_index, answer, time_taken_ms, recorded_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET answer = excluded.answer, time_taken_ms = excluded.time_taken_ms,
+        recorded_at = excluded.recorded_at"""
+
+UPSERT_RESULT = """INSERT INTO scores (id, player_id, game_id, question_index, answer, is_correct, points, time_taken_ms, recorded_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET is_correct = excluded.is_correct, points = excluded.points"""
+
+# Function to log a game when it starts; mode is the lobby type or "trivia" for solo games
+def record_game(engine, lobby_id=None, mode=None, quiz_id=None, host_id=None, class_id=None, db_path=None):
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO games (id, lobby_id, mode, started_at, quiz_id, host_id, class_id, players) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (engine.game_id, lobby_id, mode, int(time.time()), quiz_id, host_id, class_id,
+                          len(engine.state.players)))
+    finally:
+        conn.close()
+
+def finish_game(engine, db_path=None):
+    flush(db_path)
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute("UPDATE games SET finished_at = ? WHERE id = ? AND finished_at IS NULL",
+                         (int(time.time()), engine.game_id))
+    finally:
+        conn.close()
+
+# Buffered timing rows for db_path if they should be written now (or `force`), else []
+def _take_pending(db_path, force=False):
+    with _pending_lock:
+        entry = _pending.get(db_path)
+        if not entry:
+            return []
+        first_at, rows = entry
+        if force or len(rows) >= BATCH_SIZE or time.monotonic() - first_at >= FLUSH_INTERVAL_S:
+            del _pending[db_path]
+            return rows
+        return []
+
+def _write(db_path, timing_rows, result_rows=()):
+    if not timing_rows and not result_rows:
+        return
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.executemany(UPSERT_TIMING, timing_rows)
+            conn.executemany(UPSERT_RESULT, result_rows)
+    finally:
+        conn.close()
+
+# Function to queue an accepted submission's timing as soon as the engine stamps it
+def record_answer(engine, player_id, db_path=None):
+    player = engine.player(player_id)
+    if player is None or player.time_taken_ms is None:
+        return
+    db_path = db_path or SCORES_DB
+    index = engine.state.question_index
+    row = (score_id(engine.game_id, player_id, index), player_id, engine.game_id,
+           index, str(player.answer), player.time_taken_ms, time.time())
+    with _pending_lock:
+        _pending.setdefault(db_path, [time.monotonic(), []])[1].append(row)
+    _write(db_path, _take_pending(db_path))
+
+# Function to store every player's scored result for the questions revealed in `events`.
+# Called on every tick, so it also writes out submissions that have waited FLUSH_INTERVAL_S.
+# Players who never answered have no response time, so their time_taken_ms stays NULL.
+def record_reveals(engine, events, db_path=None):
+    db_path = db_path or SCORES_DB
+    rows = []
+    now = time.time()
+    for kind, index in events:
+        if kind != "reveal":
+            continue
+        for player_id, player in engine.state.players.items():
+            if index >= len(player.results):
+                continue
+            answer, is_correct, points, time_taken = player.results[index]
+            time_taken_ms = None if answer == TIMED_OUT else round(time_taken * 1000)
+            rows.append((score_id(engine.game_id, player_id, index), player_id, engine.game_id, index, str(answer),
+                         int(bool(is_correct)), int(points), time_taken_ms, now))
+    _write(db_path, _take_pending(db_path, force=bool(rows)), rows)
+    return len(rows)
+
+# Function to write out every buffered submission (game end, shutdown)
+def flush(db_path=None):
+    with _pending_lock:
+        paths = [db_path] if db_path else list(_pending)
+    for path in paths:
+        _write(path, _take_pending(path, force=True))
+
+atexit.register(flush)
+
+# --- Instructor exports ---
+HISTORY_SQL_COLUMNS = ["g.lobby_id", "g.class_id", "s.game_id", "g.mode", "g.quiz_id", "g.started_at", "s.player_id",
+                       "s.question_index", "s.answer", "s.is_correct", "s.points", "s.time_taken_ms", "s.recorded_at"]
+HISTORY_COLUMNS = [column.split(".")[1] for column in HISTORY_SQL_COLUMNS]
+
+def _history_query(columns, lobby_id=None, class_id=None, where=(), order=True):
+    where, params = list(where), []
+    for column, value in [("g.lobby_id", lobby_id), ("g.class_id", class_id)]:
+        if value is not None:
+            where.append(f"{column} = ?")
+            params.append(value)
+    sql = f"SELECT {', '.join(columns)} FROM scores s JOIN games g ON g.id = s.game_id"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if order:
+        sql += " ORDER BY g.started_at, s.game_id, s.question_index, s.player_id"
+    return sql, params
+
+# Function to stream a lobby's or class's answer log in chunks of at most chunk_size rows
+def iter_history(lobby_id=None, class_id=None, chunk_size=EXPORT_CHUNK_ROWS, db_path=None):
+    sql, params = _history_query(HISTORY_SQL_COLUMNS, lobby_id, class_id)
+    flush(db_path)
+    conn = connect(db_path)
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def _write_csv(out, chunks):
+    count = 0
+    writer = csv.writer(out)
+    writer.writerow(HISTORY_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+def _write_parquet(out, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([("lobby_id", pa.string()), ("class_id", pa.string()), ("game_id", pa.string()),
+                        ("mode", pa.string()), ("quiz_id", pa.string()), ("started_at", pa.int64()),
+                        ("player_id", pa.string()), ("question_index", pa.int32()), ("answer", pa.string()),
+                        ("is_correct", pa.int8()), ("points", pa.int32()), ("time_taken_ms", pa.int64()),
+                        ("recorded_at", pa.float64())])
+    count = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_batch(pa.record_batch([pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+                                               schema=schema))
+            count += len(rows)
+    return count
+
+# Function to export the log to `out` (a path or an open file; text mode for CSV, binary for Parquet).
+# Each chunk is written before the next is read, so memory stays bounded by chunk_size.
+def export_history(out, fmt="csv", lobby_id=None, class_id=None, chunk_size=EXPORT_CHUNK_ROWS, db_path=None):
+    chunks = iter_history(lobby_id, class_id, chunk_size, db_path)
+    if fmt == "parquet":
+        return _write_parquet(out, chunks)
+    if fmt != "csv":
+        raise ValueError(f"Unknown export format: {fmt}")
+    if isinstance(out, str):
+        with open(out, "w", newline="") as f:
+            return _write_csv(f, chunks)
+    return _write_csv(out, chunks)
+
+# Function to export into an anonymous temp file (spilled to disk, not memory) ready to be read back
+def export_file(fmt="csv", lobby_id=None, class_id=None, db_path=None):
+    out = tempfile.TemporaryFile()
+    if fmt == "csv":
+        text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+        export_history(text, fmt, lobby_id, class_id, db_path=db_path)
+        text.flush()
+        text.detach()
+    else:
+        export_history(out, fmt, lobby_id, class_id, db_path=db_path)
+    out.seek(0)
+    return out
+
+# Function to compute per-question difficulty for a lobby or class: attempts, accuracy, mean time and points.
+# Revealed answers are read in chunks and aggregated with groupby sums, so any history size fits.
+# Mean time only counts answers that have a time; timed-out rows logged before they were stored as
+# NULL carry the full time limit and are skipped too.
+def difficulty_stats(lobby_id=None, class_id=None, chunk_size=EXPORT_CHUNK_ROWS * 10, db_path=None):
+    import pandas as pd
+    keys = ["quiz_id", "question_index"]
+    answer_time = "CASE WHEN s.answer = '{}' THEN NULL ELSE s.time_taken_ms END AS time_taken_ms".format(
+        TIMED_OUT.replace("'", "''"))
+    sql, params = _history_query(["g.quiz_id", "s.question_index", "s.is_correct", answer_time, "s.points"],
+                                 lobby_id, class_id, where=["s.is_correct IS NOT NULL"], order=False)
+    flush(db_path)
+    conn = connect(db_path)
+    try:
+        partials = [chunk.groupby(keys, dropna=False).agg(
+                        attempts=("is_correct", "size"), correct=("is_correct", "sum"),
+                        time_ms=("time_taken_ms", "sum"), timed=("time_taken_ms", "count"), points=("points", "sum"))
+                    for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunk_size)]
+    finally:
+        conn.close()
+    if not partials:
+        return pd.DataFrame(columns=keys + ["attempts", "accuracy", "avg_time_ms", "avg_points"])
+    totals = pd.concat(partials).groupby(level=keys, dropna=False).sum()
+    stats = pd.DataFrame({
+        "attempts": totals["attempts"],
+        "accuracy": totals["correct"] / totals["attempts"],
+        "avg_time_ms": totals["time_ms"] / totals["timed"].where(totals["timed"] > 0),
+        "avg_points": totals["points"] / totals["attempts"]
+    })
+    return stats.reset_index().sort_values(["accuracy", "avg_time_ms"], ascending=[True, False], ignore_index=True)
@@ -0,0 +1,29 @@
+# --- Answer checking and scoring ---
+# Most points one answer can earn: the base score plus the full time bonus
+MAX_POINTS = 200
+
+# Function to check answer
+def check_answer(question, user_answer, qtype):
+    if not user_answer:
+        return False
+    correct_answer = question.get("correct_answer")
+    if not correct_answer:
+        return False
+    if qtype in ["mcq", "true_false", "identification"]:
+        return str(user_answer).strip().lower() == str(correct_answer).strip().lower()
+    elif qtype == "enumeration":
+        correct_answers = [a.strip().lower() for a in str(correct_answer).split(",")]
+        return str(user_answer).strip().lower() in correct_answers
+    elif qtype == "essay":
+        return str(user_answer).strip() != ""
+    return False
+
+# Function to calculate score based on time (seconds, millisecond precision) and accuracy
+def calculate_score(time_taken, is_correct, question_type, accuracy=1.0):
+    base_score = 100
+    time_bonus = max(0, 5 - time_taken) * 20
+    if is_correct:
+        if question_type == "enumeration":
+            return int(base_score * accuracy + time_bonus)
+        return int(base_score + time_bonus)
+    return 0
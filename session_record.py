@@ -0,0 +1,83 @@
+import sys
+import time
+
+# --- Per-session state ---
+# Everything quiz.py keeps between reruns for one browser session, in one slotted record stored under
+# st.session_state.session (widget values stay in st.session_state itself). Quizzes and the trivia
+# dataset/index referenced from here are shared process-wide, not copied per session.
+GAUGE_EVERY_S = 30
+
+class SessionRecord:
+    __slots__ = ("is_logged_in", "user_id", "username", "avatar", "current_page", "prev_page", "current_lobby",
+                 "current_tournament", "groq_client", "game_engine", "game_recorded", "hosting", "ghost", "user_score", "streak",
+                 "trivia_data", "trivia_index", "trivia_samplers", "trivia_history",
+                 "memory_bytes", "memory_checked_at")
+
+    def __init__(self, **values):
+        self.is_logged_in = False
+        self.user_id = None
+        self.username = ""
+        self.avatar = "🧠"
+        self.current_page = "login"
+        self.prev_page = "home"
+        self.current_lobby = None
+        self.current_tournament = None
+        self.groq_client = None
+        self.game_engine = None    # solo games only; lobby games live in lobby_store
+        self.game_recorded = False
+        self.hosting = False       # this session started the lobby game it is playing
+        self.ghost = None          # ghost_replay.GhostReplay played beside a solo game_engine
+        self.user_score = 0
+        self.streak = 0
+        self.trivia_data = None    # trivia_store.TriviaDataset (shared)
+        self.trivia_index = None   # trivia_sampler.TriviaIndex (shared)
+        self.trivia_samplers = {}  # (category, difficulty) -> trivia_sampler.AdaptiveSampler
+        self.trivia_history = None
+        self.memory_bytes = 0
+        self.memory_checked_at = 0.0
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    # Per-game values go back to their defaults between games
+    def reset_game(self):
+        self.game_engine = None
+        self.game_recorded = False
+        self.hosting = False
+        self.ghost = None
+        self.user_score = 0
+        self.streak = 0
+
+# Function to get this session's record, creating it on the first run
+def get(session_state):
+    if "session" not in session_state:
+        session_state.session = SessionRecord()
+    return session_state.session
+
+# Function to estimate the memory only this session holds. Objects whose class sets
+# process_shared (interned quizzes, the trivia dataset and index) are not counted, and objects
+# from third-party packages count at their shallow size.
+def deep_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen or getattr(type(obj), "process_shared", False):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif "." not in type(obj).__module__ and type(obj).__module__ != "builtins":
+        # This repo's flat modules; numpy arrays report their buffer through getsizeof already
+        for name in getattr(type(obj), "__slots__", ()):
+            size += deep_size(getattr(obj, name, None), seen)
+        if hasattr(obj, "__dict__"):
+            size += deep_size(vars(obj), seen)
+    return size
+
+# Function to refresh the record's memory gauge; walks the record at most every GAUGE_EVERY_S
+def measure(record, now=None):
+    now = time.monotonic() if now is None else now
+    if now - record.memory_checked_at >= GAUGE_EVERY_S or not record.memory_bytes:
+        record.memory_bytes = deep_size(record)
+        record.memory_checked_at = now
+    return record.memory_bytes
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import dedup
+
+def test_rows_differing_only_in_a_number_are_kept(tmp_path):
+    source = tmp_path / "trivia.csv"
+    source.write_text("x")
+    df = pd.DataFrame({
+        "question": [f"In which year did the long siege of the old river fortress finally end, {year}?" for year in range(1800, 1900)]
+                    + ["What is the capital of France?", "what is the capital of france ?"],
+        "answer": ["Year"] * 100 + ["Paris", "Paris"]
+    })
+    kept = dedup.dedupe_dataframe(df, str(source), str(tmp_path / "trivia.minhash"), 0.9)
+    assert len(kept) == 101
+    assert kept["question"].str.contains("France").sum() == 1
+
+def test_saved_index_is_reused(tmp_path):
+    source = tmp_path / "trivia.csv"
+    source.write_text("x")
+    index_path = str(tmp_path / "trivia.minhash")
+    df = pd.DataFrame({"question": ["Who wrote Hamlet?", "Who wrote Hamlet ?", "Who painted the Mona Lisa?"],
+                       "answer": ["Shakespeare", "Shakespeare", "Leonardo"]})
+    first = dedup.dedupe_dataframe(df, str(source), index_path, 0.9)
+    assert list(first.index) == [0, 2]
+    assert sorted(os.listdir(index_path)) == ["keep.npy", "keys.npy", "meta.json", "signatures.npy"]
+    assert np.load(os.path.join(index_path, "signatures.npy")).shape == (2, dedup.NUM_PERM)
+    assert list(dedup.dedupe_dataframe(df, str(source), index_path, 0.9).index) == [0, 2]
+
+def test_batch_signatures_match_single():
+    hasher = dedup.MinHasher()
+    texts = ["Who wrote Hamlet?", "a", "", "Capital of Peru"]
+    batch = hasher.signatures(texts)
+    assert batch.shape == (4, dedup.NUM_PERM)
+    for row, text in zip(batch, texts):
+        assert np.array_equal(row, hasher.signature(text))
+
+def test_changed_source_only_hashes_new_rows(tmp_path, monkeypatch):
+    source = tmp_path / "trivia.csv"
+    source.write_text("x")
+    index_path = str(tmp_path / "trivia.minhash")
+    df = pd.DataFrame({"question": ["Who wrote Hamlet?", "Who wrote Hamlet ?", "Who painted the Mona Lisa?"],
+                       "answer": ["Shakespeare", "Shakespeare", "Leonardo"]})
+    dedup.dedupe_dataframe(df, str(source), index_path, 0.9)
+
+    source.write_text("xy")
+    grown = pd.concat([df.iloc[[2]], df, pd.DataFrame({"question": ["Who painted the Mona Lisa ?", "What is 7 x 8?"],
+                                                         "answer": ["Leonardo", "56"]})], ignore_index=True)
+    hashed = []
+    signatures = dedup.MinHasher.signatures
+    monkeypatch.setattr(dedup.MinHasher, "signatures", lambda self, texts: hashed.extend(texts) or signatures(self, texts))
+    kept = dedup.dedupe_dataframe(grown, str(source), index_path, 0.9)
+    # Saved texts keep their signature (the first row with each one is kept); the rest are hashed and checked
+    assert list(kept.index) == [0, 1, 5]
+    assert hashed == ["Who wrote Hamlet ? Shakespeare", "Who painted the Mona Lisa? Leonardo",
+                      "Who painted the Mona Lisa ? Leonardo", "What is 7 x 8? 56"]
+    # The full recompute agrees
+    monkeypatch.setattr(dedup.MinHasher, "signatures", signatures)
+    assert list(dedup.dedupe_dataframe(grown, str(source), str(tmp_path / "fresh.minhash"), 0.9).index) == [0, 1, 5]
@@ -0,0 +1,27 @@
+import game_engine
+
+QUIZ = {"questions": [{"question": "Capital of France?", "correct_answer": "Paris", "question_type": "identification"}]}
+
+def test_touch_only_records_presence_during_a_question():
+    engine = game_engine.GameEngine(QUIZ, [("u1", "Ann")])
+    assert not engine.touch("u1", now=0.0)
+    engine.start(now=0.0)
+    assert engine.touch("u1", now=game_engine.PRESENCE_INTERVAL_S)
+    engine.step(now=1000.0)
+    assert engine.phase == game_engine.FINISHED
+    version = engine.version
+    assert not engine.touch("u1", now=2000.0)
+    assert engine.handle({"type": "tick", "player_id": "u1"}, now=3000.0) == []
+    assert engine.version == version
+
+def test_answer_summary_counts_padded_options_under_their_option():
+    quiz = {"questions": [{"question": "Largest planet?", "correct_answer": "Jupiter", "question_type": "mcq",
+                           "options": [" Jupiter ", "Mars", "Venus ", "Earth"]}]}
+    engine = game_engine.GameEngine(quiz, [("u1", "Ann"), ("u2", "Bo"), ("u3", "Cy")])
+    engine.start(now=0.0)
+    engine.submit("u1", " Jupiter ", now=1.0)
+    engine.submit("u2", "Venus", now=2.0)
+    engine.submit("u3", "Pluto", now=3.0)
+    summary = engine.answer_summary()
+    assert summary["distribution"] == [("Jupiter", 1), ("Mars", 0), ("Venus", 1), ("Earth", 0), ("Pluto", 1)]
+    assert summary["answered"] == 3
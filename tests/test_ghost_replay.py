@@ -0,0 +1,72 @@
+import pytest
+
+import game_engine
+import ghost_replay
+import lobby_store
+import score_store
+
+QUIZ = {"quiz_title": "Capitals", "questions": [
+    {"question": "Capital of France?", "correct_answer": "Paris", "question_type": "identification"},
+    {"question": "Capital of Peru?", "correct_answer": "Lima", "question_type": "identification"}
+]}
+# (player, question) -> (answer, seconds after the question opened); missing = ran out of time
+ANSWERS = {("ann", 0): ("Paris", 1.5), ("bo", 0): ("Rome", 4.0), ("ann", 1): ("Lima", 2.25)}
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(score_store, "SCORES_DB", str(tmp_path / "quiz_app.db"))
+    lobby_store._backends.clear()
+    lobby_store.configure_backend("memory")
+    yield lobby_store
+    score_store.flush(score_store.SCORES_DB)
+    lobby_store._backends.clear()
+
+# Play the quiz in a lobby on a virtual clock until it finishes, which saves the replay
+def play_lobby_game(store):
+    lobby_id = store.create_lobby("Room", "Public", 4, "ann", "Ann", players=[("ann", "Ann"), ("bo", "Bo")])
+    store.set_quiz_data(lobby_id, QUIZ)
+    assert store.start_game(lobby_id, now=0.0)
+    for index in range(len(QUIZ["questions"])):
+        engine = store.load_game(lobby_id)
+        opened = engine.state.phase_started
+        for player_id in ("ann", "bo"):
+            if (player_id, index) in ANSWERS:
+                answer, offset = ANSWERS[player_id, index]
+                assert store.submit_answer(lobby_id, player_id, answer, opened + offset)
+        store.advance_game(lobby_id, now=engine.state.deadline)
+        engine = store.advance_game(lobby_id, now=engine.state.deadline + game_engine.REVEAL_SECONDS)
+    assert engine.phase == game_engine.FINISHED
+    return lobby_id, engine
+
+def test_finished_game_replays_at_recorded_offsets(store):
+    lobby_id, played = play_lobby_game(store)
+    timeline = store.load_replay(lobby_id)
+    assert timeline["game_id"] == played.game_id
+    assert timeline["players"]["bo"]["answers"] == ["Rome", game_engine.TIMED_OUT]
+    assert timeline["players"]["bo"]["times_ms"] == [4000, None]
+    assert not store.save_replay(lobby_id, played, timeline["quiz_id"])  # the same game is recorded once
+
+    # A later player runs a fresh solo engine beside the recording
+    ghost = ghost_replay.GhostReplay(timeline)
+    engine = game_engine.GameEngine(store.load_quiz(timeline["quiz_id"]), [("cy", "Cy")])
+    engine.start(now=100.0)
+    assert len(ghost) == 2
+    assert [ghost.answered_by(0, ms) for ms in (0, 1499, 1500, 3999, 4000, 10000)] == [0, 0, 1, 1, 2, 2]
+    assert [ghost.answered_by(1, ms) for ms in (2249, 2250, 15000)] == [0, 1, 1]
+    assert ghost.answered_by(2, 0) == 0
+    assert ghost.scores_after(-1) == [("Ann", 0), ("Bo", 0)]
+    for index in range(2):
+        engine.submit("cy", QUIZ["questions"][index]["correct_answer"], now=engine.state.phase_started + 1)
+        engine.step(now=engine.state.phase_started + 1)
+        expected = {p.name: sum(points for _, _, points, _ in p.results[:index + 1])
+                    for p in played.state.players.values()}
+        assert dict(ghost.scores_after(index)) == expected
+        engine.step(now=engine.state.deadline)
+    assert engine.phase == game_engine.FINISHED
+
+    score = engine.player("cy").score
+    assert store.record_ghost_run(lobby_id, played.game_id, "cy", "Cy", score)
+    assert not store.record_ghost_run(lobby_id, "older-game", "cy", "Cy", score + 1)
+    ranking = store.ghost_ranking(lobby_id)
+    assert ranking[0] == ("Cy", score, True)
+    assert sorted(ranking[1:]) == sorted((p.name, p.score, False) for p in played.state.players.values())
@@ -0,0 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import load_simulator
+
+def test_small_sqlite_simulation_reports_file_growth(tmp_path):
+    report = load_simulator.simulate(lobbies=2, players=2, chat_messages=1, num_questions=2, workdir=str(tmp_path))
+    file_bytes = report["file_bytes"]
+    assert report["final_lobbies"] == 2
+    assert file_bytes["growth"] > 0
+    assert file_bytes["final"] == file_bytes["before"] + file_bytes["growth"]
+    assert file_bytes["max"] >= file_bytes["before"]
+    assert not any(report["lost_updates"].values())
@@ -0,0 +1,152 @@
+import time
+
+import pytest
+
+import game_engine
+import lobby_backend
+import lobby_store
+import score_store
+
+QUIZ = {"quiz_title": "Capitals", "questions": [
+    {"question": "Capital of France?", "correct_answer": "Paris", "question_type": "identification"},
+    {"question": "Capital of Peru?", "correct_answer": "Lima", "question_type": "identification"}
+]}
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(score_store, "SCORES_DB", str(tmp_path / "quiz_app.db"))
+    lobby_store._backends.clear()
+    lobby_store.configure_backend("memory")
+    yield lobby_store
+    score_store.flush(score_store.SCORES_DB)
+    lobby_store._backends.clear()
+
+def new_lobby(store, players=(("u1", "Ann"), ("u2", "Bo"))):
+    lobby_id = store.create_lobby("Room", "Public", 4, players[0][0], players[0][1], players=list(players))
+    store.set_quiz_data(lobby_id, QUIZ)
+    return lobby_id
+
+def test_game_record_uses_wall_clock(store):
+    lobby_id = new_lobby(store)
+    before = time.time()
+    assert store.start_game(lobby_id)
+    game = store.get_backend("game").get(lobby_id)[0]
+    assert before <= game["phase_started"] <= time.time()
+    assert game["deadline"] > game["phase_started"]
+
+def test_start_game_loses_race_without_raising(store, monkeypatch):
+    lobby_id = new_lobby(store)
+    games = store.get_backend("game")
+    put = games.put
+    def racing_put(key, data, expected_version):
+        # Another replica writes its own new game between our read and our write
+        monkeypatch.setattr(games, "put", put)
+        other = game_engine.GameEngine(QUIZ, [("u1", "Ann")])
+        other.start()
+        put(key, dict(other.to_dict(), quiz_id="other"), expected_version)
+        return put(key, data, expected_version)
+    monkeypatch.setattr(games, "put", racing_put)
+    assert store.start_game(lobby_id) is False
+    assert games.get(lobby_id)[0]["quiz_id"] == "other"
+
+def test_start_game_retries_conflict_on_same_game(store, monkeypatch):
+    lobby_id = new_lobby(store)
+    games = store.get_backend("game")
+    put = games.put
+    calls = []
+    def flaky_put(key, data, expected_version):
+        calls.append(expected_version)
+        if len(calls) == 1:
+            raise lobby_backend.ConflictError(key)
+        return put(key, data, expected_version)
+    monkeypatch.setattr(games, "put", flaky_put)
+    assert store.start_game(lobby_id)
+    assert len(calls) == 2
+    assert store.get_lobby(lobby_id)["status"] == "playing"
+
+def test_finish_side_effects_run_once(store, monkeypatch):
+    lobby_id = new_lobby(store)
+    finished = []
+    monkeypatch.setattr(score_store, "finish_game", lambda engine: finished.append(engine.game_id))
+    assert store.start_game(lobby_id, now=0.0)
+    engine = store.advance_game(lobby_id, now=1000.0, player_id="u1")
+    assert engine.phase == game_engine.FINISHED
+    for now in (1010.0, 1020.0, 1030.0):
+        store.advance_game(lobby_id, now=now, player_id="u2")
+    assert finished == [engine.game_id]
+    assert store.get_lobby(lobby_id)["status"] == "finished"
+
+def new_tournament(store, players=4):
+    tournament_id = store.create_tournament("Cup", QUIZ, "host", lobby_size=2, advance=1)
+    for i in range(players):
+        assert store.join_tournament(tournament_id, f"u{i}", f"Player {i}")
+    return tournament_id
+
+@pytest.mark.parametrize("failure", ["refused", "error"])
+def test_failed_round_start_resets_status_and_drops_lobbies(store, monkeypatch, failure):
+    tournament_id = new_tournament(store)
+    start_game = store.start_game
+    calls = []
+    def failing_start_game(lobby_id, **kwargs):
+        calls.append(lobby_id)
+        if len(calls) == 2:
+            if failure == "error":
+                raise lobby_backend.ConflictError(lobby_id)
+            return False
+        return start_game(lobby_id, **kwargs)
+    monkeypatch.setattr(store, "start_game", failing_start_game)
+    if failure == "error":
+        with pytest.raises(lobby_backend.ConflictError):
+            store.start_round(tournament_id)
+    else:
+        assert store.start_round(tournament_id) is False
+    record = store.get_tournament(tournament_id)
+    assert record["status"] == "waiting" and record["rounds"] == []
+    assert store.load_lobbies() == {}
+    assert store.get_backend("game").get_all() == {}
+
+    monkeypatch.setattr(store, "start_game", start_game)
+    assert store.start_round(tournament_id)
+    record = store.get_tournament(tournament_id)
+    assert record["status"] == "playing" and len(record["rounds"][0]["lobbies"]) == 2
+
+# Finish every lobby of the current round with the given scores, as update_game does
+def finish_lobbies(store, tournament_id, scores):
+    record = store.get_tournament(tournament_id)
+    for lobby_id in record["rounds"][-1]["lobbies"]:
+        def finish(lobby):
+            lobby["status"] = "finished"
+            lobby["scores"] = {player_id: scores[player_id] for player_id in lobby["players"]}
+            return True
+        assert store.get_backend().update(lobby_id, finish)
+    return store.finish_round(tournament_id, len(record["rounds"]) - 1)
+
+def test_short_lobbies_still_eliminate_until_a_final(store):
+    # 5 players in lobbies of 4 with advance 3 deals lobbies of 3 and 2
+    tournament_id = store.create_tournament("Cup", QUIZ, "host", lobby_size=4, advance=3)
+    for i in range(5):
+        assert store.join_tournament(tournament_id, f"u{i}", f"Player {i}")
+    scores = {f"u{i}": 100 * (5 - i) for i in range(5)}
+    rounds = 0
+    while store.get_tournament(tournament_id)["status"] != "finished":
+        assert rounds < 5
+        entrants = len(store.get_tournament(tournament_id)["rounds"][-1]["qualified"]) if rounds else 5
+        assert store.start_round(tournament_id, now=time.time())
+        assert finish_lobbies(store, tournament_id, scores)
+        qualified = store.get_tournament(tournament_id)["rounds"][-1]["qualified"]
+        assert len(qualified) < entrants
+        rounds += 1
+    record = store.get_tournament(tournament_id)
+    assert [len(r["lobbies"]) for r in record["rounds"]] == [2, 1]
+    assert record["rounds"][0]["qualified"] == ["u0", "u1", "u3"]
+    assert record["winner"] == "u0"
+
+def test_round_that_eliminates_nobody_is_the_final(store, monkeypatch):
+    tournament_id = new_tournament(store)
+    # Every lobby sends all of its players through
+    monkeypatch.setattr(store.tournament, "qualifiers",
+                        lambda lobby_scores, advance: sorted(p for scores in lobby_scores for p in scores))
+    assert store.start_round(tournament_id, now=time.time())
+    assert finish_lobbies(store, tournament_id, {f"u{i}": i for i in range(4)})
+    record = store.get_tournament(tournament_id)
+    assert record["status"] == "finished" and record["winner"] == "u0"
@@ -0,0 +1,70 @@
+import pytest
+
+import local_generator
+import question_bank
+
+DOCUMENT = """Photosynthesis converts light energy into chemical energy inside the chloroplast of plant cells.
+The mitochondria produces ATP through cellular respiration in eukaryotic organisms.
+In 1789 the French Revolution began with the storming of the Bastille in Paris.
+Isaac Newton formulated the laws of motion and universal gravitation in 1687.
+The primary colors of light are red, green, and blue according to additive color theory.
+Charles Darwin proposed natural selection after his voyage aboard the Beagle in 1831.
+Marie Curie discovered polonium and radium while studying radioactivity in Paris laboratories.
+The inner planets are Mercury, Venus, Earth, and Mars in order from the Sun."""
+SENTENCES = local_generator.split_sentences(DOCUMENT)
+
+def generate(mode, count=4, seed=1):
+    quiz = local_generator.generate_quiz(DOCUMENT, mode, count, seed=seed)
+    assert len(quiz["questions"]) == count
+    for question in quiz["questions"]:
+        assert question_bank.validate_question(question), question
+    return quiz["questions"]
+
+def test_mcq_options_hold_the_answer_and_three_other_terms_of_its_kind():
+    for question in generate("Multiple Choice"):
+        assert question["question_type"] == "mcq"
+        assert local_generator.BLANK in question["question"]
+        answer = question["correct_answer"]
+        distractors = [option for option in question["options"] if option != answer]
+        assert len(distractors) == 3 and len(set(distractors)) == 3
+        assert all(d.lower() != answer.lower() for d in distractors)
+        kind = local_generator.term_kind(answer)
+        assert all(local_generator.term_kind(d) == kind for d in distractors)
+        assert question["question"].replace(local_generator.BLANK, answer) in SENTENCES
+
+def test_true_false_is_the_sentence_or_a_swapped_term():
+    questions = generate("True or False", count=6)
+    assert {q["correct_answer"] for q in questions} == {"True", "False"}
+    for question in questions:
+        assert question["question_type"] == "true_false"
+        if question["correct_answer"] == "True":
+            assert question["question"] in SENTENCES
+        else:
+            assert question["question"] not in SENTENCES
+            original = [s for s in SENTENCES if len(s.split()) == len(question["question"].split())
+                        and sum(a != b for a, b in zip(s.split(), question["question"].split())) == 1]
+            assert original
+
+def test_identification_blanks_the_key_term():
+    for question in generate("Identification"):
+        assert question["question_type"] == "identification"
+        assert question["question"].count(local_generator.BLANK) == 1
+        assert question["question"].replace(local_generator.BLANK, question["correct_answer"]) in SENTENCES
+
+def test_enumeration_prefers_list_sentences_and_falls_back_to_identification():
+    questions = generate("Enumeration")
+    assert [q["question_type"] for q in questions[:2]] == ["enumeration", "enumeration"]
+    assert {q["correct_answer"] for q in questions[:2]} == {"red, green, blue", "Mercury, Venus, Earth, Mars"}
+    assert all(local_generator.BLANK in q["question"] for q in questions[:2])
+    assert all(q["question_type"] == "identification" for q in questions[2:])
+
+def test_key_terms_are_not_reused_and_seed_is_deterministic():
+    # Both Paris sentences have Paris as their key term, so the second one is skipped
+    assert len(local_generator.generate_quiz(DOCUMENT, "Identification", 8)["questions"]) == 7
+    questions = generate("Identification", count=7)
+    assert len({q["correct_answer"] for q in questions}) == 7
+    assert generate("Mix Mode", count=7, seed=5) == generate("Mix Mode", count=7, seed=5)
+
+@pytest.mark.parametrize("text", ["", "Too short.", "a b c d e f g h"])
+def test_nothing_to_ask_returns_none(text):
+    assert local_generator.generate_quiz(text, "Mix Mode", 3) is None
@@ -0,0 +1,29 @@
+import json
+import os
+
+import metrics
+
+def test_recording_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    metrics.configure()
+    with metrics.rerun("home"):
+        pass
+    assert os.listdir(tmp_path) == []
+
+def test_metrics_file_rotates_past_max_bytes(tmp_path):
+    path = str(tmp_path / "metrics.jsonl")
+    metrics.configure(metrics_file=path, max_bytes=1000)
+    for _ in range(20):
+        with metrics.rerun("home"):
+            pass
+    assert os.path.getsize(path) <= 1000
+    assert os.path.getsize(f"{path}.1") <= 1000
+    with open(path) as f:
+        assert json.loads(f.readline())["page"] == "home"
+    metrics.configure()
+
+def test_summary_file_is_per_process(tmp_path):
+    metrics.configure(summary_file=str(tmp_path / "metrics_summary.json"))
+    metrics.write_summary()
+    assert os.listdir(tmp_path) == [f"metrics_summary.{os.getpid()}.json"]
+    metrics.configure()
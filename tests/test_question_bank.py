@@ -0,0 +1,60 @@
+import random
+
+import question_bank
+
+def mcq(text, answer, options):
+    return {"question": text, "correct_answer": answer, "options": options, "question_type": "mcq"}
+
+def true_false(text, answer):
+    return {"question": text, "correct_answer": answer, "question_type": "true_false"}
+
+SOURCE = ("Photosynthesis converts light energy into chemical energy in the chloroplast.\n\n"
+          "The mitochondria produces ATP through cellular respiration. Respiration uses oxygen.")
+
+def test_search_matches_prefixes_and_filters_by_type(tmp_path):
+    db_path = str(tmp_path / "bank.db")
+    plants = [mcq("Where does photosynthesis happen?", "Chloroplast", ["Chloroplast", "Nucleus", "Ribosome", "Vacuole"])]
+    cells = [true_false("Mitochondria produce ATP.", "True"),
+             mcq("What do mitochondria produce?", "ATP", ["ATP", "DNA", "RNA", "Glucose"])]
+    assert question_bank.store_questions(plants, topic="Plants", source_text=SOURCE.split("\n\n")[0], db_path=db_path) == 1
+    assert question_bank.store_questions(cells, topic="Cells", source_text=SOURCE.split("\n\n")[1], db_path=db_path) == 2
+    assert question_bank.store_questions(cells, topic="Cells", db_path=db_path) == 0
+    found = question_bank.search_questions("mitochondri", 10, db_path=db_path)
+    assert sorted(q["question"] for q in found) == ["Mitochondria produce ATP.", "What do mitochondria produce?"]
+    found = question_bank.search_questions("mitochondria", 10, question_type="true_false", db_path=db_path)
+    assert [q["question"] for q in found] == ["Mitochondria produce ATP."]
+    # The source excerpt is indexed, so words that only appear there find the question
+    assert [q["question"] for q in question_bank.search_questions("light energy", 10, db_path=db_path)] \
+        == ["Where does photosynthesis happen?"]
+    assert question_bank.search_questions("*?", 10, db_path=db_path) == []
+
+def test_search_samples_large_match_sets(tmp_path):
+    db_path = str(tmp_path / "bank.db")
+    questions = [true_false(f"Volcano fact number {i} is right.", "True") for i in range(200)]
+    questions += [mcq(f"Volcano question {i}?", f"A{i}", [f"A{i}", "B", "C", "D"]) for i in range(0, 200, 2)]
+    question_bank.store_questions(questions, topic="Volcanoes", db_path=db_path)
+    random.seed(3)
+    seen = set()
+    for _ in range(20):
+        found = question_bank.search_questions("volcano", 10, db_path=db_path)
+        assert len(found) == 10 and len({q["question"] for q in found}) == 10
+        seen.update(q["question"] for q in found)
+    assert len(seen) > 100
+    found = question_bank.search_questions("volcano", 10, question_type="mcq", db_path=db_path)
+    assert len(found) == 10 and all(q["question_type"] == "mcq" for q in found)
+
+def test_derive_topic():
+    assert question_bank.derive_topic("", "Cell Biology", "notes.pdf") == "Cell Biology notes"
+    topic = question_bank.derive_topic("Volcano lava volcano magma volcano lava eruption", "Generated Quiz",
+                                       "earth_science-week2.txt")
+    assert topic.startswith("earth science week2 volcano lava")
+    assert "generated" not in topic.lower()
+
+def test_source_excerpt_follows_the_question():
+    chunks = question_bank.source_chunks(SOURCE)
+    assert len(chunks) == 3
+    excerpt = question_bank.source_excerpt(chunks, {"question": "What do mitochondria produce?", "correct_answer": "ATP"})
+    assert excerpt.startswith("The mitochondria produces ATP")
+    assert "chloroplast" not in excerpt
+    assert len(question_bank.source_excerpt(chunks, {"question": "Photosynthesis?"}, max_chars=40)) <= 40
+    assert question_bank.source_excerpt([], {"question": "x"}) == ""
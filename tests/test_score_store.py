@@ -0,0 +1,72 @@
+import csv
+import io
+
+import pytest
+
+import game_engine
+import score_store
+
+QUIZ = {"questions": [
+    {"question": "Capital of France?", "correct_answer": "Paris", "question_type": "identification"},
+    {"question": "Capital of Peru?", "correct_answer": "Lima", "question_type": "identification"}
+]}
+
+# Ann answers both questions (2 s, then 4 s); Bo answers the first wrong and lets the second time out
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / "quiz_app.db")
+    engine = game_engine.GameEngine(QUIZ, [("ann", "Ann"), ("bo", "Bo")])
+    score_store.record_game(engine, lobby_id="L1", mode="Public", quiz_id="q1", class_id="c1", db_path=db_path)
+    engine.start(now=0.0)
+    for player_id, answer, now in [("ann", "Paris", 2.0), ("bo", "Rome", 3.0)]:
+        engine.submit(player_id, answer, now=now)
+        score_store.record_answer(engine, player_id, db_path=db_path)
+    score_store.record_reveals(engine, engine.step(now=3.0), db_path=db_path)
+    engine.step(now=3.0 + engine.reveal_seconds)
+    opened = engine.state.phase_started
+    engine.submit("ann", "Lima", now=opened + 4.0)
+    score_store.record_answer(engine, "ann", db_path=db_path)
+    score_store.record_reveals(engine, engine.step(now=opened + 100), db_path=db_path)
+    score_store.finish_game(engine, db_path=db_path)
+    return db_path
+
+def rows(db_path):
+    return [row for chunk in score_store.iter_history(db_path=db_path) for row in chunk]
+
+def test_timed_out_answers_have_no_time(db_path):
+    times = {(row[6], row[7]): (row[8], row[11]) for row in rows(db_path)}
+    assert times == {("ann", 0): ("Paris", 2000), ("bo", 0): ("Rome", 3000),
+                     ("ann", 1): ("Lima", 4000), ("bo", 1): (game_engine.TIMED_OUT, None)}
+
+def test_difficulty_stats_skip_missing_and_legacy_timeout_times(db_path):
+    conn = score_store.connect(db_path)
+    with conn:  # a row logged before timeouts were stored as NULL
+        conn.execute("INSERT INTO scores (id, player_id, game_id, question_index, answer, is_correct, points, "
+                     "time_taken_ms) SELECT 'old', 'cy', game_id, 1, ?, 0, 0, 10000 FROM scores LIMIT 1",
+                     (game_engine.TIMED_OUT,))
+    conn.close()
+    stats = score_store.difficulty_stats(lobby_id="L1", db_path=db_path).set_index("question_index")
+    assert stats.loc[0, "attempts"] == 2 and stats.loc[0, "accuracy"] == 0.5
+    assert stats.loc[0, "avg_time_ms"] == 2500
+    assert stats.loc[1, "attempts"] == 3 and stats.loc[1, "avg_time_ms"] == 4000
+    assert score_store.difficulty_stats(lobby_id="missing", db_path=db_path).empty
+
+def test_csv_export_streams_every_row(db_path):
+    out = io.StringIO()
+    assert score_store.export_history(out, "csv", class_id="c1", chunk_size=1, db_path=db_path) == 4
+    exported = list(csv.reader(io.StringIO(out.getvalue())))
+    assert exported[0] == score_store.HISTORY_COLUMNS
+    assert [row[6] for row in exported[1:]] == ["ann", "bo", "ann", "bo"]
+    assert exported[4][11] == ""
+    with score_store.export_file("csv", lobby_id="L1", db_path=db_path) as f:
+        assert f.read().decode("utf-8") == out.getvalue()
+    with pytest.raises(ValueError):
+        score_store.export_history(io.StringIO(), "xlsx", db_path=db_path)
+
+def test_parquet_export(db_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    with score_store.export_file("parquet", lobby_id="L1", db_path=db_path) as f:
+        table = pq.read_table(f)
+    assert table.column_names == score_store.HISTORY_COLUMNS
+    assert table.num_rows == 4
+    assert table.column("time_taken_ms").to_pylist() == [2000, 3000, 4000, None]
@@ -0,0 +1,38 @@
+import tournament
+from scoring import MAX_POINTS
+
+def test_seed_lobbies_snakes_players_over_balanced_lobbies():
+    assert tournament.seed_lobbies(list("abcde"), 4) == [["a", "d", "e"], ["b", "c"]]
+    lobbies = tournament.seed_lobbies([f"p{i}" for i in range(11)], 10)
+    assert sorted(len(lobby) for lobby in lobbies) == [5, 6]
+    assert tournament.seed_lobbies(["a"], 4) == [["a"]]
+
+def test_qualifiers_leave_someone_out_of_short_lobbies():
+    # 5 players, lobby size 4, advance 3: lobbies of 3 and 2
+    scores = [{"a": 300, "d": 100, "e": 0}, {"b": 200, "c": 50}]
+    assert tournament.qualifiers(scores, 3) == ["a", "b", "d"]
+    # 11 players, lobby size 10, advance 9: lobbies of 6 and 5
+    lobbies = tournament.seed_lobbies([f"p{i:02}" for i in range(11)], 10)
+    scores = [{player_id: 10 * i for i, player_id in enumerate(lobby)} for lobby in lobbies]
+    assert len(tournament.qualifiers(scores, 9)) == 9
+    # A full lobby still sends `advance` players and a lone player goes through
+    assert tournament.qualifiers([{"a": 1, "b": 2, "c": 3}, {"d": 0}], 2) == ["c", "b", "d"]
+
+def test_qualifiers_break_ties_by_player_id():
+    assert tournament.qualifiers([{"b": 100, "a": 100, "c": 0}], 2) == ["a", "b"]
+
+def test_standings_rank_and_top():
+    standings = tournament.Standings(2, {"a": 0, "b": 0, "c": 0})
+    standings.add("a", 150)
+    standings.add("b", 300)
+    standings.set("c", 150)
+    assert len(standings) == 3
+    assert standings.rank("b") == 1
+    assert standings.rank("a") == standings.rank("c") == 2
+    assert standings.top(2) == [("b", 300), ("a", 150)]
+    assert standings.top(10) == [("b", 300), ("a", 150), ("c", 150)]
+    # Scores are clamped to what the quiz can award
+    standings.set("a", 10 * MAX_POINTS)
+    assert standings.top(1) == [("a", 2 * MAX_POINTS)] and standings.rank("b") == 2
+    standings.set("a", -5)
+    assert standings.rank("a") == 3
@@ -0,0 +1,20 @@
+import random
+
+import numpy as np
+
+import trivia_sampler
+
+def test_sample_more_than_positive_rows_returns_each_once():
+    weights = [0.1, 0.2, 0.0, 0.3, 0.7, 0.0]
+    tree = trivia_sampler.FenwickTree(weights)
+    picks = tree.sample(10, random.Random(0))
+    assert sorted(picks) == [0, 1, 3, 4]
+    assert np.array_equal(tree.weights, weights)
+    assert abs(tree.total() - sum(weights)) < 1e-9
+
+def test_sampler_with_fewer_matching_rows_than_requested():
+    keys = np.arange(100, 105, dtype=np.int64)
+    index = trivia_sampler.TriviaIndex(keys)
+    history = trivia_sampler.TriviaHistory(None)
+    sampler = trivia_sampler.AdaptiveSampler(index, [1, 3], history)
+    assert sorted(sampler.sample(5, random.Random(1))) == [1, 3]
@@ -0,0 +1,33 @@
+import os
+import threading
+
+import pandas as pd
+
+import trivia_store
+
+def write_csv(path, questions):
+    pd.DataFrame({"question": questions, "answer": ["A"] * len(questions), "options": ["A|B"] * len(questions),
+                  "category": ["Science"] * len(questions), "difficulty": ["Easy"] * len(questions)}).to_csv(path, index=False)
+
+def test_old_generation_is_served_while_a_changed_csv_is_ingested(tmp_path, monkeypatch):
+    csv_path, store_dir = str(tmp_path / "trivia.csv"), str(tmp_path / "store")
+    write_csv(csv_path, ["Q1?", "Q2?"])
+    old = trivia_store.open_dataset(csv_path, store_dir)
+    assert len(old) == 2
+
+    write_csv(csv_path, ["Q1?", "Q2?", "Q3?"])
+    os.utime(csv_path, ns=(1, 1))
+    monkeypatch.setattr(trivia_store, "RELOAD_CHECK_S", 0)
+    started, release = threading.Event(), threading.Event()
+    def slow_prepare(df):
+        started.set()
+        release.wait(5)
+        return df
+    builder = threading.Thread(target=trivia_store.open_dataset, args=(csv_path, store_dir, slow_prepare))
+    builder.start()
+    assert started.wait(5)
+    # _lock is free during the ingest and other callers get the old dataset straight away
+    assert trivia_store.open_dataset(csv_path, store_dir) is old
+    release.set()
+    builder.join(5)
+    assert len(trivia_store.open_dataset(csv_path, store_dir)) == 3
@@ -0,0 +1,21 @@
+import os
+import threading
+
+import lobby_store
+
+def test_concurrent_updates_keep_every_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(lobby_store, "USERS_DB", str(tmp_path / "users.json"))
+    lobby_store.update_users(lambda users: users.setdefault("ann", {"score": 0}))
+    def add_points():
+        for _ in range(20):
+            def add(users):
+                users["ann"]["score"] += 1
+                return True
+            lobby_store.update_users(add)
+    threads = [threading.Thread(target=add_points) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert lobby_store.load_users()["ann"]["score"] == 80
+    assert sorted(os.listdir(tmp_path)) == ["users.json", "users.json.lock"]
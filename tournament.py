@@ -0,0 +1,116 @@
+from scoring import MAX_POINTS
+
+# --- Tournaments: one quiz played in many lobbies at once, in elimination rounds ---
+# Each round splits its players across lobbies that all start on the same clock. Reveals in any of
+# them add points to one Standings object per round, so ranking a player or reading the top N
+# across every lobby never scans the field. The top `advance` players of each lobby go through
+# to the next round (never a whole lobby of two or more); a round played in a single lobby, or one
+# that eliminates nobody, is the final.
+
+# Fenwick tree of how many players hold each score
+class _ScoreCounts:
+    __slots__ = ("tree",)
+
+    def __init__(self, size):
+        self.tree = [0] * (size + 1)
+
+    def add(self, score, count):
+        i = score + 1
+        while i < len(self.tree):
+            self.tree[i] += count
+            i += i & -i
+
+    # Players scoring <= score
+    def prefix(self, score):
+        i, total = min(score + 1, len(self.tree) - 1), 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    # Smallest score s with prefix(s) >= k (k >= 1)
+    def find(self, k):
+        pos, step = 0, 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            if pos + step < len(self.tree) and self.tree[pos + step] < k:
+                pos += step
+                k -= self.tree[pos]
+            step >>= 1
+        return pos
+
+# Live standings for one round. Scores are bounded by the quiz (MAX_POINTS per question), so
+# updates, ranks and each step of a top-N read cost O(log max_score).
+class Standings:
+    __slots__ = ("max_score", "scores", "counts", "buckets")
+
+    def __init__(self, num_questions, scores=None):
+        self.max_score = max(1, num_questions) * MAX_POINTS
+        self.scores = {}
+        self.counts = _ScoreCounts(self.max_score + 1)
+        self.buckets = {}  # score -> player ids holding it
+        for player_id, score in (scores or {}).items():
+            self.set(player_id, score)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _place(self, player_id, score, count):
+        self.counts.add(score, count)
+        bucket = self.buckets.setdefault(score, set())
+        if count > 0:
+            bucket.add(player_id)
+        else:
+            bucket.discard(player_id)
+            if not bucket:
+                del self.buckets[score]
+
+    def set(self, player_id, score):
+        score = min(max(0, int(score)), self.max_score)
+        old = self.scores.get(player_id)
+        if old == score:
+            return
+        if old is not None:
+            self._place(player_id, old, -1)
+        self.scores[player_id] = score
+        self._place(player_id, score, 1)
+
+    def add(self, player_id, points):
+        self.set(player_id, self.scores.get(player_id, 0) + points)
+
+    # 1-based rank; tied players share the better rank
+    def rank(self, player_id):
+        score = self.scores.get(player_id)
+        if score is None:
+            return None
+        return len(self.scores) - self.counts.prefix(score) + 1
+
+    # [(player_id, score)] for the n best scores, ties by player id
+    def top(self, n):
+        rows = []
+        above = 0
+        while len(rows) < n and above < len(self.scores):
+            score = self.counts.find(len(self.scores) - above)
+            bucket = sorted(self.buckets[score])
+            rows.extend((player_id, score) for player_id in bucket)
+            above += len(bucket)
+        return rows[:n]
+
+# Function to spread ranked players over lobbies of at most lobby_size, snake order so every lobby
+# gets a similar mix of strong and weak players
+def seed_lobbies(player_ids, lobby_size):
+    count = max(1, -(-len(player_ids) // max(2, lobby_size)))
+    lobbies = [[] for _ in range(count)]
+    for i, player_id in enumerate(player_ids):
+        row, col = divmod(i, count)
+        lobbies[col if row % 2 == 0 else count - 1 - col].append(player_id)
+    return [lobby for lobby in lobbies if lobby]
+
+# Function to pick who goes through from each finished lobby ({player_id: score} per lobby),
+# best first across the whole round. seed_lobbies can deal lobbies smaller than advance + 1, so each
+# lobby's cut is capped to leave at least one of its players out (a lone player goes through).
+def qualifiers(lobby_scores, advance):
+    picked = []
+    for scores in lobby_scores:
+        cut = max(1, min(advance, len(scores) - 1))
+        picked += sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:cut]
+    return [player_id for player_id, _ in sorted(picked, key=lambda item: (-item[1], item[0]))]
@@ -0,0 +1,197 @@
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from question_bank import QUIZ_DB
+
+# --- Adaptive trivia selection ---
+# Per-user history (attempts, correct, last result, last seen) lives in quiz_app.db keyed by a
+# stable 64-bit hash of the question text. Selection draws from a Fenwick tree of weights, so
+# building is O(n) in NumPy and each draw or history update is O(log n).
+HISTORY_DB = QUIZ_DB
+WEIGHT_UNSEEN = 4.0
+WEIGHT_MISSED = 6.0
+WEIGHT_CORRECT = 0.5
+MIN_RECOVERY = 0.05
+RECOVERY_SECONDS = 24 * 3600  # a seen question gets back to full weight over a day
+
+_initialized_dbs = set()
+_init_lock = threading.Lock()
+
+def question_keys(questions):
+    return pd.util.hash_pandas_object(pd.Series(questions), index=False).to_numpy().view(np.int64)
+
+# Function to weigh one question for a player; unseen and missed questions come first
+def question_weight(entry, now):
+    if entry is None:
+        return WEIGHT_UNSEEN
+    attempts, correct, last_correct, last_seen = entry
+    recovery = max(MIN_RECOVERY, min(1.0, (now - last_seen) / RECOVERY_SECONDS))
+    if not last_correct:
+        return WEIGHT_MISSED * (0.5 + 0.5 * recovery)
+    return WEIGHT_CORRECT * recovery
+
+class FenwickTree:
+    __slots__ = ("n", "tree", "weights", "top_bit")
+
+    def __init__(self, weights):
+        self.weights = np.asarray(weights, dtype=np.float64).copy()
+        self.n = len(self.weights)
+        # tree[i] holds the sum of weights (i - lowbit(i), i], built from prefix sums in one pass
+        prefix = np.concatenate(([0.0], np.cumsum(self.weights)))
+        idx = np.arange(1, self.n + 1)
+        self.tree = np.zeros(self.n + 1)
+        self.tree[1:] = prefix[idx] - prefix[idx - (idx & -idx)]
+        self.top_bit = 1 << (self.n.bit_length() - 1) if self.n else 0
+
+    def update(self, i, weight):
+        delta = weight - self.weights[i]
+        self.weights[i] = weight
+        i += 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def total(self):
+        i, total = self.n, 0.0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    # Smallest index whose prefix sum exceeds u
+    def find(self, u):
+        pos, step = 0, self.top_bit
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= u:
+                pos = nxt
+                u -= self.tree[nxt]
+            step >>= 1
+        return pos
+
+    # Weighted draw without replacement; picked weights are zeroed while drawing and then restored.
+    # At most as many rows as have positive weight can be drawn; after that the tree only holds
+    # float residue, which would send every draw to an already-picked row.
+    def sample(self, k, rng):
+        picks = []
+        saved = []
+        k = min(k, int(np.count_nonzero(self.weights > 0)))
+        while len(picks) < k:
+            total = self.total()
+            if total <= 0:
+                break
+            i = self.find(rng.random() * total)
+            if i >= self.n or self.weights[i] <= 0:
+                continue  # float rounding at a boundary; draw again
+            picks.append(i)
+            saved.append((i, self.weights[i]))
+            self.update(i, 0.0)
+        for i, weight in saved:
+            self.update(i, weight)
+        return picks
+
+# Maps question keys back to dataset rows (one per loaded dataset, shared by all samplers)
+class TriviaIndex:
+    process_shared = True
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rows_for_keys(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(self.keys) or not len(keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.sorted_keys, keys), len(self.keys) - 1)
+        return np.where(self.sorted_keys[pos] == keys, self.order[pos], -1)
+
+def connect(db_path=None):
+    db_path = db_path or HISTORY_DB
+    conn = sqlite3.connect(db_path, timeout=10)
+    with _init_lock:
+        if db_path not in _initialized_dbs:
+            conn.execute("""CREATE TABLE IF NOT EXISTS trivia_history (
+                    user_id TEXT,
+                    question_key INTEGER,
+                    attempts INTEGER,
+                    correct INTEGER,
+                    last_correct INTEGER,
+                    last_seen REAL,
+                    PRIMARY KEY (user_id, question_key)
+                ) WITHOUT ROWID""")
+            conn.commit()
+            _initialized_dbs.add(db_path)
+    return conn
+
+class TriviaHistory:
+    def __init__(self, user_id, db_path=None):
+        self.user_id = user_id
+        self.db_path = db_path
+        self.entries = {}
+        if user_id is None:
+            return
+        conn = connect(db_path)
+        try:
+            rows = conn.execute("SELECT question_key, attempts, correct, last_correct, last_seen FROM trivia_history "
+                                "WHERE user_id = ?", (user_id,)).fetchall()
+        finally:
+            conn.close()
+        self.entries = {key: (attempts, correct, bool(last_correct), last_seen)
+                        for key, attempts, correct, last_correct, last_seen in rows}
+
+    def record(self, key, is_correct, now=None):
+        now = time.time() if now is None else now
+        attempts, correct, _, _ = self.entries.get(key, (0, 0, False, now))
+        entry = (attempts + 1, correct + int(bool(is_correct)), bool(is_correct), now)
+        self.entries[key] = entry
+        if self.user_id is None:
+            return entry
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO trivia_history VALUES (?, ?, ?, ?, ?, ?)",
+                             (self.user_id, int(key), entry[0], entry[1], int(entry[2]), entry[3]))
+        finally:
+            conn.close()
+        return entry
+
+# One weighted sampler per (category, difficulty) filter; `rows` are the matching dataset rows in order
+class AdaptiveSampler:
+    def __init__(self, index, rows, history, now=None):
+        now = time.time() if now is None else now
+        self.index = index
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.history = history
+        weights = np.full(len(self.rows), WEIGHT_UNSEEN)
+        if history.entries:
+            keys = np.fromiter(history.entries.keys(), dtype=np.int64, count=len(history.entries))
+            for key, pos in zip(keys, self._positions(index.rows_for_keys(keys))):
+                if pos >= 0:
+                    weights[pos] = question_weight(history.entries[int(key)], now)
+        self.tree = FenwickTree(weights)
+
+    def _positions(self, rows):
+        if not len(self.rows):
+            return np.full(len(rows), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.rows, rows), len(self.rows) - 1)
+        return np.where(self.rows[pos] == rows, pos, -1)
+
+    # Returns dataset row numbers
+    def sample(self, k, rng):
+        return [int(self.rows[i]) for i in self.tree.sample(k, rng)]
+
+    # Re-weigh one dataset row after the player's history for it changed
+    def refresh(self, row, now=None):
+        now = time.time() if now is None else now
+        pos = int(self._positions(np.array([row]))[0])
+        if pos >= 0:
+            key = int(self.index.keys[row])
+            self.tree.update(pos, question_weight(self.history.entries.get(key), now))
@@ -0,0 +1,240 @@
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import trivia_sampler
+
+try:
+    import fcntl
+except ImportError:  # Windows: ingestion is still atomic, just not serialized across processes
+    fcntl = None
+
+# --- Columnar trivia dataset ---
+# The CSV is ingested once into a directory of .npy columns that are memory-mapped at runtime:
+#   question/answer: UTF-8 string pools plus int64 byte offsets (row i is pool[off[i]:off[i+1]])
+#   options:         one string pool of pre-split options plus per-row offsets into it
+#   category/difficulty: int16 dictionary codes (-1 = missing), vocabularies in manifest.json
+#   keys:            trivia_sampler question keys
+# Each ingest writes a new generation directory and then swaps manifest.json with os.replace,
+# so readers see either the old or the new dataset, never a mix.
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+RELOAD_CHECK_S = 1.0
+STRING_COLUMNS = ["question", "answer"]
+CODE_COLUMNS = ["category", "difficulty"]
+
+_datasets = {}
+_building = {}  # store_dir -> lock held by the thread ingesting it
+_lock = threading.Lock()
+
+def string_pool(strings):
+    strings = strings.to_numpy(dtype=object).tolist() if isinstance(strings, pd.Series) else list(strings)
+    joined = "".join(strings)
+    # ASCII text (the common case) has one byte per character, so lengths come straight from len()
+    if joined.isascii():
+        pool = joined.encode("ascii")
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+    else:
+        encoded = [s.encode("utf-8") for s in strings]
+        pool = b"".join(encoded)
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return np.frombuffer(pool, dtype=np.uint8), offsets
+
+def dictionary_codes(series):
+    categorical = pd.Categorical(series)
+    return categorical.codes.astype(np.int16), [str(c) for c in categorical.categories]
+
+# Function to turn a trivia DataFrame into column arrays plus manifest metadata
+def build_columns(df):
+    columns = {}
+    meta = {"format": FORMAT_VERSION, "rows": len(df), "vocab": {}}
+    for name in STRING_COLUMNS:
+        columns[f"{name}_pool"], columns[f"{name}_offsets"] = string_pool(df[name].fillna("").astype(str))
+    options = df["options"] if "options" in df.columns else pd.Series([None] * len(df), dtype=object)
+    present = options.notna().to_numpy()
+    packed = options[present].astype(str).to_numpy(dtype=object).tolist()
+    # Splitting one joined string is far faster than splitting a million small ones
+    counts = np.zeros(len(df), dtype=np.int64)
+    counts[present] = np.fromiter(map(str.count, packed, itertools.repeat("|")), dtype=np.int64, count=len(packed)) + 1
+    columns["options_pool"], columns["options_offsets"] = string_pool("|".join(packed).split("|") if packed else [])
+    columns["options_rows"] = np.zeros(len(df) + 1, dtype=np.int64)
+    np.cumsum(counts, out=columns["options_rows"][1:])
+    for name in CODE_COLUMNS:
+        if name in df.columns:
+            columns[name], meta["vocab"][name] = dictionary_codes(df[name])
+        else:
+            columns[name], meta["vocab"][name] = np.full(len(df), -1, dtype=np.int16), []
+    columns["keys"] = trivia_sampler.question_keys(df["question"].fillna("").astype(str))
+    return columns, meta
+
+def load_column(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:  # zero-length arrays can't be mapped
+        return np.load(path)
+
+class TriviaDataset:
+    process_shared = True  # one mapped copy per process, see open_dataset
+
+    def __init__(self, columns, meta, path=None):
+        self.columns = columns
+        self.meta = meta
+        self.path = path
+        self._index = None
+
+    @classmethod
+    def from_frame(cls, df):
+        columns, meta = build_columns(df)
+        return cls(columns, meta)
+
+    # Mapping only reads each .npy header; pages are faulted in as rows are touched
+    @classmethod
+    def open(cls, store_dir):
+        with open(os.path.join(store_dir, MANIFEST)) as f:
+            meta = json.load(f)
+        path = os.path.join(store_dir, meta["generation"])
+        columns = {name: load_column(os.path.join(path, f"{name}.npy")) for name in meta["columns"]}
+        return cls(columns, meta, path)
+
+    def column(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def _string(self, name, i):
+        offsets = self.column(f"{name}_offsets")
+        return bytes(self.column(f"{name}_pool")[offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def question(self, i):
+        return self._string("question", i)
+
+    def answer(self, i):
+        return self._string("answer", i)
+
+    def options(self, i):
+        rows = self.column("options_rows")
+        return [self._string("options", j) for j in range(rows[i], rows[i + 1])]
+
+    @property
+    def categories(self):
+        return self.meta["vocab"]["category"]
+
+    @property
+    def difficulties(self):
+        return self.meta["vocab"]["difficulty"]
+
+    @property
+    def keys(self):
+        return self.column("keys")
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = trivia_sampler.TriviaIndex(np.asarray(self.keys))
+        return self._index
+
+    # Dataset rows matching the filters ("All"/None means no filter)
+    def rows_matching(self, category=None, difficulty=None):
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in [("category", category), ("difficulty", difficulty)]:
+            if value and value != "All":
+                vocab = self.meta["vocab"][name]
+                code = vocab.index(value) if value in vocab else -2
+                mask &= self.column(name) == code
+        return np.flatnonzero(mask)
+
+def source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {"path": os.path.abspath(csv_path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+def read_manifest(store_dir):
+    try:
+        with open(os.path.join(store_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# True when a dataset ingested from a CSV no longer matches that CSV on disk
+def is_stale(dataset):
+    source = dataset.meta.get("source")
+    if not source:
+        return False
+    try:
+        return source_stamp(source["path"]) != source
+    except OSError:
+        return False
+
+def is_current(manifest, stamp):
+    return bool(manifest) and manifest.get("format") == FORMAT_VERSION and manifest.get("source") == stamp
+
+# Function to convert the CSV into a new generation and swap it in; `prepare` can clean the frame first
+def ingest(csv_path, store_dir, prepare=None):
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, ".lock"), "w") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        stamp = source_stamp(csv_path)
+        manifest = read_manifest(store_dir)
+        if is_current(manifest, stamp):
+            return manifest  # another process ingested it while we waited
+        df = pd.read_csv(csv_path)
+        if prepare:
+            df = prepare(df)
+        columns, meta = build_columns(df)
+        generation = f"gen-{time.time_ns()}-{os.getpid()}"
+        gen_dir = os.path.join(store_dir, generation)
+        os.makedirs(gen_dir, exist_ok=True)
+        for name, array in columns.items():
+            np.save(os.path.join(gen_dir, f"{name}.npy"), array)
+        meta.update(generation=generation, source=stamp, columns=sorted(columns))
+        tmp_path = os.path.join(store_dir, f"{MANIFEST}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(store_dir, MANIFEST))
+        # The generation we replaced stays for readers that read the old manifest a moment ago;
+        # anything older is unreachable (open mappings keep their files alive on POSIX)
+        keep = {generation, manifest.get("generation") if manifest else None}
+        for name in os.listdir(store_dir):
+            if name.startswith("gen-") and name not in keep:
+                shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+        return meta
+
+# Function to get the shared, memory-mapped dataset for a CSV, re-ingesting when the CSV changes.
+# The source is stat'ed at most once per RELOAD_CHECK_S per process. A changed CSV is ingested by one
+# thread outside _lock while the others keep serving the old generation; only a first load waits.
+def open_dataset(csv_path, store_dir, prepare=None):
+    now = time.monotonic()
+    with _lock:
+        cached = _datasets.get(store_dir)
+        if cached and now - cached[1] < RELOAD_CHECK_S:
+            return cached[0]
+        building = _building.setdefault(store_dir, threading.Lock())
+    stamp = source_stamp(csv_path)
+    if cached and cached[0].meta.get("source") == stamp:
+        with _lock:
+            _datasets[store_dir] = (cached[0], now)
+        return cached[0]
+    if not building.acquire(blocking=cached is None):
+        return cached[0]
+    try:
+        with _lock:
+            latest = _datasets.get(store_dir)
+        if latest and latest[0].meta.get("source") == stamp:
+            return latest[0]  # another thread built it while we waited
+        if not is_current(read_manifest(store_dir), stamp):
+            ingest(csv_path, store_dir, prepare)
+        dataset = TriviaDataset.open(store_dir)
+        with _lock:
+            _datasets[store_dir] = (dataset, time.monotonic())
+        return dataset
+    finally:
+        building.release()